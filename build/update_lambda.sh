@@ -5,6 +5,7 @@ cd x
 cp -R ../FSOI/python/src/fsoi .
 rm -f ./fsoi/resources
 cp -R ../FSOI/python/resources ./fsoi/
+PYTHONPATH=. python3 -m fsoi.config
 rm -f ingest_navy.py ingest_gmao.py lambda_wrapper.py
 ln -s fsoi/ingest/nrl/ingest_navy.py .
 ln -s fsoi/ingest/gmao/ingest_gmao.py .
@@ -0,0 +1,112 @@
+"""
+Benchmark the HDF5 compression codecs on representative raw, bulk and groupbulk frames, in table
+and fixed formats.  Reports the file size, the write and read throughput in MB/s of the frame in
+memory, and the read latency (which dominates for small frames), to choose the storage profiles
+(fsoi.stats.lib_utils.STORAGE_PROFILES).
+
+usage: python bench_codecs.py [-n NOBS] [-r REPEAT] [--profiles]
+"""
+
+import os
+import time
+import tempfile
+import pandas as pd
+from argparse import ArgumentParser, ArgumentDefaultsHelpFormatter
+import fsoi.stats.lib_utils as lutils
+import fsoi.stats.lib_obimpact as loi
+from bench_storage import make_frame
+
+CODECS = [(None, 0), ('zlib', 1), ('zlib', 5), ('zlib', 9), ('blosc:lz4', 1), ('blosc:lz4', 5),
+          ('blosc:lz4', 9), ('blosc:zstd', 1), ('blosc:zstd', 5), ('blosc:zstd', 9),
+          ('bzip2', 1), ('bzip2', 9)]
+FORMATS = ['table', 'fixed']
+
+
+def make_frames(nobs):
+    """
+    Create the representative frames
+    :param nobs: {int} Number of observations in the raw frame
+    :return: {dict} raw, bulk and groupbulk frames
+    """
+    raw = make_frame(nobs)
+    bulk = loi.BulkStats(raw)
+    groupbulk = loi.groupBulkStats(loi.accumBulkStats(bulk), loi.Platforms('OnePlatform'))
+    return {'raw': raw, 'bulk': bulk, 'groupbulk': groupbulk}
+
+
+def frame_size(df):
+    """
+    Size of a frame in memory, including the index
+    :param df: {pandas.DataFrame} The frame
+    :return: {int} Size in bytes
+    """
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+def measure(fname, df, fmt, complib, complevel, repeat, **kwargs):
+    """
+    Measure the best write and read times of a frame
+    :param fname: {str} Full path to the HDF file
+    :param df: {pandas.DataFrame} The frame
+    :param fmt: {str} HDF format (table or fixed)
+    :param complib: {str} Compression library
+    :param complevel: {int} Compression level
+    :param repeat: {int} Number of timed runs
+    :param kwargs: Other HDFStore options (e.g. fletcher32)
+    :return: ({int}, {float}, {float}) File size, and best write and read times in seconds
+    """
+    writes, reads = [], []
+    for _ in range(repeat):
+        if os.path.isfile(fname):
+            os.remove(fname)
+        start = time.perf_counter()
+        with pd.HDFStore(fname, complevel=complevel, complib=complib, **kwargs) as hdf:
+            hdf.put('df', df, format=fmt)
+        writes.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        pd.read_hdf(fname, 'df')
+        reads.append(time.perf_counter() - start)
+
+    return os.path.getsize(fname), min(writes), min(reads)
+
+
+def main():
+    """
+    Run the benchmark
+    :return: None
+    """
+    parser = ArgumentParser(description='Benchmark the HDF5 compression codecs',
+                            formatter_class=ArgumentDefaultsHelpFormatter)
+    parser.add_argument('-n', '--nobs', help='number of observations in the raw frame', type=int,
+                        default=1000000)
+    parser.add_argument('-r', '--repeat', help='number of timed runs', type=int, default=3)
+    parser.add_argument('--profiles', help='only measure the storage profiles', action='store_true')
+    args = parser.parse_args()
+
+    if args.profiles:
+        settings = [(name, profile['format'], profile['complib'], profile['complevel'],
+                     profile['fletcher32']) for name, profile in lutils.STORAGE_PROFILES.items()]
+    else:
+        settings = [('%s:%d' % (complib, complevel), fmt, complib, complevel, False)
+                    for fmt in FORMATS for complib, complevel in CODECS]
+
+    frames = make_frames(args.nobs)
+    print('%-10s %-7s %-14s %10s %8s %11s %11s %9s' %
+          ('frame', 'format', 'codec', 'size (MB)', 'ratio', 'write MB/s', 'read MB/s', 'read ms'))
+    with tempfile.TemporaryDirectory() as tmpdir:
+        fname = os.path.join(tmpdir, 'bench.h5')
+        for frame, df in frames.items():
+            mbytes = frame_size(df) / 1024. ** 2
+            # small frames are timed over more runs
+            repeat = args.repeat if frame == 'raw' else 10 * args.repeat
+            for name, fmt, complib, complevel, fletcher32 in settings:
+                size, write, read = measure(fname, df, fmt, complib, complevel, repeat,
+                                            fletcher32=fletcher32)
+                print('%-10s %-7s %-14s %10.3f %8.2f %11.1f %11.1f %9.1f' %
+                      (frame, fmt, name, size / 1024. ** 2, frame_size(df) / size,
+                       mbytes / write, mbytes / read, 1000. * read))
+
+
+if __name__ == '__main__':
+    main()
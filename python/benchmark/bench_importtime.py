@@ -0,0 +1,67 @@
+"""
+Benchmark the import time of the web entry points with `python -X importtime`, in a new
+interpreter for each run (a cold start).  The status and cached-response paths of the Lambda
+function only import fsoi.web.lambda_wrapper; the processing path also imports
+fsoi.web.batch_wrapper.  Reports the best total import time of each path and the heavy modules
+that it loads.
+
+usage: python bench_importtime.py [-r REPEAT]
+"""
+
+import os
+import sys
+import subprocess
+from argparse import ArgumentParser, ArgumentDefaultsHelpFormatter
+
+PATHS = {
+    'cache_id / running': ['fsoi.web.lambda_wrapper'],
+    'processing': ['fsoi.web.lambda_wrapper', 'fsoi.web.batch_wrapper']
+}
+HEAVY = ['numpy', 'pandas', 'matplotlib', 'yaml', 'fsoi.stats.lib_obimpact']
+
+
+def import_time(modules):
+    """
+    Import modules in a new interpreter and parse the -X importtime report
+    :param modules: {list} Modules to import
+    :return: ({float}, {list}) Total import time in ms, and the heavy modules that were imported
+    """
+    env = dict(os.environ)
+    src = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+    env['PYTHONPATH'] = os.pathsep.join([src, env.get('PYTHONPATH', '')])
+    code = '; '.join('import %s' % module for module in modules)
+    process = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], env=env,
+                             stderr=subprocess.PIPE, universal_newlines=True, check=True)
+
+    total = 0
+    imported = set()
+    for line in process.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # top-level imports are not indented, their cumulative times add up to the total
+        if not name.startswith('  '):
+            total += int(cumulative)
+        imported.add(name.strip())
+
+    return total / 1000., [module for module in HEAVY if module in imported]
+
+
+def main():
+    """
+    Run the benchmark
+    :return: None
+    """
+    parser = ArgumentParser(description='Benchmark the import time of the web entry points',
+                            formatter_class=ArgumentDefaultsHelpFormatter)
+    parser.add_argument('-r', '--repeat', help='number of timed runs', type=int, default=5)
+    args = parser.parse_args()
+
+    print('%-20s %10s  %s' % ('path', 'best (ms)', 'heavy modules'))
+    for path, modules in PATHS.items():
+        runs = [import_time(modules) for _ in range(args.repeat)]
+        print('%-20s %10.1f  %s' % (path, min(run[0] for run in runs), ', '.join(runs[0][1])))
+
+
+if __name__ == '__main__':
+    main()
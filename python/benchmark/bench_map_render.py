@@ -0,0 +1,79 @@
+"""
+Benchmark the impact maps: the binned values drawn as one square scatter marker per bin (as
+summary_fsoi_map and correlations_binned_map did) against the values gridded into a dense array
+(@see lib_mapping.gridValues) and drawn as a pcolormesh, at several bin sizes.
+
+The figures are drawn on plain axes in lon/lat, without a Basemap projection, which costs the same
+for both (the projection of the grid edges is cached by lib_mapping).
+
+usage: python bench_map_render.py [-b BOXES ...] [-r REPEAT]
+"""
+
+import io
+import matplotlib
+matplotlib.use('Agg')
+import numpy as np
+from argparse import ArgumentParser, ArgumentDefaultsHelpFormatter
+from matplotlib import pyplot as plt
+import fsoi.stats.lib_mapping as lmapping
+from bench_storage import best_time
+
+
+def make_bins(box, seed=0):
+    """
+    Create binned impacts on a global grid, as lib_obimpact.bin_df labels them
+    :param box: {float} Lat/lon box in degrees
+    :param seed: {int} Random seed
+    :return: ({numpy.ndarray}, {numpy.ndarray}, {numpy.ndarray}) Longitudes, latitudes and values
+    """
+    lons, lats = np.meshgrid(np.arange(0., 360., box), np.arange(-90., 90., box))
+    values = np.random.default_rng(seed).normal(size=lons.shape)
+    return lons.ravel(), lats.ravel(), values.ravel()
+
+
+def draw_scatter(lons, lats, values):
+    """
+    Draw a square marker per bin and save the figure as png
+    """
+    fig = plt.figure()
+    sc = plt.scatter(lons, lats, c=values, s=20, marker='s', cmap='coolwarm', edgecolors='face',
+                     vmin=-2., vmax=2.)
+    plt.colorbar(sc)
+    fig.savefig(io.BytesIO(), format='png')
+    plt.close(fig)
+
+
+def draw_grid(lons, lats, values):
+    """
+    Draw the gridded bins as a pcolormesh and save the figure as png
+    """
+    fig = plt.figure()
+    lon_edges, lat_edges, grid = lmapping.gridValues(lons, lats, values)
+    mesh = plt.pcolormesh(lon_edges, lat_edges, grid, cmap='coolwarm', vmin=-2., vmax=2.)
+    plt.colorbar(mesh)
+    fig.savefig(io.BytesIO(), format='png')
+    plt.close(fig)
+
+
+def main():
+    """
+    Run the benchmark
+    :return: None
+    """
+    parser = ArgumentParser(description='Benchmark the impact maps',
+                            formatter_class=ArgumentDefaultsHelpFormatter)
+    parser.add_argument('-b', '--boxes', help='lat/lon boxes in degrees', nargs='+', type=float,
+                        default=[5., 2., 1.])
+    parser.add_argument('-r', '--repeat', help='number of timed runs', type=int, default=3)
+    args = parser.parse_args()
+
+    print('%6s %8s %12s %12s' % ('box', 'bins', 'scatter (s)', 'mesh (s)'))
+    for box in args.boxes:
+        bins = make_bins(box)
+        scatter = best_time(draw_scatter, *bins, repeat=args.repeat)
+        mesh = best_time(draw_grid, *bins, repeat=args.repeat)
+        print('%6g %8d %12.3f %12.3f' % (box, len(bins[0]), scatter, mesh))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""
+Benchmark decoding Met Office observation lines: one FortranRecordReader call per line against
+the bulk numpy decoder (fsoi.ingest.fortran_io.read_formatted).
+
+usage: python bench_met.py [-n NOBS]
+"""
+
+import time
+import numpy as np
+from argparse import ArgumentParser, ArgumentDefaultsHelpFormatter
+from fortranformat import FortranRecordWriter
+from fsoi.ingest.fortran_io import read_formatted
+import fsoi.ingest.met.process_MET as met
+
+STATIONS = ['AIRCRAFT  AMDAR', 'TEMP  03743', 'MetOp2 (A) ATOVS AMSUA ch-   7 x',
+            'GOES 257 ', 'SYNOP  03772', 'BUOY  62001']
+
+
+def make_lines(nobs, seed=0):
+    """
+    Create synthetic lines with the MET format
+    :param nobs: {int} Number of lines
+    :param seed: {int} Random seed
+    :return: {list} Lines as bytes
+    """
+    rng = np.random.default_rng(seed)
+    # pylint: disable=E1102
+    writer = FortranRecordWriter(met.FORTRAN_FORMAT)
+    template = []
+    for i in range(min(nobs, 10000)):
+        template.append(writer.write([
+            i, rng.normal(250., 20.), rng.normal(0., 1.), rng.normal(0., 1.e-4),
+            rng.uniform(-90., 90.), rng.uniform(-99., 359.), rng.uniform(0., 1100.),
+            int(rng.choice([2, 4, 10])), int(rng.integers(0, 99999)), i % 1000,
+            rng.uniform(0.1, 2.), rng.uniform(-90., 90.), str(rng.choice(STATIONS))
+        ]).encode())
+    return (template * (nobs // len(template) + 1))[:nobs]
+
+
+def main():
+    """
+    Run the benchmark
+    :return: None
+    """
+    parser = ArgumentParser(description='Benchmark the MET line decoders',
+                            formatter_class=ArgumentDefaultsHelpFormatter)
+    parser.add_argument('-n', '--nobs', help='number of observations', type=int, default=1000000)
+    args = parser.parse_args()
+
+    lines = make_lines(args.nobs)
+    usecols = [2, 3, 4, 5, 6, 7, 8, 10, 12]
+
+    # the per-line reader is slow, time it on a subset
+    subset = lines[:min(len(lines), 20000)]
+    start = time.perf_counter()
+    for line in subset:
+        met.LINE_READER.read(line.decode())
+    per_line = len(subset) / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    read_formatted(lines, met.FORTRAN_FORMAT)
+    bulk = len(lines) / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    read_formatted(lines, met.FORTRAN_FORMAT, usecols=usecols)
+    bulk_usecols = len(lines) / (time.perf_counter() - start)
+
+    print('%-28s %14s' % ('decoder', 'records/s'))
+    print('%-28s %14.0f' % ('FortranRecordReader', per_line))
+    print('%-28s %14.0f' % ('read_formatted', bulk))
+    print('%-28s %14.0f' % ('read_formatted (MET usecols)', bulk_usecols))
+
+
+if __name__ == '__main__':
+    main()
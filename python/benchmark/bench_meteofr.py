@@ -0,0 +1,133 @@
+"""
+Benchmark the Meteo France ODB listing parser on a synthetic, representative satem listing.
+The previous parser (inferred types, drop after read, DataFrame.replace for id lookups) is timed
+as the baseline.
+
+usage: python bench_meteofr.py [-n NOBS] [-r REPEAT]
+"""
+
+import os
+import time
+import tempfile
+import tracemalloc
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from argparse import ArgumentParser, ArgumentDefaultsHelpFormatter
+import fsoi.ingest.meteofr.process_MeteoFr as meteofr
+
+COLUMNS = ['date@hdr', 'time@hdr', 'seqno@hdr', 'obstype@hdr', 'codetype@hdr',
+           'instrument_type@hdr', 'sensor@hdr', 'statid@hdr', 'lat@hdr', 'lon@hdr', 'varno@body',
+           'vertco_reference_1@body', 'fg_depar@body', 'an_depar@body', 'fc_sens_obs@body',
+           'fg_error@errstat', 'obs_error@errstat']
+
+
+def write_listing(fname, nobs, seed=0):
+    """
+    Write a synthetic satem ODB listing
+    :param fname: {str} Full path to the listing
+    :param nobs: {int} Number of observations
+    :param seed: {int} Random seed
+    :return: None
+    """
+    rng = np.random.default_rng(seed)
+    sat_ids, _ = meteofr.get_satid_satname()
+    data = pd.DataFrame({
+        'date@hdr': 20150101,
+        'time@hdr': rng.integers(0, 60000, nobs),
+        'seqno@hdr': np.arange(nobs),
+        'obstype@hdr': 7,
+        'codetype@hdr': 210,
+        'instrument_type@hdr': 16,
+        'sensor@hdr': 16,
+        'statid@hdr': rng.choice(sat_ids + [999], nobs),
+        'lat@hdr': rng.uniform(-np.pi / 2, np.pi / 2, nobs).round(6),
+        'lon@hdr': rng.uniform(-np.pi, np.pi, nobs).round(6),
+        'varno@body': 119,
+        'vertco_reference_1@body': rng.integers(1, 617, nobs),
+        'fg_depar@body': rng.normal(0., 1., nobs).round(4),
+        'an_depar@body': rng.normal(0., 1., nobs).round(4),
+        'fc_sens_obs@body': rng.normal(0., 1.e-2, nobs).round(6),
+        'fg_error@errstat': rng.uniform(0.1, 2., nobs).round(4),
+        'obs_error@errstat': rng.uniform(0.1, 2., nobs).round(4)
+    }, columns=COLUMNS)
+    data.to_csv(fname, sep=' ', index=False)
+
+
+def baseline_parse_satem(fname):
+    """
+    Parse a satem listing the way process_MeteoFr did before typed, column-pruned reads
+    :param fname: {str} Full path to the listing
+    :return: {pandas.DataFrame} Parsed data (before renaming)
+    """
+    var_ids, var_names = meteofr.get_varid_varname()
+    sat_ids, sat_names = meteofr.get_satid_satname()
+    sat_names = ['IASI_%s' % sat_name for sat_name in sat_names]
+
+    data = pd.read_csv(fname, header=0, sep=r'\s+', index_col=False, quotechar="'")
+    data.drop(['date@hdr', 'time@hdr', 'seqno@hdr', 'an_depar@body', 'fg_error@errstat'], axis=1,
+              inplace=True)
+    lats = data['lat@hdr'].values * 180. / np.pi
+    lons = data['lon@hdr'].values * 180. / np.pi
+    lons[lons < 0.] = lons[lons < 0.] + 360.
+    lats[lats < -90.] = -90.
+    data['lat@hdr'] = lats
+    data['lon@hdr'] = lons
+    data['fc_sens_obs@body'] = data['fc_sens_obs@body'] * 1.e-5
+    data.drop(['obstype@hdr', 'codetype@hdr', 'instrument_type@hdr', 'sensor@hdr'], axis=1,
+              inplace=True)
+    data['statid@hdr'].replace(to_replace=sat_ids, value=sat_names, inplace=True)
+    data['varno@body'].replace(to_replace=var_ids, value=var_names, inplace=True)
+    return data
+
+
+def measure(function, *args, repeat=3):
+    """
+    Measure the best wall time and the peak traced memory of a function
+    :param function: {function} Function to measure
+    :param args: Arguments passed to the function
+    :param repeat: {int} Number of timed calls
+    :return: ({float}, {float}) Best time in seconds and peak memory in MB
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(*args)
+        times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    function(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return min(times), peak / 1024. ** 2
+
+
+def main():
+    """
+    Run the benchmark
+    :return: None
+    """
+    parser = ArgumentParser(description='Benchmark the Meteo France ODB listing parser',
+                            formatter_class=ArgumentDefaultsHelpFormatter)
+    parser.add_argument('-n', '--nobs', help='number of observations', type=int, default=500000)
+    parser.add_argument('-r', '--repeat', help='number of timed runs', type=int, default=3)
+    args = parser.parse_args()
+
+    adate = datetime(2015, 1, 1)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        fname = os.path.join(tmpdir, 'fic_odb.satem_iasi.bg.lst')
+        write_listing(fname, args.nobs)
+        print('%d observations, %.1f MB' % (args.nobs, os.path.getsize(fname) / 1024. ** 2))
+
+        base_time, base_mem = measure(baseline_parse_satem, fname, repeat=args.repeat)
+        new_time, new_mem = measure(meteofr.parse_file, adate, fname, repeat=args.repeat)
+
+    print('%-10s %10s %12s' % ('parser', 'time (s)', 'peak (MB)'))
+    print('%-10s %10.3f %12.1f' % ('baseline', base_time, base_mem))
+    print('%-10s %10.3f %12.1f' % ('typed', new_time, new_mem))
+    print('speedup: %.1fx' % (base_time / new_time))
+
+
+if __name__ == '__main__':
+    main()
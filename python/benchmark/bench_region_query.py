@@ -0,0 +1,74 @@
+"""
+Benchmark regional reads of a raw observation file: the whole file read and filtered on the
+coordinates (as lib_obimpact.select does) against a read of the cells of the region with the
+spatial index (@see lib_spatial.read_region).
+
+usage: python bench_region_query.py [-n OBSERVATIONS] [-r REPEAT]
+"""
+
+import os
+import tempfile
+import numpy as np
+from datetime import datetime
+from argparse import ArgumentParser, ArgumentDefaultsHelpFormatter
+import fsoi.stats.lib_obimpact as loi
+import fsoi.stats.lib_utils as lutils
+import fsoi.stats.lib_spatial as lspatial
+from bench_storage import best_time
+
+REGIONS = ['Tropics', 'NHPolar', [30., 60., 350., 40.]]
+
+
+def make_file(fname, n, seed=0):
+    """
+    Write a raw observation file with the spatial index
+    :param fname: {str} Full path to the file
+    :param n: {int} Number of observations
+    :param seed: {int} Random seed
+    :return: None
+    """
+    rng = np.random.default_rng(seed)
+    df = loi.columns_to_dataframe(datetime(2015, 1, 1), {
+        'PLATFORM': rng.choice(['Radiosonde', 'Aircraft', 'AMSUA_N15'], n).astype(object),
+        'OBTYPE': np.array(['u'] * n, dtype=object), 'CHANNEL': rng.integers(0, 20, n),
+        'LONGITUDE': rng.uniform(0., 360., n),
+        'LATITUDE': np.degrees(np.arcsin(rng.uniform(-1., 1., n))),
+        'PRESSURE': rng.uniform(10., 1100., n), 'IMPACT': rng.normal(0., 1.e-5, n),
+        'OMF': rng.normal(0., 1., n), 'OBERR': np.ones(n)})
+    lutils.writeHDF(fname, 'df', lspatial.add_cells(df), data_columns=['CELL'], profile='ingest',
+                    compact=True)
+
+
+def scan(fname, region):
+    """
+    Read the whole file and filter the observations of the region
+    """
+    df = lutils.readHDF(fname, 'df')
+    return df[lspatial.in_region(df, region)]
+
+
+def main():
+    """
+    Run the benchmark
+    :return: None
+    """
+    parser = ArgumentParser(description='Benchmark regional reads of raw observations',
+                            formatter_class=ArgumentDefaultsHelpFormatter)
+    parser.add_argument('-n', '--observations', help='number of observations', type=int,
+                        default=2000000)
+    parser.add_argument('-r', '--repeat', help='number of timed runs', type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        fname = os.path.join(work_dir, 'GMAO.dry.2015010100.h5')
+        make_file(fname, args.observations)
+        print('%-28s %10s %12s %12s' % ('region', 'rows', 'scan (s)', 'cells (s)'))
+        for region in REGIONS:
+            rows = len(lspatial.read_region(fname, region))
+            seconds = [best_time(function, fname, region, repeat=args.repeat)
+                       for function in [scan, lspatial.read_region]]
+            print('%-28s %10d %12.3f %12.3f' % (str(region), rows, seconds[0], seconds[1]))
+
+
+if __name__ == '__main__':
+    main()
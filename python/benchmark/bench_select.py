@@ -0,0 +1,85 @@
+"""
+Benchmark the selection of binned statistics: the successive slicing of the old select (one mask
+and one copy of the frame per criterion) against the IndexSelector (one combined mask from the
+cached index codes, and one copy).  Reports the best time of a typical map selection (cycles,
+obtypes, channels) and of a selection with latitude and pressure ranges.
+
+usage: python bench_select.py [-d DAYS] [-r REPEAT]
+"""
+
+import numpy as np
+import pandas as pd
+from argparse import ArgumentParser, ArgumentDefaultsHelpFormatter
+import fsoi.stats.lib_obimpact as loi
+from bench_storage import best_time
+
+
+def make_binned(days, seed=0):
+    """
+    Create binned statistics of one platform, as read by the map and Taylor scripts
+    :param days: {int} Number of days (4 cycles per day)
+    :param seed: {int} Random seed
+    :return: {pandas.DataFrame} TotImp indexed by DATETIME, PLATFORM, OBTYPE, CHANNEL, LATITUDE,
+             LONGITUDE and PRESSURE
+    """
+    rng = np.random.default_rng(seed)
+    index = pd.MultiIndex.from_product(
+        [pd.date_range('2015-01-01', periods=4 * days, freq='6H'), ['AMSUA'], ['Tb'],
+         np.arange(1, 16), np.arange(-87.5, 90., 5.), np.arange(2.5, 360., 5.), [-999.]],
+        names=['DATETIME', 'PLATFORM', 'OBTYPE', 'CHANNEL', 'LATITUDE', 'LONGITUDE', 'PRESSURE'])
+    return pd.DataFrame({'TotImp': rng.normal(size=len(index))}, index=index)
+
+
+def successive_select(df, cycles=None, channels=None, latitudes=None, pressures=None):
+    """
+    The previous implementation of select, for the criteria used here
+    """
+    if cycles is not None:
+        indx = df.index.get_level_values('DATETIME') == ''
+        for cycle in cycles:
+            indx = np.ma.logical_or(indx, df.index.get_level_values('DATETIME').hour == cycle)
+        df = df.iloc[indx]
+    if channels is not None:
+        indx = df.index.get_level_values('CHANNEL') == ''
+        for channel in channels:
+            indx = np.ma.logical_or(indx, df.index.get_level_values('CHANNEL') == channel)
+        df = df.iloc[indx]
+    for name, values in [('LATITUDE', latitudes), ('PRESSURE', pressures)]:
+        if values is not None:
+            indx1 = df.index.get_level_values(name) >= np.min(values)
+            indx2 = df.index.get_level_values(name) <= np.max(values)
+            df = df.iloc[np.ma.logical_and(indx1, indx2)]
+    return df
+
+
+def main():
+    """
+    Run the benchmark
+    :return: None
+    """
+    parser = ArgumentParser(description='Benchmark the selection of binned statistics',
+                            formatter_class=ArgumentDefaultsHelpFormatter)
+    parser.add_argument('-d', '--days', help='number of days of binned statistics', type=int,
+                        default=15)
+    parser.add_argument('-r', '--repeat', help='number of timed runs', type=int, default=3)
+    args = parser.parse_args()
+
+    df = make_binned(args.days)
+    print('%d rows' % len(df))
+    selections = {
+        'map': {'cycles': [0, 12], 'channels': [5, 6, 7]},
+        'ranges': {'cycles': [0, 12], 'channels': [5, 6, 7], 'latitudes': [-30., 30.],
+                   'pressures': [-1000., 0.]}
+    }
+
+    print('%-8s %12s %12s %12s' % ('select', 'old (s)', 'new (s)', 'cached (s)'))
+    selector = loi.IndexSelector(df)
+    for name, criteria in selections.items():
+        old = best_time(successive_select, df, repeat=args.repeat, **criteria)
+        new = best_time(loi.select, df, repeat=args.repeat, **criteria)
+        cached = best_time(selector.select, repeat=args.repeat, **criteria)
+        print('%-8s %12.3f %12.3f %12.3f' % (name, old, new, cached))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""
+Benchmark the storage schema of the raw observation files: the default schema (strings in the
+index, float64 columns) against the compact schema (dictionary-encoded strings, int16 channels,
+float32 columns except IMPACT).  Reports the file size and the read time of each layout.
+
+usage: python bench_storage.py [-n NOBS] [-r REPEAT]
+"""
+
+import os
+import time
+import tempfile
+import numpy as np
+from datetime import datetime
+from argparse import ArgumentParser, ArgumentDefaultsHelpFormatter
+import fsoi.stats.lib_utils as lutils
+import fsoi.stats.lib_obimpact as loi
+
+PLATFORMS = ['Radiosonde', 'Aircraft', 'AMSUA_N15', 'AMSUA_N18', 'AMSUA_N19', 'AMSUA_METOP-A',
+             'AMSUA_METOP-B', 'IASI_METOP-A', 'IASI_METOP-B', 'CRIS_NPP', 'ATMS_NPP', 'GPSRO',
+             'AMV', 'SYNOP', 'Ship', 'Buoy', 'MHS_N19', 'SSMIS_F17', 'GOES_CSR', 'AIRS_AQUA']
+OBTYPES = ['u', 'v', 't', 'q', 'ps', 'Tb', 'bend']
+
+
+def make_frame(nobs, seed=0):
+    """
+    Create a synthetic raw observation DataFrame
+    :param nobs: {int} Number of observations
+    :param seed: {int} Random seed
+    :return: {pandas.DataFrame} Observations with the default schema
+    """
+    rng = np.random.default_rng(seed)
+    return loi.columns_to_dataframe(datetime(2015, 1, 1), {
+        'PLATFORM': rng.choice(np.array(PLATFORMS, dtype=object), nobs),
+        'OBTYPE': rng.choice(np.array(OBTYPES, dtype=object), nobs),
+        'CHANNEL': rng.integers(-999, 617, nobs),
+        'LONGITUDE': rng.uniform(0., 360., nobs),
+        'LATITUDE': rng.uniform(-90., 90., nobs),
+        'PRESSURE': rng.uniform(10., 1100., nobs),
+        'IMPACT': rng.normal(0., 1.e-5, nobs),
+        'OMF': rng.normal(0., 1., nobs),
+        'OBERR': rng.uniform(0.1, 2., nobs)
+    })
+
+
+def best_time(function, *args, repeat=3, **kwargs):
+    """
+    Measure the best wall time of a function
+    :param function: {function} Function to measure
+    :param args: Arguments passed to the function
+    :param repeat: {int} Number of timed calls
+    :param kwargs: Keyword arguments passed to the function
+    :return: {float} Best time in seconds
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(*args, **kwargs)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    """
+    Run the benchmark
+    :return: None
+    """
+    parser = ArgumentParser(description='Benchmark the raw observation storage schema',
+                            formatter_class=ArgumentDefaultsHelpFormatter)
+    parser.add_argument('-n', '--nobs', help='number of observations', type=int, default=1000000)
+    parser.add_argument('-r', '--repeat', help='number of timed reads', type=int, default=3)
+    args = parser.parse_args()
+
+    df = make_frame(args.nobs)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        default = os.path.join(tmpdir, 'default.h5')
+        compact = os.path.join(tmpdir, 'compact.h5')
+        lutils.writeHDF(default, 'df', df, complevel=1, complib='zlib', fletcher32=True)
+        lutils.writeHDF(compact, 'df', df, complevel=1, complib='zlib', fletcher32=True,
+                        compact=True)
+
+        results = [
+            ('default', os.path.getsize(default), best_time(lutils.readHDF, default, 'df',
+                                                            repeat=args.repeat)),
+            ('compact', os.path.getsize(compact), best_time(lutils.readHDF, compact, 'df',
+                                                            repeat=args.repeat)),
+            ('compact (no upcast)', os.path.getsize(compact),
+             best_time(lutils.readHDF, compact, 'df', upcast=False, repeat=args.repeat))
+        ]
+
+    print('%d observations' % args.nobs)
+    print('%-20s %10s %10s' % ('schema', 'size (MB)', 'read (s)'))
+    for name, size, seconds in results:
+        print('%-20s %10.1f %10.3f' % (name, size / 1024. ** 2, seconds))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+"""
+Benchmark the summary figures of centers: one summaryplot figure per quantity (as the batch
+job and summary_fsoi did, saving png, eps and pdf, or only png) against the SummaryRenderer (one
+figure on an Agg canvas, updated and saved as png for each quantity), and against a RenderPool
+rendering the (center, quantity) figures on worker processes.
+
+usage: python bench_summary_render.py [-p PLATFORMS] [-c CENTERS] [-w WORKERS] [-r REPEAT]
+"""
+
+import os
+import tempfile
+import matplotlib
+matplotlib.use('Agg')
+import numpy as np
+import pandas as pd
+from argparse import ArgumentParser, ArgumentDefaultsHelpFormatter
+from matplotlib import pyplot as plt
+import fsoi.stats.lib_obimpact as loi
+import fsoi.stats.lib_utils as lutils
+from fsoi.plots.summary_renderer import SummaryRenderer, QUANTITIES
+import fsoi.plots.render_pool as rpool
+from bench_storage import best_time
+
+
+def make_summary(platforms, seed=0):
+    """
+    Create the time-averaged summary metrics of a center
+    :param platforms: {int} Number of platforms
+    :param seed: {int} Random seed
+    :return: ({pandas.DataFrame}, {pandas.DataFrame}) Summary metrics and standard deviations
+    """
+    rng = np.random.default_rng(seed)
+    index = pd.Index(['Platform_%02d' % i for i in range(platforms)], name='PLATFORM')
+    obcnt = rng.integers(100, 2000000, platforms)
+    df = pd.DataFrame({'TotImp': rng.normal(size=platforms) * 1.e4, 'ObCnt': obcnt,
+                       'ObCntBen': (obcnt * rng.uniform(0.4, 0.6, platforms)).astype(int),
+                       'ObCntNeu': (obcnt * rng.uniform(0., 0.1, platforms)).astype(int)},
+                      index=index)
+    return loi.summarymetrics(df), df[['TotImp']].abs() * 0.1
+
+
+def plot_each(centers, work_dir, formats):
+    """
+    Create a summaryplot figure for each center and quantity
+    """
+    for center, (df, std) in centers.items():
+        for qty in QUANTITIES:
+            plot_options = loi.getPlotOpt(qty, cycle=[0], center=center, savefigure=False,
+                                          platform='', domain='Global')
+            loi.summaryplot(df.copy(), qty=qty, plotOpt=plot_options, std=std)
+            lutils.savefigure(fname=os.path.join(work_dir, '%s_%s' % (center, qty)),
+                              format=formats)
+            plt.close('all')
+
+
+def render_all(centers, work_dir):
+    """
+    Render the figures of all quantities of each center with a new SummaryRenderer
+    """
+    for center, (df, std) in centers.items():
+        SummaryRenderer().render(
+            df, {qty: os.path.join(work_dir, '%s_%s' % (center, qty)) for qty in QUANTITIES},
+            std=std, cycle=[0], center=center, platform='', domain='Global')
+
+
+def render_pool(centers, work_dir, workers):
+    """
+    Render the figures of each center and quantity on a new RenderPool
+    """
+    with rpool.RenderPool(workers) as pool:
+        for center, (df, std) in centers.items():
+            for qty in QUANTITIES:
+                pool.submit_summary(os.path.join(work_dir, '%s_%s' % (center, qty)), df, qty,
+                                    std=std, cycle=[0], center=center, platform='',
+                                    domain='Global')
+        rpool.write(pool.collect())
+
+
+def main():
+    """
+    Run the benchmark
+    :return: None
+    """
+    parser = ArgumentParser(description='Benchmark the summary figures of a center',
+                            formatter_class=ArgumentDefaultsHelpFormatter)
+    parser.add_argument('-p', '--platforms', help='number of platforms', type=int, default=40)
+    parser.add_argument('-c', '--centers', help='number of centers', type=int, default=1)
+    parser.add_argument('-w', '--workers', help='number of RenderPool workers (0: CPUs)',
+                        type=int, default=0)
+    parser.add_argument('-r', '--repeat', help='number of timed runs', type=int, default=3)
+    args = parser.parse_args()
+
+    centers = {'CENTER%d' % c: make_summary(args.platforms, seed=c) for c in range(args.centers)}
+    with tempfile.TemporaryDirectory() as work_dir:
+        print('%-28s %10s' % ('figures', 'time (s)'))
+        for name, function, fargs in [
+                ('summaryplot (png, eps, pdf)', plot_each, (['png', 'eps', 'pdf'],)),
+                ('summaryplot (png)', plot_each, (['png'],)),
+                ('SummaryRenderer (png)', render_all, ()),
+                ('RenderPool (png)', render_pool, (args.workers,))]:
+            seconds = best_time(function, centers, work_dir, *fargs, repeat=args.repeat)
+            print('%-28s %10.3f' % (name, seconds))
+
+
+if __name__ == '__main__':
+    main()
@@ -14,12 +14,14 @@ setup(
             'fsoi.web'],
   requires=['pyyaml', 'boto3', 'botocore', 'certifi', 'matplotlib', 'numpy', 'pandas', 'requests',
             'urllib3', 'pyyaml', 'fortranformat', 'netCDF4'],
+  extras_require={'parquet': ['pyarrow']},
   package_dir={'fsoi': 'src/fsoi'},
   package_data={
     'fsoi': [
       'resources/fsoi/ingest/nrl/*.yaml',
       'resources/fsoi/ingest/gmao/*.yaml',
-      'resources/fsoi/*.yaml'
+      'resources/fsoi/*.yaml',
+      'resources/fsoi/config.pickle'
     ]
   },
   include_package_data=True,
@@ -34,7 +36,11 @@ setup(
       'process_gmao=fsoi.ingest.gmao.process_gmao:main',
       'ingest_gmao=fsoi.ingest.gmao.__init__:download_and_process_gmao',
 
+      'ingest=fsoi.ingest.engine:main',
+
       'process_stats=fsoi.stats.process_stats:main',
+      'convert_storage=fsoi.stats.convert_storage:main',
+      'build_cube=fsoi.stats.build_cube:main',
       'batch_wrapper=fsoi.web.batch_wrapper:main'
     ]
   }
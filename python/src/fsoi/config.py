@@ -0,0 +1,92 @@
+"""
+Registry of the YAML configuration resources (platforms, ingest constants).  Each resource is
+parsed once per process and memoized.  A prebuilt form of all resources (a pickle, generated at
+build time with `python -m fsoi.config`) is used instead of parsing the YAML, as long as it was
+built from the same YAML.
+"""
+
+import os
+import pickle
+import hashlib
+import pkgutil
+from functools import lru_cache
+from fsoi import log
+
+# configuration resources by name
+RESOURCES = {
+    'platforms': 'resources/fsoi/platforms.yaml',
+    'nrl_ingest': 'resources/fsoi/ingest/nrl/nrl_ingest.yaml',
+    'gmao_ingest': 'resources/fsoi/ingest/gmao/gmao_ingest.yaml'
+}
+
+# prebuilt form of the resources: {name: (sha1 of the YAML, parsed resource)}
+PREBUILT = 'resources/fsoi/config.pickle'
+
+
+def get(name):
+    """
+    Get a parsed configuration resource.  The object is shared, callers must not modify it.
+    :param name: {str} Name of the resource, @see RESOURCES
+    :return: {dict} The parsed resource
+    """
+    if name not in RESOURCES:
+        raise ValueError('Unknown configuration resource: %s' % name)
+    return _load(name)
+
+
+@lru_cache(maxsize=None)
+def _load(name):
+    """
+    Load a configuration resource from the prebuilt form, or parse its YAML
+    :param name: {str} Name of the resource
+    :return: {dict} The parsed resource
+    """
+    data = pkgutil.get_data('fsoi', RESOURCES[name])
+    digest = hashlib.sha1(data).hexdigest()
+
+    prebuilt = _prebuilt().get(name)
+    if prebuilt is not None and prebuilt[0] == digest:
+        return prebuilt[1]
+
+    import yaml
+    return yaml.full_load(data)
+
+
+@lru_cache(maxsize=None)
+def _prebuilt():
+    """
+    Load the prebuilt form of the resources
+    :return: {dict} Prebuilt resources, empty if there are none
+    """
+    try:
+        return pickle.loads(pkgutil.get_data('fsoi', PREBUILT))
+    except (IOError, OSError, ValueError, pickle.UnpicklingError):
+        return {}
+
+
+def build(path=None):
+    """
+    Parse all of the configuration resources and write the prebuilt form
+    :param path: {str} Full path to the output file (default: the PREBUILT resource)
+    :return: {str} Full path to the output file
+    """
+    import yaml
+
+    if path is None:
+        path = os.path.join(os.path.dirname(os.path.abspath(__file__)), PREBUILT)
+
+    prebuilt = {}
+    for name, resource in RESOURCES.items():
+        data = pkgutil.get_data('fsoi', resource)
+        prebuilt[name] = (hashlib.sha1(data).hexdigest(), yaml.full_load(data))
+
+    # protocol 4 is readable by the python 3.7 of the deployed images
+    with open(path, 'wb') as f:
+        pickle.dump(prebuilt, f, protocol=4)
+    log.info('Wrote the prebuilt configuration: %s' % path)
+
+    return path
+
+
+if __name__ == '__main__':
+    build()
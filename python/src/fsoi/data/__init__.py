@@ -1,4 +1,4 @@
 """
 FSOI Data Management
 """
-__all__ = ['datastore', 's3_datastore']
+__all__ = ['datastore', 's3_datastore', 'tee']
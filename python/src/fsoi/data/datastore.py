@@ -41,6 +41,15 @@ class DataStore:
         """
         raise NotImplementedError('save_from_local_file not implemented')
 
+    def save_from_stream(self, stream, target):
+        """
+        Save data to the data store from a readable binary stream
+        :param stream: {object} A file-like object with a read method, read until EOF
+        :param target: {dict} A dictionary with attributes to describe the data store target
+        :return: {bool} True if successful, otherwise False
+        """
+        raise NotImplementedError('save_from_stream not implemented')
+
     def load_to_local_file(self, source, local_file):
         """
         Load data from the data store to a local file
@@ -87,6 +96,7 @@ class DataStoreOperation:
         'list_data_store',
         'load_to_local_file',
         'save_from_local_file',
+        'save_from_stream',
         'save_from_http',
         'save_from_ftp'
     ]
@@ -138,8 +148,8 @@ class DataStoreOperation:
 
         except Exception as e:
             # log any exceptions
-            log.error('Failed to execute DataStoreOperation: %s => %s' %
-                      (self.operation, ','.join(self.parameters)), e)
+            log.error('Failed to execute DataStoreOperation: %s => %s: %s' %
+                      (self.operation, ','.join([str(p) for p in self.parameters]), e))
 
             # mark thread as failed and finished
             self.success = False
@@ -179,33 +189,52 @@ class ThreadedDataStore(DataStore):
         Save data from the URL to the data store
         :param url: {str} URL with HTTPS or HTTP protocol
         :param target: {dict} A dictionary with attributes to describe the data store target
-        :return: {bool} True if successful, otherwise False
+        :return: {concurrent.futures.Future} Done when the operation has finished
         """
         operation = DataStoreOperation(self.datastore, 'save_from_http', [url, target])
         self.operations.append(operation)
-        self.futures.append(self.thread_pool.submit(operation.run))
+        future = self.thread_pool.submit(operation.run)
+        self.futures.append(future)
+        return future
 
     def save_from_ftp(self, url, target):
         """
         Save data from the URL to the data store
         :param url: {str} URL with FTP protocol
         :param target: {dict} A dictionary with attributes to describe the data store target
-        :return:
+        :return: {concurrent.futures.Future} Done when the operation has finished
         """
         operation = DataStoreOperation(self.datastore, 'save_from_ftp', [url, target])
         self.operations.append(operation)
-        self.futures.append(self.thread_pool.submit(operation.run))
+        future = self.thread_pool.submit(operation.run)
+        self.futures.append(future)
+        return future
 
     def save_from_local_file(self, local_file, target):
         """
         Save data to the data store from a local file
         :param local_file: {str} Full path to the local file
         :param target: {dict} A dictionary with attributes to describe the data store target
-        :return: {bool} True if successful, otherwise False
+        :return: {concurrent.futures.Future} Done when the operation has finished
         """
         operation = DataStoreOperation(self.datastore, 'save_from_local_file', [local_file, target])
         self.operations.append(operation)
-        self.futures.append(self.thread_pool.submit(operation.run))
+        future = self.thread_pool.submit(operation.run)
+        self.futures.append(future)
+        return future
+
+    def save_from_stream(self, stream, target):
+        """
+        Save data to the data store from a readable binary stream
+        :param stream: {object} A file-like object with a read method, read until EOF
+        :param target: {dict} A dictionary with attributes to describe the data store target
+        :return: {concurrent.futures.Future} Done when the operation has finished
+        """
+        operation = DataStoreOperation(self.datastore, 'save_from_stream', [stream, target])
+        self.operations.append(operation)
+        future = self.thread_pool.submit(operation.run)
+        self.futures.append(future)
+        return future
 
     def load_to_local_file(self, source, local_file):
         """
@@ -213,38 +242,46 @@ class ThreadedDataStore(DataStore):
         :param source: {dict} A dictionary with attributes to describe the data store source
         :param local_file: {str} Full path to the local file (directories will be created if they
                                  do not already exist.
-        :return: True if successful, otherwise False
+        :return: {concurrent.futures.Future} Done when the operation has finished
         """
         operation = DataStoreOperation(self.datastore, 'load_to_local_file', [source, local_file])
         self.operations.append(operation)
-        self.futures.append(self.thread_pool.submit(operation.run))
+        future = self.thread_pool.submit(operation.run)
+        self.futures.append(future)
+        return future
 
     def list_data_store(self, filters):
         """
         Get a list of available data
         :param filters: {dict} A dictionary with options for filtering the data sources
-        :return: {list} A list of dictionaries that describe data sources
+        :return: {concurrent.futures.Future} Done when the operation has finished
         """
         operation = DataStoreOperation(self.datastore, 'list_data_store', [filters])
         self.operations.append(operation)
-        self.futures.append(self.thread_pool.submit(operation.run))
+        future = self.thread_pool.submit(operation.run)
+        self.futures.append(future)
+        return future
 
     def data_exist(self, target):
         """
         Check if the specified target exists
         :param target: {dict} A dictionary with attributes to describe the data store target
-        :return: True if the target exists, otherwise False
+        :return: {concurrent.futures.Future} Done when the operation has finished
         """
         operation = DataStoreOperation(self.datastore, 'data_exist', [target])
         self.operations.append(operation)
-        self.futures.append(self.thread_pool.submit(operation.run))
+        future = self.thread_pool.submit(operation.run)
+        self.futures.append(future)
+        return future
 
     def delete(self, target):
         """
         Delete the specified target from the data store
         :param target: {dict} A dictionary with attributes to describe the data store target
-        :return: True if successfully deleted, otherwise False
+        :return: {concurrent.futures.Future} Done when the operation has finished
         """
         operation = DataStoreOperation(self.datastore, 'delete', [target])
         self.operations.append(operation)
-        self.futures.append(self.thread_pool.submit(operation.run))
+        future = self.thread_pool.submit(operation.run)
+        self.futures.append(future)
+        return future
@@ -198,6 +198,34 @@ class S3DataStore(DataStore):
             log.error('Failed to save data from local file', e)
             return False
 
+    def save_from_stream(self, stream, target):
+        """
+        Save data to the data store from a readable binary stream
+        :param stream: {object} A file-like object with a read method, read until EOF
+        :param target: {dict} A dictionary with attributes to describe the data store target
+        :return: {bool} True if successful, otherwise False
+        """
+        try:
+            # validate the target descriptor
+            if not self.__validate_descriptor(target):
+                return False
+
+            # ensure that the target has bucket and key attributes
+            bucket, key = self.__to_bucket_and_key(target)
+
+            # get an S3 client
+            s3_client = self.__get_s3_client()
+
+            # upload the stream to S3 (multi-part upload as data arrive)
+            s3_client.upload_fileobj(Fileobj=stream, Bucket=bucket, Key=key)
+
+            # check to see if the target exists
+            return self.data_exist(target)
+
+        except Exception as e:
+            log.error('Failed to save data from stream', e)
+            return False
+
     def load_to_local_file(self, source, local_file):
         """
         Load data from the data store to a local file
@@ -0,0 +1,172 @@
+"""
+A byte stream that is archived to a data store in the background while it is consumed locally
+"""
+
+from queue import Queue
+from queue import Full
+from fsoi.data.datastore import ThreadedDataStore
+
+
+class ChunkReader:
+    """
+    A read-only, non-seekable file-like object that returns the chunks put on a bounded queue.
+    The producer blocks when the queue is full, so memory use is limited to max_chunks chunks.
+    """
+    def __init__(self, max_chunks=64):
+        """
+        Create a ChunkReader
+        :param max_chunks: {int} The maximum number of chunks to buffer before the producer blocks
+        """
+        self.queue = Queue(maxsize=max_chunks)
+        self.buffer = bytearray()
+        self.eof = False
+        self.discarded = False
+
+    def put(self, chunk):
+        """
+        Add a chunk of data (or None for EOF, or an Exception to fail the reader) to the queue
+        :param chunk: {bytes|None|Exception} The next chunk
+        :return: None
+        """
+        while not self.discarded:
+            try:
+                self.queue.put(chunk, timeout=1)
+                return
+            except Full:
+                continue
+
+    def discard(self):
+        """
+        Stop buffering data for this reader, e.g. when the consumer has failed or finished early
+        :return: None
+        """
+        self.discarded = True
+        while not self.queue.empty():
+            self.queue.get_nowait()
+
+    def read(self, size=-1):
+        """
+        Read up to size bytes, blocking until enough data arrive or the stream ends
+        :param size: {int} Number of bytes to read, or -1 to read to the end of the stream
+        :return: {bytes} The data, or b'' at the end of the stream
+        """
+        while not self.eof and (size is None or size < 0 or len(self.buffer) < size):
+            chunk = self.queue.get()
+            if chunk is None:
+                self.eof = True
+            elif isinstance(chunk, Exception):
+                self.eof = True
+                self.buffer.clear()
+                raise IOError('Stream aborted: %s' % chunk)
+            else:
+                self.buffer += chunk
+
+        if size is None or size < 0:
+            size = len(self.buffer)
+        data = bytes(self.buffer[:size])
+        del self.buffer[:size]
+        return data
+
+    def readable(self):
+        """
+        :return: {bool} True
+        """
+        return True
+
+    def seekable(self):
+        """
+        :return: {bool} False
+        """
+        return False
+
+    def close(self):
+        """
+        Close the reader and stop buffering data
+        :return: None
+        """
+        self.discard()
+
+
+class TeeStream:
+    """
+    Split a byte stream in two: one branch is saved to a data store on a background thread, and the
+    other branch can be read locally (e.g. by bz2 or a parser) while the data are still arriving.
+    The producer calls write for each chunk and then close, or abort if the transfer failed.
+    """
+    def __init__(self, datastore, target, local=True, max_chunks=64):
+        """
+        Create a TeeStream and start archiving in the background
+        :param datastore: {DataStore} The data store that will archive the stream
+        :param target: {dict} A dictionary with attributes to describe the data store target
+        :param local: {bool} False to only archive the stream (no local reader)
+        :param max_chunks: {int} The maximum number of chunks to buffer for each branch
+        """
+        self.target = target
+        self.size = 0
+        self.archive = ChunkReader(max_chunks)
+        self.local = ChunkReader(max_chunks) if local else None
+
+        # start the archive operation; stop buffering for it if it fails before reading everything
+        self.datastore = ThreadedDataStore(datastore, 1)
+        self.datastore.save_from_stream(self.archive, target)
+        self.datastore.futures[-1].add_done_callback(lambda future: self.archive.discard())
+
+    def write(self, chunk):
+        """
+        Send a chunk of data to both branches
+        :param chunk: {bytes} The data
+        :return: None
+        """
+        self.size += len(chunk)
+        self.archive.put(chunk)
+        if self.local is not None:
+            self.local.put(chunk)
+
+    def close(self):
+        """
+        Mark the end of the stream
+        :return: None
+        """
+        self.archive.put(None)
+        if self.local is not None:
+            self.local.put(None)
+
+    def abort(self, reason):
+        """
+        Abort the stream, the archive will not be saved and the local reader will raise an IOError
+        :param reason: {str|Exception} The reason for aborting
+        :return: None
+        """
+        error = reason if isinstance(reason, Exception) else IOError(reason)
+        self.archive.put(error)
+        if self.local is not None:
+            self.local.put(error)
+
+    def read(self, size=-1):
+        """
+        Read from the local branch
+        :param size: {int} Number of bytes to read, or -1 to read to the end of the stream
+        :return: {bytes} The data, or b'' at the end of the stream
+        """
+        return self.local.read(size)
+
+    def readable(self):
+        """
+        :return: {bool} True if there is a local branch
+        """
+        return self.local is not None
+
+    def seekable(self):
+        """
+        :return: {bool} False
+        """
+        return False
+
+    def join(self):
+        """
+        Wait for the archive branch to finish
+        :return: {bool} True if the stream was saved to the data store, otherwise False
+        """
+        self.datastore.join()
+        operation = self.datastore.operations[-1]
+        return operation.success and operation.response is True
@@ -1,4 +1,4 @@
 """
 FSOI Ingest
 """
-__all__ = ['emc', 'gmao', 'jma', 'met', 'meteofr', 'nrl']
+__all__ = ['emc', 'engine', 'fortran_io', 'gmao', 'jma', 'lookup', 'met', 'meteofr', 'nrl']
@@ -1,4 +1,4 @@
 """
 FSOI Ingest EMC
 """
-__all__ = ['process_EMC']
+__all__ = ['process_EMC', 'read_emc']
@@ -2,7 +2,10 @@ import os
 from datetime import datetime
 from argparse import ArgumentParser, ArgumentDefaultsHelpFormatter
 import numpy as np
-from emc import emc
+from fsoi.ingest.emc import read_emc as emc
+from fsoi.ingest.lookup import map_unique
+from fsoi.ingest.engine import Decoder
+from fsoi.ingest.engine import register
 import fsoi.stats.lib_utils as lutils
 import fsoi.stats.lib_obimpact as loi
 
@@ -110,14 +113,58 @@ def get_platform_con(plat):
         platform = 'RAPIDSCAT_Wind'
     elif plat in map(str, [3, 4, 41, 42, 43, 722, 723, 740, 741, 742, 743, 744, 745]):
         platform = 'GPSRO'
-    elif plat in map(str, list(np.arange(701, 722))) + map(str, list(np.arange(723, 739))):
+    elif plat in list(map(str, list(np.arange(701, 722)))) + list(map(str, list(np.arange(723, 739)))):
         platform = 'Ozone'
-    else:
-        print('UNKNOWN : ', plat)
 
     return platform
 
 
+def decode_emc(fname):
+    """
+    Decode an EMC impact file into columns
+    :param fname: {str} Full path to the raw file
+    :return: {dict} An array for each column, @see fsoi.ingest.engine.COLUMNS
+    """
+    idate, nobscon, nobsoz, nobssat, npred, nens = emc.get_header(fname, endian='big')
+    nobs = nobscon + nobsoz + nobssat
+    obtype, platform, chan, lat, lon, lev, omf, oberr, imp = emc.get_data(fname, nobs, npred, nens,
+                                                                          endian='big')
+    nobs = len(obtype)
+    nnonrad = min(nobscon + nobsoz, nobs)
+
+    # resolve the platform names once per unique station type or satellite
+    plat = np.concatenate([map_unique(get_platform_con, platform[:nnonrad]).astype(object),
+                           map_unique(get_platform_rad, platform[nnonrad:]).astype(object)])
+    unknown = plat[:nnonrad] == 'UNKNOWN'
+    if unknown.any():
+        names, counts = np.unique(platform[:nnonrad][unknown], return_counts=True)
+        for name, count in zip(names, counts):
+            print('UNKNOWN : %s (%d obs)' % (name, count))
+
+    lon = np.where(lon < 0.0, lon + 360.0, lon)
+
+    return {'PLATFORM': plat, 'OBTYPE': obtype, 'CHANNEL': chan, 'LONGITUDE': lon,
+            'LATITUDE': lat, 'PRESSURE': lev, 'IMPACT': imp[:, 0], 'OMF': omf, 'OBERR': oberr}
+
+
+@register('EMC')
+class EMCDecoder(Decoder):
+    """
+    Decode the EMC impact file of a cycle
+    """
+    pattern = 'osense_%(date)s_24.dat'
+
+    def decode(self, source, date, norm):
+        """
+        Decode a raw file
+        :param source: {str} Full path to the raw file
+        :param date: {str} Date string in the format YYYYMMDDHH
+        :param norm: {str} dry or moist
+        :return: {generator} Yields the columns of the file
+        """
+        yield decode_emc(source)
+
+
 def main():
     """
 
@@ -135,35 +182,11 @@ def main():
     fname_out = args.output
     adate = datetime.strptime(args.adate, '%Y%m%d%H')
 
-    idate, nobscon, nobsoz, nobssat, npred, nens = emc.get_header(fname, endian='big')
-    nobs = nobscon + nobsoz + nobssat
-    obtype, platform, chan, lat, lon, lev, omf, oberr, imp = emc.get_data(fname, nobs, npred, nens,
-                                                                          endian='big')
-
-    obtype = (str(obtype)).replace('\x00', '')[:-1].split('|')
-    platform = (str(platform)).replace('\x00', '')[:-1].split('|')
-
-    bufr = []
-    for o in range(nobs):
-
-        obtyp = ''.join(obtype[o]).strip()
-        platf = ''.join(platform[o]).strip()
-        if o < (nobscon + nobsoz):
-            plat = get_platform_con(platf)
-            if plat in 'UNKNOWN':
-                print(o + 1, plat, platf)
-        else:
-            plat = get_platform_rad(platf)
-
-        if lon[o] < 0.0:
-            lon[o] += 360.0
-
-        line = [plat, obtyp, chan[o], lon[o], lat[o], lev[o], imp[o][0], omf[o], oberr[o]]
-
-        bufr.append(line)
+    columns = decode_emc(fname)
+    nobs = len(columns['IMPACT'])
 
-    if bufr != []:
-        df = loi.list_to_dataframe(adate, bufr)
+    if nobs > 0:
+        df = loi.columns_to_dataframe(adate, columns)
         if os.path.isfile(fname_out): os.remove(fname_out)
         lutils.writeHDF(fname_out, 'df', df, complevel=1, complib='zlib', fletcher32=True)
 
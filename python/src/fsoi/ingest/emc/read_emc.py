@@ -0,0 +1,106 @@
+"""
+Read EMC observation sensitivity files with numpy.  This is a drop-in replacement for the f2py
+emc module (fortran/src/ingest/emc/emc.f90) that does not require a Fortran compiler.
+"""
+
+import numpy as np
+from fsoi.ingest.fortran_io import read_records
+from fsoi.ingest.fortran_io import decode_strings
+
+# diag_header type in emc.f90
+HEADER = [
+    ('idate', 'i4'),
+    ('obsnum', 'i4'),
+    ('convnum', 'i4'),
+    ('oznum', 'i4'),
+    ('satnum', 'i4'),
+    ('npred', 'i4'),
+    ('nanals', 'i4')
+]
+
+# diag_data type in emc.f90
+DATA = [
+    ('obfit_prior', 'f4'),
+    ('obsprd_prior', 'f4'),
+    ('ensmean_obnobc', 'f4'),
+    ('ensmean_ob', 'f4'),
+    ('ob', 'f4'),
+    ('oberrvar', 'f4'),
+    ('lon', 'f4'),
+    ('lat', 'f4'),
+    ('pres', 'f4'),
+    ('time', 'f4'),
+    ('oberrvar_orig', 'f4'),
+    ('stattype', 'i4'),
+    ('obtype', 'S20'),
+    ('indxsat', 'i4'),
+    ('osense_kin', 'f4'),
+    ('osense_dry', 'f4'),
+    ('osense_moist', 'f4')
+]
+
+
+def get_header(fname, endian='big'):
+    """
+    Read the header from an EMC file
+    :param fname: {str} Full path to the EMC file
+    :param endian: {str} big, little or native
+    :return: {tuple} idate, nobscon, nobsoz, nobssat, npred, nens
+    """
+    header, _ = read_records(fname, HEADER, 1, endian=endian)
+    if header.size != 1:
+        raise IOError('Cannot read header: %s' % fname)
+    header = header[0]
+
+    return (int(header['idate']), int(header['convnum']), int(header['oznum']),
+            int(header['satnum']), int(header['npred']), int(header['nanals']))
+
+
+def get_data(fname, nobstot, npred, nens, endian='big'):
+    """
+    Read the observations from an EMC file
+    :param fname: {str} Full path to the EMC file
+    :param nobstot: {int} Number of observations to read
+    :param npred: {int} Number of bias correction predictors
+    :param nens: {int} Number of ensemble members
+    :param endian: {str} big, little or native
+    :return: {tuple} obtype, platform, channel, lat, lon, lev, omb, oberr, impact; obtype and
+             platform are arrays of str and impact has columns [dry, moist, kinetic]
+    """
+    header, offset = read_records(fname, HEADER, 1, endian=endian)
+    if header.size != 1:
+        raise IOError('Cannot read header: %s' % fname)
+    nnonrad = int(header[0]['convnum']) + int(header[0]['oznum'])
+
+    # non-radiance records are followed by the ensemble priors, radiances also by the predictors
+    nonrad_fields = DATA + [('tmpanal', 'f4', (nens,))]
+    rad_fields = nonrad_fields + [('tmppred', 'f4', (npred + 1,))]
+    nonrad, offset = read_records(fname, nonrad_fields, min(nobstot, nnonrad), offset, endian)
+    rad, offset = read_records(fname, rad_fields, nobstot - nonrad.size, offset, endian)
+
+    # non-radiance: obtype is the element and platform is the station type (I5)
+    stattype = nonrad['stattype']
+    platform_nonrad = np.char.mod('%d', stattype)
+    platform_nonrad[(stattype > 99999) | (stattype < -9999)] = '*****'
+    obtype_nonrad = decode_strings(nonrad['obtype'])
+
+    # radiance: obtype is Tb and platform is the satellite/sensor name
+    platform_rad = decode_strings(rad['obtype'])
+    obtype_rad = np.full(rad.size, 'Tb', dtype=platform_rad.dtype)
+
+    obtype = np.concatenate([obtype_nonrad, obtype_rad])
+    platform = np.concatenate([platform_nonrad, platform_rad])
+    channel = np.concatenate([np.full(nonrad.size, -999, dtype=np.int32),
+                              rad['indxsat'].astype(np.int32)])
+
+    def column(name):
+        return np.concatenate([nonrad[name], rad[name]]).astype(np.float32)
+
+    lat = column('lat')
+    lon = column('lon')
+    lev = column('pres')
+    omb = column('obfit_prior')
+    oberr = column('oberrvar')
+    impact = np.stack([column('osense_dry'), column('osense_moist'), column('osense_kin')], axis=1)
+
+    return obtype, platform, channel, lat, lon, lev, omb, oberr, impact
@@ -0,0 +1,311 @@
+"""
+Common ingest pipeline for all centers.  Each center registers a Decoder plugin that lists the raw
+sources of a cycle and decodes each source into chunks of columns.  The engine decodes the sources
+in parallel, appends the chunks to the HDF file, computes the bulk statistics products from the
+chunks, and uploads the products.
+"""
+
+import os
+import glob
+import importlib
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from argparse import ArgumentParser
+from argparse import ArgumentDefaultsHelpFormatter as HelpFormatter
+import pandas as pd
+import fsoi.stats.lib_utils as lutils
+import fsoi.stats.lib_obimpact as loi
+import fsoi.stats.lib_aggregate as lagg
+import fsoi.stats.lib_spatial as lspatial
+from fsoi import log
+
+# columns of every decoded chunk, @see fsoi.stats.lib_obimpact.columns_to_dataframe
+COLUMNS = ['PLATFORM', 'OBTYPE', 'CHANNEL', 'LONGITUDE', 'LATITUDE', 'PRESSURE', 'IMPACT', 'OMF',
+           'OBERR']
+
+# modules that register the decoder of each center, imported when the center is first used
+PLUGINS = {
+    'EMC': 'fsoi.ingest.emc.process_EMC',
+    'GMAO': 'fsoi.ingest.gmao.process_gmao',
+    'JMA_adj': 'fsoi.ingest.jma.process_JMA',
+    'JMA_ens': 'fsoi.ingest.jma.process_JMA',
+    'MET': 'fsoi.ingest.met.process_MET',
+    'MeteoFr': 'fsoi.ingest.meteofr.process_MeteoFr',
+    'NRL': 'fsoi.ingest.nrl.process_nrl'
+}
+
+# strings in the HDF tables are fixed-width, leave room for the values in later chunks
+MIN_ITEMSIZE = {'PLATFORM': 64, 'OBTYPE': 16}
+
+_decoders = {}
+
+
+class Decoder:
+    """
+    Base class of the center decoder plugins
+    """
+    # glob pattern of the raw files in the input directory, @see Decoder.sources
+    pattern = None
+
+    def sources(self, date, norm, indir):
+        """
+        List the raw sources of a cycle.  The default lists the files in the input directory that
+        match the pattern, formatted with date (YYYYMMDDHH), ymd (YYYYMMDD), hour (HH) and norm.
+        :param date: {str} Date string in the format YYYYMMDDHH
+        :param norm: {str} dry or moist
+        :param indir: {str} Full path to the input directory
+        :return: {list} Picklable source descriptors, usually full paths to files
+        """
+        pattern = self.pattern % {'date': date, 'ymd': date[:8], 'hour': date[8:10], 'norm': norm}
+        return sorted(glob.glob(os.path.join(indir, pattern)))
+
+    def decode(self, source, date, norm):
+        """
+        Decode a raw source into chunks of columns
+        :param source: {object} A source descriptor, @see Decoder.sources
+        :param date: {str} Date string in the format YYYYMMDDHH
+        :param norm: {str} dry or moist
+        :return: {generator} Yields dictionaries with an array for each of the COLUMNS
+        """
+        raise NotImplementedError('decode not implemented')
+
+
+def register(center):
+    """
+    Class decorator that registers a Decoder plugin for a center
+    :param center: {str} Center name, e.g. NRL
+    :return: {function} The decorator
+    """
+    def decorator(cls):
+        _decoders[center] = cls
+        return cls
+    return decorator
+
+
+def get_decoder(center):
+    """
+    Get the decoder plugin for a center, importing the plugin module if needed
+    :param center: {str} Center name, @see PLUGINS
+    :return: {Decoder} The decoder
+    """
+    if center not in _decoders and center in PLUGINS:
+        importlib.import_module(PLUGINS[center])
+    if center not in _decoders:
+        raise ValueError('No ingest plugin registered for center: %s' % center)
+    return _decoders[center]()
+
+
+def _decode_source(center, source, date, norm):
+    """
+    Decode all chunks of a source (run in a worker process)
+    :param center: {str} Center name
+    :param source: {object} A source descriptor
+    :param date: {str} Date string in the format YYYYMMDDHH
+    :param norm: {str} dry or moist
+    :return: {list} The chunks of columns
+    """
+    log.debug('decoding %s' % str(source)[:200])
+    return list(get_decoder(center).decode(source, date, norm))
+
+
+def decode_sources(center, sources, date, norm, processes=None):
+    """
+    Decode the sources of a center, in a pool of worker processes if there are several sources
+    :param center: {str} Center name
+    :param sources: {list} Source descriptors, @see Decoder.sources
+    :param date: {str} Date string in the format YYYYMMDDHH
+    :param norm: {str} dry or moist
+    :param processes: {int} Number of worker processes (default: CPU count, 1: no pool)
+    :return: {generator} Yields chunks of columns, in the order of the sources
+    """
+    sources = list(sources)
+    if processes == 1 or len(sources) < 2:
+        decoder = get_decoder(center)
+        for source in sources:
+            for chunk in decoder.decode(source, date, norm):
+                yield chunk
+        return
+
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        futures = [pool.submit(_decode_source, center, source, date, norm) for source in sources]
+        for future in futures:
+            for chunk in future.result():
+                yield chunk
+
+
+def write_products(chunks, date, output_path, output_file, compact=False):
+    """
+    Append chunks of columns to an HDF file, and write the bulk, accumbulk and groupbulk products.
+    Bulk statistics are sums and counts, so they are computed for each chunk and then combined.
+    The observations use the ingest storage profile and the products the web (read) profile.
+    The observations are written with their spatial cell, @see fsoi.stats.lib_spatial.
+    :param chunks: {iterable} Dictionaries with an array for each of the COLUMNS
+    :param date: {str} Date string in the format YYYYMMDDHH
+    :param output_path: {str} Full path to the output directory
+    :param output_file: {str} Output file name only (the products have prefixes)
+    :param compact: {bool} Write the observations with the compact schema,
+                    @see fsoi.stats.lib_utils.COMPACT_SCHEMA
+    :return: {list} A list of output files, or None if there are no observations
+    """
+    parsed_date = datetime.strptime(date, '%Y%m%d%H')
+    out = os.path.join(output_path, output_file)
+    if os.path.isfile(out): os.remove(out)
+
+    # dictionary-encoded strings are stored as codes, they do not need the reserved width
+    kwargs = {} if compact else {'min_itemsize': MIN_ITEMSIZE}
+    kwargs['data_columns'] = ['CELL']
+
+    n_obs = 0
+    bulk = []
+    for columns in chunks:
+        if columns is None or len(columns['IMPACT']) == 0:
+            continue
+        df = lspatial.add_cells(loi.columns_to_dataframe(parsed_date, columns))
+        lutils.writeHDF(out, 'df', df, compact=compact, profile='ingest', **kwargs)
+        bulk.append(loi.BulkStats(df))
+        n_obs += len(df)
+
+    log.debug('Total obs = %d' % n_obs)
+    if n_obs == 0:
+        return None
+
+    df = bulk[0] if len(bulk) == 1 else pd.concat(bulk).groupby(level=bulk[0].index.names).sum()
+    output_files = [out]
+
+    lutils.writeHDF(os.path.join(output_path, 'bulk.%s' % output_file), 'df', df,
+                    profile='web')
+    output_files.append(os.path.join(output_path, 'bulk.%s' % output_file))
+
+    df = loi.accumBulkStats(df)
+    lutils.writeHDF(os.path.join(output_path, 'accumbulk.%s' % output_file), 'df', df,
+                    profile='web')
+    output_files.append(os.path.join(output_path, 'accumbulk.%s' % output_file))
+
+    platforms = loi.Platforms('OnePlatform')
+    df = loi.groupBulkStats(df, platforms)
+    lutils.writeHDF(os.path.join(output_path, 'groupbulk.%s' % output_file), 'df', df,
+                    profile='web')
+    output_files.append(os.path.join(output_path, 'groupbulk.%s' % output_file))
+
+    return output_files
+
+
+def upload_products(files, center, bucket='fsoi', prefix='intercomp/hdf5'):
+    """
+    Upload the products to S3 in parallel
+    :param files: {list} Full paths to the local files
+    :param center: {str} Center name, used in the key prefix
+    :param bucket: {str} S3 bucket
+    :param prefix: {str} S3 key prefix, the center is appended
+    :return: {bool} True if all files were uploaded, otherwise False
+    """
+    from fsoi.data.datastore import ThreadedDataStore
+    from fsoi.data.s3_datastore import S3DataStore
+
+    datastore = ThreadedDataStore(S3DataStore(), 4)
+    for file in files:
+        target = {'bucket': bucket, 'prefix': '%s/%s' % (prefix, center),
+                  'name': os.path.basename(file)}
+        log.debug('Uploading %s to s3://%s/%s/%s' % (file, bucket, target['prefix'], target['name']))
+        datastore.save_from_local_file(file, target)
+    datastore.join()
+
+    failed = [operation.parameters[0] for operation in datastore.operations
+              if not (operation.success and operation.response)]
+    for file in failed:
+        log.error('Failed to upload file to S3: %s' % file)
+
+    return not failed
+
+
+def ingest(center, date, norm='dry', indir='.', outdir='.', processes=None, sources=None,
+           bucket=None, prefix='intercomp/hdf5', compact=False, cube=None, partials=None):
+    """
+    Run the ingest pipeline for a center and a cycle
+    :param center: {str} Center name, @see PLUGINS
+    :param date: {str} Date string in the format YYYYMMDDHH
+    :param norm: {str} dry or moist
+    :param indir: {str} Full path to the directory with the raw data
+    :param outdir: {str} Full path to the output directory
+    :param processes: {int} Number of worker processes used to decode the sources
+    :param sources: {list} Source descriptors, instead of the sources listed by the decoder
+    :param bucket: {str} Upload the products to this S3 bucket (optional)
+    :param prefix: {str} S3 key prefix for the uploaded products
+    :param compact: {bool} Write the observations with the compact schema
+    :param cube: {str} Add the cycle to this cube directory (optional), @see fsoi.stats.lib_cube
+    :param partials: {str} Store the partial aggregates of the cycle in this HDF5 tree (optional),
+                     and rewrite the partials of its day and month, @see
+                     fsoi.stats.lib_aggregate.roll
+    :return: {list} A list of output files, or None
+    """
+    decoder = get_decoder(center)
+    if sources is None:
+        sources = decoder.sources(date, norm, indir)
+    if not sources:
+        log.error('No raw data for %s %s %s in %s' % (center, norm, date, indir))
+        return None
+
+    os.makedirs(outdir, exist_ok=True)
+    output_file = '%s.%s.%s.h5' % (center, norm, date)
+    chunks = decode_sources(center, sources, date, norm, processes)
+    output_files = write_products(chunks, date, outdir, output_file, compact)
+    if not output_files:
+        log.error('No observations for %s %s %s' % (center, norm, date))
+        return None
+
+    # partial aggregates of the groupbulk product, by unified platform
+    cycle = lagg.partial(lagg.unify(lutils.readHDF(output_files[-1], 'df')), center, norm)
+    output_files.append(os.path.join(outdir, 'partial.%s' % output_file))
+    lutils.writeHDF(output_files[-1], 'df', cycle, profile='web')
+    if partials is not None:
+        backend = lutils.get_backend('hdf5', partials, profile='web')
+        backend.write(cycle, 'partial', center, norm, date)
+        lagg.roll(backend, center, norm, date)
+    if cube is not None:
+        from fsoi.stats.lib_cube import update
+        update(cube, cycle)
+
+    if bucket is not None and not upload_products(output_files, center, bucket, prefix):
+        return None
+
+    return output_files
+
+
+def main():
+    """
+    Parse command line parameters and run the ingest pipeline
+    :return: None
+    """
+    parser = ArgumentParser(description='Ingest raw data from a center', formatter_class=HelpFormatter)
+    parser.add_argument('center', help='center to process', choices=sorted(PLUGINS))
+    parser.add_argument('-d', '--date', help='analysis date to process', metavar='YYYYMMDDHH',
+                        required=True)
+    parser.add_argument('-n', '--norm', help='norm to process', default='dry',
+                        choices=['dry', 'moist'])
+    parser.add_argument('-i', '--indir', help='path to the raw data directory', default='.')
+    parser.add_argument('-o', '--outdir', help='path to the output directory', default='.')
+    parser.add_argument('-p', '--processes', help='number of worker processes', type=int,
+                        default=None)
+    parser.add_argument('--bucket', help='upload the products to this S3 bucket', default=None)
+    parser.add_argument('--prefix', help='S3 key prefix for the products', default='intercomp/hdf5')
+    parser.add_argument('--compact', help='write the observations with the compact schema',
+                        action='store_true')
+    parser.add_argument('--cube', help='add the cycle to this cube directory', default=None)
+    parser.add_argument('--partials', help='store the partial aggregates of the cycle, its day and '
+                        'its month in this HDF5 tree', default=None)
+    args = parser.parse_args()
+
+    output_files = ingest(args.center, args.date, args.norm, args.indir, args.outdir,
+                          args.processes, bucket=args.bucket, prefix=args.prefix,
+                          compact=args.compact, cube=args.cube, partials=args.partials)
+    if not output_files:
+        log.error('Failed to ingest %s %s %s' % (args.center, args.norm, args.date))
+        return
+
+    log.info('Processed %s files:' % args.center)
+    for file in output_files:
+        log.info(file)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,232 @@
+"""
+Read Fortran unformatted sequential files and fixed-width formatted records with numpy (no Fortran
+compiler or per-record parsing required)
+"""
+
+import os
+import re
+import numpy as np
+
+# numpy byte order characters for the Fortran 'convert' options
+BYTE_ORDER = {'big': '>', 'little': '<', 'native': '='}
+
+
+def record_length(fname, offset, endian='big'):
+    """
+    Read the length of a sequential record from its leading record marker
+    :param fname: {str} Full path to the file
+    :param offset: {int} Byte offset of the record marker
+    :param endian: {str} big, little or native
+    :return: {int} The record length in bytes (excluding the markers)
+    """
+    marker = np.fromfile(fname, dtype=BYTE_ORDER[endian] + 'i4', count=1, offset=offset)
+    if marker.size != 1:
+        raise IOError('Cannot read record marker at byte %d: %s' % (offset, fname))
+    return int(marker[0])
+
+
+def record_dtype(fields, endian='big', record_length=None):
+    """
+    Create a structured dtype for a sequential record, including the leading and trailing markers
+    :param fields: {list} (name, type) or (name, type, shape) tuples, e.g. ('lat', 'f4') or
+                   ('obtype', 'S20'); numeric types are given without a byte order
+    :param endian: {str} big, little or native
+    :param record_length: {int} Actual record length, if the record is longer than the fields
+    :return: {numpy.dtype} The record dtype
+    """
+    order = BYTE_ORDER[endian]
+    items = [('head', order + 'i4')]
+    for field in fields:
+        name, code = field[0], field[1]
+        code = code if code.startswith('S') else order + code
+        items.append((name, code) + tuple(field[2:]))
+    payload = np.dtype(items).itemsize - 4
+    if record_length is not None and record_length > payload:
+        items.append(('_unread', 'V%d' % (record_length - payload)))
+    items.append(('tail', order + 'i4'))
+    return np.dtype(items)
+
+
+def read_records(fname, fields, count, offset=0, endian='big'):
+    """
+    Memory-map consecutive sequential records that share the same layout.  Like a Fortran read,
+    any data at the end of a record that are not listed in fields are skipped, and reading stops
+    at the end of the file.
+    :param fname: {str} Full path to the file
+    :param fields: {list} Record fields, @see record_dtype
+    :param count: {int} Maximum number of records to read
+    :param offset: {int} Byte offset of the first record
+    :param endian: {str} big, little or native
+    :return: ({numpy.memmap}, {int}) The records and the byte offset after the last record
+    """
+    file_size = os.path.getsize(fname)
+    if count <= 0 or offset >= file_size:
+        return np.zeros(0, dtype=record_dtype(fields, endian)), offset
+
+    length = record_length(fname, offset, endian)
+    dtype = record_dtype(fields, endian, length)
+    if dtype.itemsize != length + 8:
+        raise IOError('Record at byte %d is shorter (%d) than the requested fields (%d): %s' %
+                      (offset, length, dtype.itemsize - 8, fname))
+
+    count = min(count, (file_size - offset) // dtype.itemsize)
+    records = np.memmap(fname, dtype=dtype, mode='r', offset=offset, shape=(count,))
+
+    # every record must have the same length for the memory map to be valid
+    if not (np.all(records['head'] == length) and np.all(records['tail'] == length)):
+        raise IOError('Records starting at byte %d have varying lengths: %s' % (offset, fname))
+
+    return records, offset + count * dtype.itemsize
+
+
+def decode_strings(chars):
+    """
+    Decode an array of fixed-width byte strings in bulk, like trim(adjustl(...)) in Fortran
+    :param chars: {numpy.ndarray} Array with a bytes (S) dtype
+    :return: {numpy.ndarray} Array of str
+    """
+    strings = np.char.decode(np.asarray(chars), 'latin-1')
+    return np.char.strip(np.char.replace(strings, '\x00', ''))
+
+
+def parse_format(fmt):
+    """
+    Parse a Fortran format with I, F, E, D, A and X edit descriptors into fixed-width fields
+    :param fmt: {str} Fortran format, e.g. 'i8,1x,e15.8,1x,a35' (parentheses are optional)
+    :return: {list} (kind, start, width, decimals) of each field, where kind is one of i, f, e, a
+    """
+    fields = []
+    start = 0
+    for item in fmt.strip().strip('()').replace(' ', '').lower().split(','):
+        match = re.match(r'^(\d*)([ifeda])(\d+)(?:\.(\d+))?$', item)
+        if match:
+            repeat, kind, width, decimals = match.groups()
+            kind = 'e' if kind == 'd' else kind
+            for _ in range(int(repeat or 1)):
+                fields.append((kind, start, int(width), int(decimals or 0)))
+                start += int(width)
+            continue
+        match = re.match(r'^(\d*)x$', item)
+        if match is None:
+            raise ValueError('Unsupported edit descriptor %s in format %s' % (item, fmt))
+        start += int(match.group(1) or 1)
+
+    return fields
+
+
+def _scale(mantissa, scale):
+    """
+    Compute mantissa * 10**scale, correctly rounded like float(str)
+    :param mantissa: {numpy.ndarray} Integer mantissas (int64, or exact integers as float64)
+    :param scale: {numpy.ndarray} Integer powers of 10
+    :return: {numpy.ndarray} float64 values
+    """
+    # a single multiplication or division by an exact power of 10 is correctly rounded
+    values = mantissa.astype(np.float64)
+    power = 10.0 ** np.abs(scale).astype(np.float64)
+    values = np.where(scale < 0, values / power, values * power)
+
+    # powers of 10 beyond 1e22 are not exact, let Python round those
+    inexact = np.nonzero((np.abs(scale) > 22) | (np.abs(mantissa) >= 2 ** 53))[0]
+    if inexact.size:
+        values[inexact] = [float('%de%d' % (m, e)) for m, e in
+                           zip(mantissa[inexact].astype(np.int64).tolist(),
+                               np.asarray(scale)[inexact].tolist())]
+    return values
+
+
+def _decode_numbers(chars, kind, decimals):
+    """
+    Decode a numeric field like a Fortran formatted read, one character position at a time for
+    all records: blanks are ignored (an empty field is 0), without a decimal point the last
+    'decimals' digits are the fraction, and the exponent letter may be E, D or omitted.
+    :param chars: {numpy.ndarray} uint8 array (nrecords, width) with the characters of the field
+    :param kind: {str} i, f or e
+    :param decimals: {int} Number of decimals of an F or E field
+    :return: {numpy.ndarray} int64 or float64 values
+    """
+    n = chars.shape[0]
+    mantissa = np.zeros(n, dtype=np.int64)
+    exponent = np.zeros(n, dtype=np.int64)
+    fraction = np.zeros(n, dtype=np.int64)
+    negative = np.zeros(n, dtype=bool)
+    exp_negative = np.zeros(n, dtype=bool)
+    in_exponent = np.zeros(n, dtype=bool)
+    after_point = np.zeros(n, dtype=bool)
+    started = np.zeros(n, dtype=bool)
+    valid = np.ones(n, dtype=bool)
+
+    for c in chars.T:
+        digit = (c >= 48) & (c <= 57)
+        sign = (c == 43) | (c == 45)
+        point = c == 46
+        letter = (c == 69) | (c == 101) | (c == 68) | (c == 100)
+
+        # an exponent letter, or a sign after the mantissa, starts the exponent
+        starts_exponent = ~in_exponent & started & (letter | sign)
+        exp_negative |= in_exponent & (c == 45)
+        exp_negative |= starts_exponent & (c == 45)
+        in_exponent |= starts_exponent
+
+        value = c.astype(np.int64) - 48
+        in_mantissa = digit & ~in_exponent
+        mantissa = np.where(in_mantissa, mantissa * 10 + value, mantissa)
+        fraction += in_mantissa & after_point
+        exponent = np.where(digit & in_exponent, exponent * 10 + value, exponent)
+        negative |= ~started & (c == 45)
+
+        after_point |= point & ~in_exponent
+        started |= digit | point | sign
+        valid &= digit | sign | point | letter | (c == 32)
+
+    if not valid.all():
+        raise ValueError('Cannot decode numeric field in %d records' % np.count_nonzero(~valid))
+
+    mantissa = np.where(negative, -mantissa, mantissa)
+    if kind == 'i':
+        return mantissa
+
+    fraction = np.where(after_point, fraction, decimals)
+    return _scale(mantissa, np.where(exp_negative, -exponent, exponent) - fraction)
+
+
+def read_formatted(lines, fmt, usecols=None):
+    """
+    Decode fixed-width formatted records (e.g. the lines of a text file) into numpy columns in
+    bulk, like a Fortran formatted read.  Records shorter than the format are padded with blanks.
+    :param lines: {list} Records as bytes
+    :param fmt: {str} Fortran format of each record, @see parse_format
+    :param usecols: {list} Indices of the fields to decode (default: all)
+    :return: {list} One array per field: int64 (I), float64 (F, E, D) or bytes (A); None for the
+             fields that are not decoded
+    """
+    fields = parse_format(fmt)
+    width = max([start + size for _, start, size, _ in fields] + [1])
+
+    # fixed-width byte matrix with one row per record
+    records = np.array(lines, dtype='S%d' % width)
+    chars = records.view(np.uint8).reshape(len(records), width)
+    chars = np.where(chars == 0, np.uint8(32), chars)
+
+    columns = []
+    for i, (kind, start, size, decimals) in enumerate(fields):
+        if usecols is not None and i not in usecols:
+            columns.append(None)
+            continue
+        field = np.ascontiguousarray(chars[:, start:start + size])
+        text = field.view('S%d' % size).ravel()
+        if kind == 'a':
+            columns.append(text)
+            continue
+
+        # numpy parses plain numbers in C; blank fields, implied decimals and D or missing
+        # exponent letters are decoded like Fortran does
+        try:
+            values = text.astype(np.int64 if kind == 'i' else np.float64)
+            if kind != 'i' and decimals > 0 and not (field == 46).any(axis=1).all():
+                raise ValueError('implied decimal point')
+        except ValueError:
+            values = _decode_numbers(field, kind, decimals)
+        columns.append(values)
+
+    return columns
@@ -4,14 +4,15 @@ FSOI Ingest GMAO
 __all__ = ['download_gmao', 'process_gmao', 'download_and_process_gmao']
 
 
-import yaml
-import pkgutil
 import datetime
 import time
+import json
 from argparse import ArgumentParser
 from argparse import ArgumentDefaultsHelpFormatter as HelpFormatter
 from fsoi.ingest.gmao.download_gmao import download_gmao
+from fsoi.ingest.gmao.download_gmao import stream_gmao
 from fsoi.ingest.gmao.process_gmao import process_gmao
+import fsoi.config as fconfig
 from fsoi import log
 
 
@@ -21,7 +22,7 @@ def download_and_process_gmao():
     :return: None
     """
     # read default parameter values from GMAO config file
-    config = yaml.full_load(pkgutil.get_data('fsoi', 'resources/fsoi/ingest/gmao/gmao_ingest.yaml'))
+    config = fconfig.get('gmao_ingest')
     lag = config['lag_in_days']
     https_host = config['https_host']
     remote_path = config['remote_path']
@@ -37,6 +38,8 @@ def download_and_process_gmao():
     parser.add_argument('--norm', help='Norm', default='moist', type=str, choices=['dry', 'moist'])
     parser.add_argument('--cycle-hour', help='Forecast cycle hour', type=int, default=cycle_hour,
                         choices=[0, 6, 12, 18])
+    parser.add_argument('--stream', help='process the downloads in memory while archiving to S3',
+                        action='store_true')
     args = parser.parse_args()
 
     # get the values from the command line parameters
@@ -49,8 +52,32 @@ def download_and_process_gmao():
     date = datetime.datetime.utcfromtimestamp(time.time() - lag * 86400)
     date_str = '%04d%02d%02d%02d' % (date.year, date.month, date.day, cycle_hour)
 
-    files = download_gmao(lag, https_host, remote_path, bucket, cycle_hour)
-    processed_files = process_gmao(norm, date_str)
+    if args.stream:
+        # archive every file, but only keep the files for this norm in memory
+        file_norm = config['norm'][norm]
+        threads = stream_gmao(lag, https_host, remote_path, bucket, cycle_hour, file_norm) or []
+        processed_files = process_gmao(norm, date_str, _streamed_sources(threads))
+
+        # wait for the raw files to be archived
+        files = [thread.get_s3_url() for thread in threads if thread.archived()]
+        status = {'ok': bool(files), 'runtime': int(time.time()), 'file_count': len(files),
+                  'size': sum([thread.download_size for thread in threads])}
+        print(json.dumps(status))
+    else:
+        files = download_gmao(lag, https_host, remote_path, bucket, cycle_hour)
+        processed_files = process_gmao(norm, date_str)
 
     if files and processed_files:
         log.info('Ingest completed.')
+
+
+def _streamed_sources(threads):
+    """
+    Yield the streamed files that were kept in memory as each download finishes
+    :param threads: {list} A list of StreamingDownloader threads
+    :return: {generator} (file name, file contents) pairs
+    """
+    for thread in threads:
+        thread.join()
+        if thread.success and thread.data is not None:
+            yield thread.get_file_name(), thread.data
@@ -13,8 +13,9 @@ from threading import Thread
 import boto3
 import urllib3
 import certifi
-import pkgutil
-import yaml
+from fsoi.data.s3_datastore import S3DataStore
+from fsoi.data.tee import TeeStream
+import fsoi.config as fconfig
 from fsoi import log
 
 
@@ -89,6 +90,84 @@ class Downloader(Thread):
         return 's3://%s/%s' % (self.s3_bucket, self.s3_key)
 
 
+class StreamingDownloader(Downloader):
+    """
+    Thread to stream a file from the website: the data are archived in S3 in the background while
+    a copy is kept in memory for processing
+    """
+
+    def __init__(self, url, s3_bucket, s3_key, keep=True, chunk_size=1048576):
+        """
+        Constructor
+        :param url: Source URL
+        :param s3_bucket: Target S3 bucket
+        :param s3_key: Target S3 key
+        :param keep: {bool} Keep the data in memory (otherwise only archive the data)
+        :param chunk_size: {int} Number of bytes to read from the response at a time
+        """
+        super(StreamingDownloader, self).__init__(url, s3_bucket, s3_key)
+        self.keep = keep
+        self.chunk_size = chunk_size
+        self.data = None
+        self.tee = None
+
+    def run(self):
+        """
+        Stream a file from the website
+        :return: None
+        """
+        try:
+            # start archiving to S3
+            self.tee = TeeStream(S3DataStore(), {'bucket': self.s3_bucket, 'key': self.s3_key},
+                                 local=False)
+
+            # request the data from the URL without reading the content
+            https = urllib3.PoolManager(cert_reqs='CERT_REQUIRED', ca_certs=certifi.where())
+            response = https.request('GET', self.url, preload_content=False)
+
+            # check that the response is OK (200)
+            if response.status != 200:
+                log.error('Website responded with %d' % response.status)
+                log.error('URL: %s' % self.url)
+                self.tee.abort('HTTP status %d' % response.status)
+                return
+
+            # send each chunk to S3 and keep a copy in memory
+            chunks = []
+            for chunk in response.stream(self.chunk_size):
+                self.tee.write(chunk)
+                if self.keep:
+                    chunks.append(chunk)
+            response.release_conn()
+            self.tee.close()
+
+            # happy
+            log.debug('Done: %s' % self.s3_key)
+            self.data = b''.join(chunks) if self.keep else None
+            self.download_size = self.tee.size
+            self.success = True
+
+        except Exception as exception:
+            log.error(exception)
+            if self.tee is not None:
+                self.tee.abort(exception)
+            self.success = False
+
+    def archived(self):
+        """
+        Wait for the data to be archived in S3
+        :return: {bool} True if the data were saved in S3, otherwise False
+        """
+        return self.tee is not None and self.tee.join()
+
+    def get_file_name(self):
+        """
+        Return the file name for this object
+        :return: {str} The file name
+        """
+        return self.s3_key.split('/')[-1]
+
+
 def get_list_of_files_from_url(url):
     """
     Retrieve a list of files available at this URL
@@ -162,6 +241,40 @@ def download_gmao(lag, https_host, remote_path, bucket, cycle_hour):
         log.error(json.dumps(status))
 
 
+def stream_gmao(lag, https_host, remote_path, bucket, cycle_hour, keep_filter=None):
+    """
+    Start streaming the files for a cycle from GMAO, archiving them in S3 in the background
+    :param lag: {int} Number of days to look back for data
+    :param https_host: {str} The host with https protocol
+    :param remote_path: {str} The path on the server to find files
+    :param bucket: {str} The bucket to which raw data will be uploaded
+    :param cycle_hour: {int} The cycle hour (As of 2019-Apr, only 00Z is available)
+    :param keep_filter: {str} Only keep files in memory when the name contains this string
+    :return: {list} A list of started StreamingDownloader threads, or None
+    """
+    # compute the base url with the date
+    date = datetime.datetime.utcfromtimestamp(time.time() - lag * 86400)
+    remote_path = remote_path % (date.year, date.month, date.day, cycle_hour)
+    base_url = 'https://%s/%s' % (https_host, remote_path)
+    files = get_list_of_files_from_url(base_url)
+    if files is None:
+        return None
+
+    # start all data transfer threads
+    threads = []
+    s3_key_template = 'Y%04d/M%02d/D%02d/H%02d/%s'
+    for remote_file in files:
+        log.debug('Streaming %s' % remote_file)
+        key = s3_key_template % (date.year, date.month, date.day, cycle_hour, remote_file)
+        url = '%s/%s' % (base_url, remote_file)
+        keep = keep_filter is None or keep_filter in remote_file
+        thread = StreamingDownloader(url, bucket, key, keep=keep)
+        thread.start()
+        threads.append(thread)
+
+    return threads
+
+
 def download_gmao_from_lambda(event, context):
     """
     Entry point to ingest GMAO data from AWS Lambda
@@ -188,7 +301,7 @@ def main():
     from argparse import ArgumentDefaultsHelpFormatter as HelpFormatter
 
     # get the default values from the config file
-    config = yaml.full_load(pkgutil.get_data('fsoi', 'resources/fsoi/ingest/gmao/gmao_ingest.yaml'))
+    config = fconfig.get('gmao_ingest')
     https_host = config['https_host']
     remote_path = config['remote_path']
     bucket = config['raw_data_bucket']
@@ -1,15 +1,16 @@
 import os
-import yaml
-import pkgutil
+import glob
 import shutil
 import boto3
-from datetime import datetime
 from netCDF4 import Dataset
 import numpy as np
 from argparse import ArgumentParser
 from argparse import ArgumentDefaultsHelpFormatter as FormatHelper
-import fsoi.stats.lib_utils as lutils
-import fsoi.stats.lib_obimpact as loi
+from fsoi.ingest.lookup import map_unique
+from fsoi.ingest.engine import Decoder
+from fsoi.ingest.engine import register
+from fsoi.ingest.engine import write_products
+import fsoi.config as fconfig
 from fsoi import log
 
 
@@ -18,14 +19,15 @@ class ODS:
     ODS Class
     """
 
-    def __init__(self, filename):
+    def __init__(self, filename, memory=None):
         """
         Constructor
         :param filename:
+        :param memory: {bytes} Contents of the file when it is already in memory (optional)
         """
         try:
             self.filename = filename
-            self.file_ = Dataset(filename, 'r')
+            self.file_ = Dataset(filename, 'r', memory=memory)
             self.file_.set_auto_mask(False)
             self.qcexcl = None
             self.xvec = []
@@ -194,105 +196,123 @@ def upload_to_s3(file, s3url):
         return False
 
 
-def process_gmao(norm, date):
+def decode_ods(file, memory, file_norm, kx, kt):
+    """
+    Decode a GMAO impact ODS file into columns
+    :param file: {str} Full path to the ODS file (or its name if memory is given)
+    :param memory: {bytes} Contents of the file when it is already in memory, or None
+    :param file_norm: {str} Norm in the file names (txe or twe)
+    :param kx: {dict} Platform name of each kx (conventional observations)
+    :param kt: {dict} Observation type definition of each kt
+    :return: {dict} An array for each column, @see fsoi.ingest.engine.COLUMNS
+    """
+    # TODO: Request that NASA adds the platform name as a global attribute in the NetCDF file
+    #       rather than trying to parse the platform name from the file name.
+    platform = file.split('/')[-1].split('.')[3].split('imp3_%s_' % file_norm)[-1].upper()
+
+    # read the data from the file
+    ods = ODS(file, memory=memory)
+    ods = ods.read(only_good=True, platform=platform)
+    ods.close()
+    log.debug('platform = %s, nobs = %d' % (platform, ods.n_obs))
+
+    obtype = map_unique(lambda t: kt[t][0], np.asarray(ods.kt)).astype(object)
+    lon = np.asarray(ods.lon, dtype=np.float64)
+    lev = np.where(obtype == 'ps', ods.obs, ods.lev).astype(np.float64)
+    lev[obtype == 'Tb'] = -999.
+
+    if platform in ['CONV']:
+        plat = map_unique(lambda k: kx[k], np.asarray(ods.kx)).astype(object)
+        channel = np.full(ods.n_obs, -999, dtype=np.int64)
+    else:
+        plat = np.full(ods.n_obs, platform, dtype=object)
+        channel = np.asarray(ods.lev).astype(np.int64)
+
+    return {
+        'PLATFORM': plat,
+        'OBTYPE': obtype,
+        'CHANNEL': channel,
+        'LONGITUDE': np.where(lon >= 0.0, lon, lon + 360.0),
+        'LATITUDE': np.asarray(ods.lat, dtype=np.float64),
+        'PRESSURE': lev,
+        'IMPACT': np.asarray(ods.xvec, dtype=np.float64),
+        'OMF': np.asarray(ods.omf, dtype=np.float64),
+        # GMAO does not provide obs error in the impact ODS files
+        'OBERR': np.full(ods.n_obs, -999.)
+    }
+
+
+@register('GMAO')
+class GMAODecoder(Decoder):
+    """
+    Decode the GMAO impact ODS files of a cycle (one file per platform and norm)
+    """
+
+    def __init__(self):
+        """
+        Load the GMAO constants
+        """
+        self.config = fconfig.get('gmao_ingest')
+
+    def sources(self, date, norm, indir):
+        """
+        List the ODS files for the norm in the input directory
+        :param date: {str} Date string in the format YYYYMMDDHH
+        :param norm: {str} dry or moist
+        :param indir: {str} Full path to the input directory
+        :return: {list} Full paths to the ODS files
+        """
+        file_norm = self.config['norm'][norm]
+        return [file for file in sorted(glob.glob(os.path.join(indir, '*')))
+                if file_norm in file.split('/')[-1]]
+
+    def decode(self, source, date, norm):
+        """
+        Decode an ODS file
+        :param source: {str|tuple} Full path to the ODS file, or (file name, file contents)
+        :param date: {str} Date string in the format YYYYMMDDHH
+        :param norm: {str} dry or moist
+        :return: {generator} Yields the columns of the file
+        """
+        file, memory = source if isinstance(source, tuple) else (source, None)
+        yield decode_ods(file, memory, self.config['norm'][norm], self.config['kx'],
+                         self.config['kt'])
+
+
+def process_gmao(norm, date, sources=None):
     """
     Process the GMAO data from a given day for the specified norm
     :param norm: {str} moist or dry
     :param date: {str} Date string in the format YYYYMMDDHH
+    :param sources: {iterable} (file name, file contents) pairs of data already in memory; if None,
+                    the raw files are downloaded from S3
     :return: {list} List of local files
     """
-    config = yaml.full_load(pkgutil.get_data('fsoi', 'resources/fsoi/ingest/gmao/gmao_ingest.yaml'))
+    config = fconfig.get('gmao_ingest')
     kx = config['kx']
     kt = config['kt']
     file_norm = config['norm'][norm]
     input_bucket = config['raw_data_bucket']
-    dt = datetime.strptime(date, '%Y%m%d%H')
 
     work_dir = prepare_workspace()
-    s3_prefix = 's3://%s/Y%s/M%s/D%s/H%s/' % (input_bucket, date[0:4], date[4:6], date[6:8], date[8:10])
-    file_list = download_from_s3(s3_prefix, work_dir)
-
-    n_obs = 0
-    bufr = []
-    for file in file_list:
+    if sources is None:
+        s3_prefix = 's3://%s/Y%s/M%s/D%s/H%s/' % (input_bucket, date[0:4], date[4:6], date[6:8], date[8:10])
+        sources = [(file, None) for file in download_from_s3(s3_prefix, work_dir)]
 
-        # skip if the norm is not in the file name
-        if file_norm not in file.split('/')[-1]:
-            continue
-
-        # log debug
-        log.debug('processing %s' % file)
-
-        # TODO: Request that NASA adds the platform name as a global attribute in the NetCDF file
-        #       rather than trying to parse the platform name from the file name.
-        platform = file.split('/')[-1].split('.')[3].split('imp3_%s_' % file_norm)[-1].upper()
-
-        # read the data from the file
-        ods = ODS(file)
-        ods = ods.read(only_good=True, platform=platform)
-        ods.close()
-
-        # update the total obs count
-        n_obs += ods.n_obs
-        log.debug('platform = %s, nobs = %d' % (platform, ods.n_obs))
-
-        # iterate over each observation
-        for o in range(ods.n_obs):
-            plat = kx[ods.kx[o]] if platform in ['CONV'] else platform
-            obtype = kt[ods.kt[o]][0]
-            channel = -999 if platform in ['CONV'] else np.int(ods.lev[o])
-            lon = ods.lon[o] if ods.lon[o] >= 0.0 else ods.lon[o] + 360.0
-            lat = ods.lat[o]
-            if obtype == 'ps':
-                lev = ods.obs[o]
-            elif obtype == 'Tb':
-                lev = -999.
-            else:
-                lev = ods.lev[o]
-            imp = ods.xvec[o]
-            omf = ods.omf[o]
-            oberr = -999.  # GMAO does not provide obs error in the impact ODS files
-            bufr.append([plat, obtype, channel, lon, lat, lev, imp, omf, oberr])
-
-    log.debug('Total obs used in %s = %d' % (date, n_obs))
+    # decode the files for this norm, as they become available
+    chunks = (decode_ods(file, memory, file_norm, kx, kt) for file, memory in sources
+              if file_norm in file.split('/')[-1])
 
     # write the output files and upload to S3
-    if not bufr:
+    out_file = 'GMAO.%s.%s.h5' % (norm, date)
+    out_file_list = write_products(chunks, date, work_dir, out_file)
+    if not out_file_list:
         return None
 
-    out_file_list = []
-
-    out_file = 'GMAO.%s.%s.h5' % (norm, date)
     s3_template = 's3://fsoi/intercomp/hdf5/GMAO/%s'
-
-    df = loi.list_to_dataframe(dt, bufr)
-    of = '%s/%s' % (work_dir, out_file)
-    lutils.writeHDF(of, 'df', df, complevel=1, complib='zlib', fletcher32=True)
-    out_file_list.append(of)
-    if not upload_to_s3(of, s3_template % of.split('/')[-1]):
-        log.error('Failed to upload file to S3: %s' % of)
-
-    df = loi.BulkStats(df)
-    of = '%s/bulk.%s' % (work_dir, out_file)
-    out_file_list.append(of)
-    lutils.writeHDF(of, 'df', df)
-    if not upload_to_s3(of, s3_template % of.split('/')[-1]):
-        log.error('Failed to upload file to S3: %s' % of)
-
-    df = loi.accumBulkStats(df)
-    of = '%s/accumbulk.%s' % (work_dir, out_file)
-    out_file_list.append(of)
-    lutils.writeHDF(of, 'df', df)
-    if not upload_to_s3(of, s3_template % of.split('/')[-1]):
-        log.error('Failed to upload file to S3: %s' % of)
-
-    platforms = loi.Platforms('OnePlatform')
-    df = loi.groupBulkStats(df, platforms)
-    of = '%s/groupbulk.%s' % (work_dir, out_file)
-    out_file_list.append(of)
-    lutils.writeHDF(of, 'df', df)
-    if not upload_to_s3(of, s3_template % of.split('/')[-1]):
-        log.error('Failed to upload file to S3: %s' % of)
+    for of in out_file_list:
+        if not upload_to_s3(of, s3_template % of.split('/')[-1]):
+            log.error('Failed to upload file to S3: %s' % of)
 
     return out_file_list
 
@@ -1,4 +1,4 @@
 """
 FSOI Ingest JMA
 """
-__all__ = ['process_JMA']
+__all__ = ['process_JMA', 'read_jma']
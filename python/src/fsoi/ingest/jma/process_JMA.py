@@ -5,11 +5,55 @@ Process JMA data
 import os
 from datetime import datetime
 from argparse import ArgumentParser, ArgumentDefaultsHelpFormatter
-from jma import jma
+import numpy as np
+from fsoi.ingest.jma import read_jma as jma
+from fsoi.ingest.engine import Decoder
+from fsoi.ingest.engine import register
 import fsoi.stats.lib_utils as lutils
 import fsoi.stats.lib_obimpact as loi
 
 
+def decode_jma(fname):
+    """
+    Decode a JMA impact file into columns
+    :param fname: {str} Full path to the raw file
+    :return: {dict} An array for each column, @see fsoi.ingest.engine.COLUMNS
+    """
+    formulation, idate, nobstot, nmetric = jma.get_header(fname, endian='big')
+    obtype, platform, chan, lat, lon, lev, omf, oberr, imp = jma.get_data(fname, nobstot, nmetric,
+                                                                          endian='big')
+
+    return {'PLATFORM': platform, 'OBTYPE': obtype, 'CHANNEL': chan,
+            'LONGITUDE': np.where(lon >= 0.0, lon, lon + 360.0), 'LATITUDE': lat,
+            'PRESSURE': lev, 'IMPACT': imp[:, 0], 'OMF': omf, 'OBERR': oberr}
+
+
+@register('JMA_adj')
+class JMAAdjointDecoder(Decoder):
+    """
+    Decode the JMA adjoint impact file of a cycle
+    """
+    pattern = 'ADJOINT_fso_jma_%(date)s00.dat'
+
+    def decode(self, source, date, norm):
+        """
+        Decode a raw file
+        :param source: {str} Full path to the raw file
+        :param date: {str} Date string in the format YYYYMMDDHH
+        :param norm: {str} dry or moist
+        :return: {generator} Yields the columns of the file
+        """
+        yield decode_jma(source)
+
+
+@register('JMA_ens')
+class JMAEnsembleDecoder(JMAAdjointDecoder):
+    """
+    Decode the JMA ensemble impact file of a cycle
+    """
+    pattern = 'ENSEMBLE_fso_jma_%(date)s00.dat'
+
+
 def main():
     """
 
@@ -27,26 +71,11 @@ def main():
     fname_out = args.output
     adate = datetime.strptime(args.adate, '%Y%m%d%H')
 
-    formulation, idate, nobstot, nmetric = jma.get_header(fname, endian='big')
-    obtype, platform, chan, lat, lon, lev, omf, oberr, imp = jma.get_data(fname, nobstot, nmetric,
-                                                                          endian='big')
-
-    obtype = (obtype.tostring()).replace('\x00', '')[:-1].split('|')
-    platform = (platform.tostring()).replace('\x00', '')[:-1].split('|')
-
-    bufr = []
-    for o in range(nobstot):
-        obtyp = ''.join(obtype[o]).strip()
-        plat = ''.join(platform[o]).strip()
-
-        lon[o] = lon[o] if lon[o] >= 0.0 else lon[o] + 360.0
-
-        line = [plat, obtyp, chan[o], lon[o], lat[o], lev[o], imp[o][0], omf[o], oberr[o]]
-
-        bufr.append(line)
+    columns = decode_jma(fname)
+    nobstot = len(columns['IMPACT'])
 
-    if bufr != []:
-        df = loi.list_to_dataframe(adate, bufr)
+    if nobstot > 0:
+        df = loi.columns_to_dataframe(adate, columns)
         if os.path.isfile(fname_out): os.remove(fname_out)
         lutils.writeHDF(fname_out, 'df', df, complevel=1, complib='zlib', fletcher32=True)
 
@@ -0,0 +1,100 @@
+"""
+Read JMA observation impact files with numpy.  This is a drop-in replacement for the f2py jma
+module (fortran/src/ingest/jma/jma.f90) that does not require a Fortran compiler.
+"""
+
+import numpy as np
+from fsoi.ingest.fortran_io import read_records
+from fsoi.ingest.fortran_io import decode_strings
+
+# diag_header type in jma.f90
+HEADER = [
+    ('formulation', 'S8'),
+    ('idate', 'i4', (5,)),
+    ('nobstot', 'i4')
+]
+
+# diag_data type in jma.f90
+DATA = [
+    ('elem', 'S8'),
+    ('channel', 'i4'),
+    ('rlon', 'f4'),
+    ('rlat', 'f4'),
+    ('rlev', 'f4'),
+    ('otype', 'S12'),
+    ('satname', 'S12'),
+    ('omb', 'f4'),
+    ('oma', 'f4'),
+    ('oberr', 'f4'),
+    ('fso_kin', 'f4'),
+    ('fso_dry', 'f4'),
+    ('fso_moist', 'f4'),
+    ('fsr_kin', 'f4'),
+    ('fsr_dry', 'f4'),
+    ('fsr_moist', 'f4')
+]
+
+# number of impact metrics for each formulation
+NMETRIC = {'ENSEMBLE': 3, 'ADJOINT': 1}
+
+
+def get_header(fname, endian='big'):
+    """
+    Read the header from a JMA file
+    :param fname: {str} Full path to the JMA file
+    :param endian: {str} big, little or native
+    :return: {tuple} formulation, idate, nobstot, nmetric
+    """
+    header, _ = read_records(fname, HEADER, 1, endian=endian)
+    if header.size != 1:
+        raise IOError('Cannot read header: %s' % fname)
+    header = header[0]
+
+    formulation = str(decode_strings(header['formulation']))
+    if formulation not in NMETRIC:
+        raise ValueError('Unknown formulation %s: %s' % (formulation, fname))
+
+    return formulation, header['idate'].astype(np.int32), int(header['nobstot']), NMETRIC[formulation]
+
+
+def get_data(fname, nobstot, nmetric, endian='big'):
+    """
+    Read the observations from a JMA file
+    :param fname: {str} Full path to the JMA file
+    :param nobstot: {int} Number of observations to read
+    :param nmetric: {int} Number of impact metrics (3 for ENSEMBLE, 1 for ADJOINT)
+    :param endian: {str} big, little or native
+    :return: {tuple} obtype, platform, channel, lat, lon, lev, omb, oberr, impact; obtype and
+             platform are arrays of str and impact has columns [dry, moist, kinetic][:nmetric]
+    """
+    header, offset = read_records(fname, HEADER, 1, endian=endian)
+    if header.size != 1:
+        raise IOError('Cannot read header: %s' % fname)
+    formulation = str(decode_strings(header[0]['formulation']))
+    data, _ = read_records(fname, DATA, nobstot, offset, endian)
+
+    # radiances have no element; the platform is sensor_satellite (20 characters in Fortran)
+    radiance = np.char.rstrip(data['elem']) == b'N/A'
+    elem = decode_strings(data['elem'])
+    otype = decode_strings(data['otype'])
+    satname = decode_strings(data['satname'])
+    platform = np.where(radiance, np.char.add(np.char.add(otype, '_'), satname), otype)
+    platform = platform.astype('U20')
+    obtype = np.where(radiance, 'Tb', elem)
+    channel = np.where(radiance, data['channel'], -999).astype(np.int32)
+
+    # levels are in Pa, except for GNSS-RO on ADJOINT (m) and radiances on ADJOINT (n/a)
+    rlev = data['rlev'].astype(np.float32)
+    lev = rlev / np.float32(100.0)
+    if formulation == 'ADJOINT':
+        lev = np.where(platform == 'GNSSRO', rlev / np.float32(1000.0), lev)
+        lev[radiance] = -999.0
+    lev[rlev == np.finfo(np.float32).max] = -999.0
+    lev = lev.astype(np.float32)
+
+    impact = np.stack([data['fso_dry'], data['fso_moist'], data['fso_kin']], axis=1)
+    impact = impact[:, :nmetric].astype(np.float32)
+
+    return (obtype, platform, channel, data['rlat'].astype(np.float32),
+            data['rlon'].astype(np.float32), lev, data['omb'].astype(np.float32),
+            data['oberr'].astype(np.float32), impact)
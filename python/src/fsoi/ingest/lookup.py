@@ -0,0 +1,46 @@
+"""
+Map observation keys (e.g. instrument type and station string) to platforms and channels.  Raw
+files have millions of observations but only a few hundred distinct keys, so the key columns are
+factorized, each unique key is resolved once, and the results are broadcast back to every row.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+def factorize(*columns):
+    """
+    Encode the unique combinations of one or more key columns
+    :param columns: {array-like} Key columns, all the same length
+    :return: ({numpy.ndarray}, {list}) Code of each row, and the unique keys (tuples) by code
+    """
+    n = len(columns[0])
+    codes = np.zeros(n, dtype=np.int64)
+    for column in columns:
+        column_codes, column_uniques = pd.factorize(np.asarray(column))
+        codes, _ = pd.factorize(codes * max(len(column_uniques), 1) + column_codes)
+
+    # take each unique key from its first row to keep the original values and types
+    _, first = np.unique(codes, return_index=True)
+    values = [np.asarray(column)[first].tolist() for column in columns]
+    keys = list(zip(*values))
+
+    return codes, keys
+
+
+def map_unique(function, *columns, nresults=1):
+    """
+    Apply a function once per unique key and broadcast the results to every row
+    :param function: {function} Called as function(*key)
+    :param columns: {array-like} Key columns, all the same length
+    :param nresults: {int} Number of values returned by the function (as a tuple if > 1)
+    :return: {numpy.ndarray} Results for each row, or a tuple of nresults arrays
+    """
+    codes, keys = factorize(*columns)
+    results = [function(*key) for key in keys]
+
+    if nresults == 1:
+        return np.asarray(results)[codes]
+
+    results = list(zip(*results)) if results else [[]] * nresults
+    return tuple(np.asarray(values)[codes] for values in results)
@@ -2,8 +2,14 @@ import os
 import sys
 import gzip
 import numpy as np
+import pandas as pd
 from datetime import datetime
 from fortranformat import FortranRecordReader
+from fsoi import log
+from fsoi.ingest.lookup import map_unique
+from fsoi.ingest.fortran_io import read_formatted
+from fsoi.ingest.engine import Decoder
+from fsoi.ingest.engine import register
 from argparse import ArgumentParser, ArgumentDefaultsHelpFormatter
 import fsoi.stats.lib_utils as lutils
 import fsoi.stats.lib_obimpact as loi
@@ -27,6 +33,15 @@ def kt_def():
     return kt
 
 
+# fortran format of each line in the MET files
+FORTRAN_FORMAT = 'i8,1x,e15.8,1x,e15.8,1x,e16.8,1x,f6.2,1x,f6.2,1x,f10.4,1x,i3,1x,i5,1x,i6,1x,' \
+                 'e14.8,1x,f6.2,1x,a35'
+
+# pylint wrongly believes that the FortranRecordReader constructor is not callable
+# pylint: disable=E1102
+LINE_READER = FortranRecordReader(FORTRAN_FORMAT)
+
+
 def parse_line(line, kt):
     """
 
@@ -34,13 +49,7 @@ def parse_line(line, kt):
     :param kt:
     :return:
     """
-    fmtstr = 'i8,1x,e15.8,1x,e15.8,1x,e16.8,1x,f6.2,1x,f6.2,1x,f10.4,1x,i3,1x,i5,1x,i6,1x,' \
-             'e14.8,1x,f6.2,1x,a35'
-    # pylint wrongly believes that the FortranRecordReader constructor is not callable
-    # pylint: disable=E1102
-    line_reader = FortranRecordReader(fmtstr)
-
-    datain = line_reader.read(line)
+    datain = LINE_READER.read(line)
 
     ob = datain[1]
     omf = datain[2]
@@ -57,15 +66,10 @@ def parse_line(line, kt):
 
     if obtyp == 10:  # Radiances
         platform, channel = get_radiance(schar)
-        if platform == 'UNKNOWN':
-            print('MISSING RAD : ', platform, channel, ' | ', schar)
     else:  # Conventional
         platform, channel = get_conventional(instyp, schar)
-        if platform == 'UNKNOWN':
-            print('MISSING CONV: ', platform, instyp, ' | ', schar)
 
     if skip_ob(obtyp, instyp, oberr, impact):
-        print('SKIPPING : ', line.strip())
         return None
 
     dataout = {}
@@ -206,6 +210,47 @@ def get_radiance(schar):
     return platform, channel
 
 
+def get_platform_channel(obtyp, instyp, schar):
+    """
+    Get the platform and channel for arrays of observations, resolved once per unique key
+    :param obtyp: {numpy.ndarray} Observation type of each observation (10 for radiances)
+    :param instyp: {numpy.ndarray} Instrument type of each observation
+    :param schar: {numpy.ndarray} Station string of each observation
+    :return: ({numpy.ndarray}, {numpy.ndarray}) platform and channel of each observation
+    """
+    rad = obtyp == 10
+    platform = np.empty(len(obtyp), dtype=object)
+    channel = np.empty(len(obtyp), dtype=np.int64)
+
+    platform[rad], channel[rad] = map_unique(get_radiance, schar[rad], nresults=2)
+    platform[~rad], channel[~rad] = map_unique(get_conventional, instyp[~rad], schar[~rad],
+                                               nresults=2)
+
+    return platform, channel
+
+
+def report_unknown(obtyp, instyp, schar, platform):
+    """
+    Log one table with the number of observations of each unknown platform
+    :param obtyp: {numpy.ndarray} Observation type of each observation (10 for radiances)
+    :param instyp: {numpy.ndarray} Instrument type of each observation
+    :param schar: {numpy.ndarray} Station string of each observation
+    :param platform: {numpy.ndarray} Platform of each observation
+    :return: None
+    """
+    unknown = platform == 'UNKNOWN'
+    if not unknown.any():
+        return
+
+    table = pd.DataFrame({
+        'TYPE': np.where(obtyp[unknown] == 10, 'RAD', 'CONV'),
+        'INSTYP': instyp[unknown],
+        'STATION': [s.strip() for s in schar[unknown]]
+    }).value_counts().rename('COUNT').reset_index()
+    log.warning('MISSING platforms for %d observations:\n%s' %
+                (unknown.sum(), table.to_string(index=False)))
+
+
 def skip_ob(obtyp, instyp, oberr, impact):
     """
 
@@ -215,11 +260,76 @@ def skip_ob(obtyp, instyp, oberr, impact):
     :param impact:
     :return:
     """
-    # discard obs with very large impact
-    if np.abs(impact) > 1.e-3:
-        return True
+    # discard obs with very large impact (works on scalars or arrays)
+    return np.abs(impact) > 1.e-3
+
+
+def decode_met(fname):
+    """
+    Decode a (gzipped) Met Office impact file into columns
+    :param fname: {str} Full path to the raw file
+    :return: {dict} An array for each column, @see fsoi.ingest.engine.COLUMNS, or None if empty
+    """
+    try:
+        fh = gzip.open(fname, 'rb')
+    except RuntimeError as e:
+        raise IOError(e, fname)
+
+    kt = kt_def()
+
+    lines = fh.read().splitlines()
+    fh.close()
+    if not lines:
+        return None
+
+    # decode all lines into columns at once
+    fields = read_formatted(lines, FORTRAN_FORMAT, usecols=[2, 3, 4, 5, 6, 7, 8, 10, 12])
+    omf = fields[2]
+    impact = omf * fields[3]
+    obtyp = fields[7]
+    instyp = fields[8]
+    oberr = fields[10]
+    schar = map_unique(lambda s: s.decode('latin-1'), fields[12]).astype(object)
+
+    # resolve platforms once per unique key, then discard observations
+    platform, channel = get_platform_channel(obtyp, instyp, schar)
+    report_unknown(obtyp, instyp, schar, platform)
+    skip = skip_ob(obtyp, instyp, oberr, impact)
+    if skip.any():
+        log.info('SKIPPING %d observations with |impact| > 1.e-3' % skip.sum())
+    keep = ~skip
+
+    lon = fields[5][keep]
+    lev = fields[6][keep]
+    return {
+        'PLATFORM': platform[keep],
+        'OBTYPE': map_unique(lambda t: kt[t][0], obtyp[keep]),
+        'CHANNEL': channel[keep],
+        'LONGITUDE': np.where(lon >= 0.0, lon, lon + 360.0),
+        'LATITUDE': fields[4][keep],
+        'PRESSURE': np.where(lev == -9999.9999, -999., lev),
+        'IMPACT': impact[keep],
+        'OMF': omf[keep],
+        'OBERR': oberr[keep]
+    }
+
+
+@register('MET')
+class METDecoder(Decoder):
+    """
+    Decode the Met Office impact file of a cycle
+    """
+    pattern = '%(ymd)sT%(hour)s00Z.FSO.gz'
 
-    return False
+    def decode(self, source, date, norm):
+        """
+        Decode a raw file
+        :param source: {str} Full path to the raw file
+        :param date: {str} Date string in the format YYYYMMDDHH
+        :param norm: {str} dry or moist
+        :return: {generator} Yields the columns of the file
+        """
+        yield decode_met(source)
 
 
 def main():
@@ -239,43 +349,11 @@ def main():
     fname_out = args.output
     adate = datetime.strptime(args.adate, '%Y%m%d%H')
 
-    try:
-        fh = gzip.open(fname, 'rb')
-    except RuntimeError as e:
-        raise IOError(e, fname)
-
-    kt = kt_def()
-
-    lines = fh.readlines()
-    fh.close()
-
-    bufr = []
-    nobs = 0
-    for line in lines:
-
-        data = parse_line(line, kt)
-
-        if data is None:
-            continue
-
-        nobs += 1
-
-        plat = data['platform']
-        channel = data['channel']
-        obtype = data['obtype']
-        lon = data['lon'] if data['lon'] >= 0.0 else data['lon'] + 360.0
-        lat = data['lat']
-        lev = data['lev']
-        imp = data['impact']
-        omf = data['omf']
-        oberr = data['oberr']
-
-        line = [plat, obtype, channel, lon, lat, lev, imp, omf, oberr]
-
-        bufr.append(line)
+    columns = decode_met(fname)
+    nobs = 0 if columns is None else len(columns['IMPACT'])
 
-    if bufr != []:
-        df = loi.list_to_dataframe(adate, bufr)
+    if nobs > 0:
+        df = loi.columns_to_dataframe(adate, columns)
         if os.path.isfile(fname_out): os.remove(fname_out)
         lutils.writeHDF(fname_out, 'df', df, complevel=1, complib='zlib', fletcher32=True)
 
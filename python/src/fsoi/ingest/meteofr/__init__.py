@@ -1,4 +1,4 @@
 """
 FSOI Ingest MeteoFr
 """
-__all__ = ['check_MeteoFr', 'process_MeteoFr']
+__all__ = ['check_MeteoFr', 'process_MeteoFr', 'stream_MeteoFr']
@@ -1,30 +1,26 @@
+import io
 import os
 import sys
-import glob
-import tempfile
-import tarfile
 import numpy as np
 import pandas as pd
 from datetime import datetime
 from argparse import ArgumentParser, ArgumentDefaultsHelpFormatter
 from matplotlib import pyplot as plt
+from fsoi.ingest.meteofr.stream_MeteoFr import map_members
 
 
-def parse_date(datadir, adate):
+def parse_date(datadir, adate, processes=None):
     """
     Call the appropriate file parser depending on platform
+    :param datadir: {str} Directory containing deltaJ.all_obs.bg.tar.gz
+    :param adate: {datetime} Analysis date
+    :param processes: {int} Number of worker processes used to parse the tar members
+    :return: {pandas.DataFrame} Data for all platforms
     """
 
-    tmpdir = tempfile.mkdtemp()
-    tf = tarfile.open('%s/deltaJ.all_obs.bg.tar.gz' % datadir)
-    tf.extractall(path=tmpdir)
-    flist = glob.glob('%s/deltaJ.*.bg.lst' % tmpdir)
-    tmpdf = []
-    for fname in flist:
-        if os.stat(fname).st_size == 0:
-            print('%s is an empty file ... skipping' % fname)
-            continue
-        tmpdf.append(read_file(fname))
+    tarname = '%s/deltaJ.all_obs.bg.tar.gz' % datadir
+    tmpdf = [data for _, data in map_members(read_member, tarname, 'deltaJ.*.bg.lst',
+                                             processes=processes)]
     data = pd.concat(tmpdf, axis=0)
 
     old_platform_names = ['aircraft', 'buoy', 'gpsro', 'pilot', 'satem_airs', 'satem_amsua',
@@ -43,26 +39,36 @@ def parse_date(datadir, adate):
     data.set_index(['DATETIME', 'PLATFORM'], inplace=True)
     data = data.reorder_levels(['DATETIME', 'PLATFORM'])
 
-    data['TotImp'] = data['TotImp'].astype(np.float) * 1.e-5
-    data['TotImpDet'] = data['TotImpDet'].astype(np.float) * 1.e-5
-    data['ObCnt'] = data['ObCnt'].astype(np.int)
-    data['ObCntBen'] = data['ObCntBen'].astype(np.int)
-    data['ObCntDet'] = data['ObCntDet'].astype(np.int)
+    data['TotImp'] *= 1.e-5
+    data['TotImpDet'] *= 1.e-5
 
     return data
 
 
+def read_member(name, data):
+    """
+    Read a tar member into a dataframe
+    :param name: {str} Member name
+    :param data: {bytes} Member content
+    :return: {pandas.DataFrame} Data in the member
+    """
+    return read_file(io.BytesIO(data))
+
+
 def read_file(fname):
     """
     Read a file into a dataframe
+    :param fname: {str|file} Full path to the file, or a file object
+    :return: {pandas.DataFrame} Data in the file
     """
     names = ['obtype', 'PLATFORM', 'TotImp', 'ObCnt', 'ObCntBen', 'ObCntDet', 'TotImpDet']
+    dtype = {'PLATFORM': object, 'TotImp': np.float64, 'ObCnt': np.int64, 'ObCntBen': np.int64,
+             'ObCntDet': np.int64, 'TotImpDet': np.float64}
     try:
-        data = pd.read_csv(fname, header=None, delim_whitespace=True, skipinitialspace=True,
-                           names=names)
+        data = pd.read_csv(fname, header=None, sep=r'\s+', names=names, usecols=names[1:],
+                           dtype=dtype)
     except RuntimeError:
         raise
-    data.drop(['obtype'], axis=1, inplace=True)
 
     return data
 
@@ -81,6 +87,8 @@ def main():
                         default='2014120100', required=False)
     parser.add_argument('-e', '--end_date', help='dataset end date', type=str, default='2015022818',
                         required=False)
+    parser.add_argument('-p', '--processes', help='number of worker processes', type=int,
+                        default=None, required=False)
     args = parser.parse_args()
 
     datapthin = args.indir
@@ -101,7 +109,7 @@ def main():
             adatestr = adate.strftime('%Y%m%d%H')
             print('processing %s' % adatestr)
             datadir = os.path.join(datapthin, norm, adatestr)
-            tmpdata.append(parse_date(datadir, adate))
+            tmpdata.append(parse_date(datadir, adate, args.processes))
         df = pd.concat(tmpdata, axis=0)
 
         # Write to a file
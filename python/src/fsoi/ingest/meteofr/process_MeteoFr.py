@@ -1,38 +1,66 @@
+import io
 import os
 import sys
-import glob
-import shutil
-import tarfile
 import numpy as np
 import pandas as pd
 from datetime import datetime
 from argparse import ArgumentParser, ArgumentDefaultsHelpFormatter
 import fsoi.stats.lib_utils as lutils
+from fsoi.ingest.meteofr.stream_MeteoFr import map_members
+from fsoi.ingest.engine import COLUMNS
+from fsoi.ingest.engine import Decoder
+from fsoi.ingest.engine import register
 
 
-def parse_file(adate, fname):
+# columns of the ODB listings that are never used
+DROP_COLUMNS = ['date@hdr', 'time@hdr', 'seqno@hdr', 'an_depar@body', 'fg_error@errstat']
+
+# types of the measured columns; ids and levels are inferred (statid is a number or a str, and
+# vertco_reference_1 is the channel number for radiances)
+COLUMN_TYPES = {
+    'lat@hdr': np.float64,
+    'lon@hdr': np.float64,
+    'fg_depar@body': np.float64,
+    'fc_sens_obs@body': np.float64,
+    'obs_error@errstat': np.float64
+}
+
+
+def parse_member(name, data, adate):
+    """
+    Parse a member of the ODB tarball
+    :param name: {str} Member name, e.g. fic_odb.satem_iasi.bg.lst
+    :param data: {bytes} Member content
+    :param adate: {datetime} Analysis date
+    :return: {pandas.DataFrame} Parsed data, or None if the platform is not processed
+    """
+    return parse_file(adate, name, io.BytesIO(data))
+
+
+def parse_file(adate, fname, source=None):
     """
     Call the appropriate file parser depending on platform
     :param adate:
-    :param fname:
+    :param fname: {str} File name, used to determine the platform
+    :param source: {file} File object to read instead of fname
     :return:
     """
     ffname = os.path.basename(fname)
     platform = ffname.split('.')[1]
 
     if platform in ['aircraft', 'buoy', 'pilot', 'synop_gpssol', 'synop_insitu', 'temp']:
-        data = parse_conv(fname)
+        data = parse_conv(fname, source)
 
     elif platform in ['satem_airs', 'satem_amsua', 'satem_amsub', 'satem_atms', 'satem_cris',
                       'satem_goesimg', 'satem_hirs', 'satem_iasi', 'satem_mhs', 'satem_seviri',
                       'satem_ssmis', 'scatt']:
-        data = parse_satem(fname)
+        data = parse_satem(fname, source)
 
     elif platform in ['satwind']:
-        data = parse_satwind(fname)
+        data = parse_satwind(fname, source)
 
     elif platform in ['gpsro']:
-        data = parse_gpsro(fname)
+        data = parse_gpsro(fname, source)
 
     else:
         return None
@@ -43,7 +71,7 @@ def parse_file(adate, fname):
     return data
 
 
-def parse_conv(fname):
+def parse_conv(fname, source=None):
     """
     Parse conventional observations file
     """
@@ -51,12 +79,10 @@ def parse_conv(fname):
     plat_ids, plat_names = get_platid_platname()
     var_ids, var_names = get_varid_varname()
 
-    data = read_file(fname)
-
-    data.drop(['obstype@hdr', 'statid@hdr'], axis=1, inplace=True)
+    data = read_file(fname if source is None else source, drop=['obstype@hdr', 'statid@hdr'])
 
-    data['varno@body'].replace(to_replace=var_ids, value=var_names, inplace=True)
-    data['codetype@hdr'].replace(to_replace=plat_ids, value=plat_names, inplace=True)
+    data['varno@body'] = map_ids(data['varno@body'], var_ids, var_names)
+    data['codetype@hdr'] = map_ids(data['codetype@hdr'], plat_ids, plat_names)
 
     old_names = ['lat@hdr', 'lon@hdr', 'codetype@hdr', 'varno@body', 'vertco_reference_1@body',
                  'fg_depar@body', 'fc_sens_obs@body', 'obs_error@errstat']
@@ -69,7 +95,7 @@ def parse_conv(fname):
     return data
 
 
-def parse_satem(fname):
+def parse_satem(fname, source=None):
     """
     Parse satellite radiances and scatterometer file
     """
@@ -85,13 +111,11 @@ def parse_satem(fname):
     else:
         sat_names = [instrument.upper() + '_%s' % sat_name for sat_name in sat_names]
 
-    data = read_file(fname)
-
-    data.drop(['obstype@hdr', 'codetype@hdr', 'instrument_type@hdr', 'sensor@hdr'], axis=1,
-              inplace=True)
+    data = read_file(fname if source is None else source,
+                     drop=['obstype@hdr', 'codetype@hdr', 'instrument_type@hdr', 'sensor@hdr'])
 
-    data['statid@hdr'].replace(to_replace=sat_ids, value=sat_names, inplace=True)
-    data['varno@body'].replace(to_replace=var_ids, value=var_names, inplace=True)
+    data['statid@hdr'] = map_ids(data['statid@hdr'], sat_ids, sat_names)
+    data['varno@body'] = map_ids(data['varno@body'], var_ids, var_names)
 
     old_names = ['lat@hdr', 'lon@hdr', 'varno@body', 'vertco_reference_1@body', 'fg_depar@body',
                  'fc_sens_obs@body', 'obs_error@errstat', 'statid@hdr']
@@ -108,7 +132,7 @@ def parse_satem(fname):
     return data
 
 
-def parse_satwind(fname):
+def parse_satwind(fname, source=None):
     """
     Parse satellite winds file
     """
@@ -116,12 +140,11 @@ def parse_satwind(fname):
     sat_ids, sat_names = get_satwindid_satwindname()
     var_ids, var_names = get_varid_varname()
 
-    data = read_file(fname)
+    data = read_file(fname if source is None else source,
+                     drop=['obstype@hdr', 'codetype@hdr', 'comp_method@satob'])
 
-    data.drop(['obstype@hdr', 'codetype@hdr', 'comp_method@satob'], axis=1, inplace=True)
-
-    data['statid@hdr'].replace(to_replace=sat_ids, value=sat_names, inplace=True)
-    data['varno@body'].replace(to_replace=var_ids, value=var_names, inplace=True)
+    data['statid@hdr'] = map_ids(data['statid@hdr'], sat_ids, sat_names)
+    data['varno@body'] = map_ids(data['varno@body'], var_ids, var_names)
 
     old_names = ['lat@hdr', 'lon@hdr', 'varno@body', 'vertco_reference_1@body', 'fg_depar@body',
                  'fc_sens_obs@body', 'obs_error@errstat', 'statid@hdr']
@@ -134,19 +157,18 @@ def parse_satwind(fname):
     return data
 
 
-def parse_gpsro(fname):
+def parse_gpsro(fname, source=None):
     """
     Parse GPSRO file
     """
 
     var_ids, var_names = get_varid_varname()
 
-    data = read_file(fname)
-
-    data.drop(['obstype@hdr', 'codetype@hdr', 'instrument_type@hdr', 'vertco_reference_1@body',
-               'statid@hdr'], axis=1, inplace=True)
+    data = read_file(fname if source is None else source,
+                     drop=['obstype@hdr', 'codetype@hdr', 'instrument_type@hdr',
+                           'vertco_reference_1@body', 'statid@hdr'])
 
-    data['varno@body'].replace(to_replace=var_ids, value=var_names, inplace=True)
+    data['varno@body'] = map_ids(data['varno@body'], var_ids, var_names)
 
     old_names = ['lat@hdr', 'lon@hdr', 'varno@body', 'vertco_reference_2@body', 'fg_depar@body',
                  'fc_sens_obs@body', 'obs_error@errstat']
@@ -159,39 +181,57 @@ def parse_gpsro(fname):
     return data
 
 
-def read_file(fname):
+def read_file(fname, drop=()):
     """
     Read a file into a dataframe
     Drop the useless columns
     Convert latitude, LONGITUDE from radians to degrees
     Rescale impact by 1.e5 because units in the file are JPa/kg
+    :param fname: {str|file} Full path to the file, or a file object
+    :param drop: {list} Additional columns that are not read
     """
 
+    skip = set(DROP_COLUMNS).union(drop)
     try:
-        data = pd.read_csv(fname, header=0, delim_whitespace=True, skipinitialspace=True,
-                           index_col=False, quotechar="'")
+        data = pd.read_csv(fname, header=0, sep=r'\s+', index_col=False, quotechar="'",
+                           usecols=lambda column: column not in skip, dtype=COLUMN_TYPES)
     except RuntimeError:
         print('Error reading %s' % fname)
         raise
 
-    data.drop(['date@hdr', 'time@hdr', 'seqno@hdr', 'an_depar@body', 'fg_error@errstat'], axis=1,
-              inplace=True)
-
-    lats = data['lat@hdr'].values * 180. / np.pi
-    lons = data['lon@hdr'].values * 180. / np.pi
-    lons[lons < 0.] = lons[lons < 0.] + 360.
+    lats = data['lat@hdr'].to_numpy(dtype=np.float64, copy=True)
+    lons = data['lon@hdr'].to_numpy(dtype=np.float64, copy=True)
+    for values in [lats, lons]:
+        values *= 180.
+        values /= np.pi
+    lons[lons < 0.] += 360.
     lats[lats < -90.] = -90.
     data['lat@hdr'] = lats
     data['lon@hdr'] = lons
-    data['fc_sens_obs@body'] = data['fc_sens_obs@body'] * 1.e-5
+    data['fc_sens_obs@body'] *= 1.e-5
 
     return data
 
 
+def map_ids(values, ids, names):
+    """
+    Translate ids to names, looking up each distinct id only once
+    :param values: {pandas.Series} ids read from the file
+    :param ids: {list} Known ids
+    :param names: {list} Name of each known id
+    :return: {pandas.Categorical} Names; unknown ids are kept as str
+    """
+    lookup = dict(zip(ids, names))
+    codes, uniques = pd.factorize(values, sort=False)
+    labels = [lookup.get(value, str(value)) for value in uniques.tolist()]
+    categories, label_codes = np.unique(labels, return_inverse=True)
+    return pd.Categorical.from_codes(np.where(codes < 0, -1, label_codes[codes]), categories)
+
+
 def reorder_columns(df):
     new_order = ['DATETIME', 'PLATFORM', 'OBTYPE', 'CHANNEL', 'LONGITUDE', 'LATITUDE', 'PRESSURE',
                  'IMPACT', 'OMF', 'OBERR']
-    df = df[new_order]
+    df = df[new_order].astype({'PLATFORM': object, 'OBTYPE': object})
     df.set_index(new_order[0:4], inplace=True)
 
     return df
@@ -265,6 +305,29 @@ def get_satid_satname():
     return sat_ids, sat_names
 
 
+@register('MeteoFr')
+class MeteoFrDecoder(Decoder):
+    """
+    Decode the Meteo France ODB tarball of a cycle, member by member
+    """
+    pattern = os.path.join('%(norm)s', '%(date)s', 'fic_odb.all_obs.bg.tar.gz')
+
+    def decode(self, source, date, norm):
+        """
+        Decode the members of a tarball
+        :param source: {str} Full path to the tarball
+        :param date: {str} Date string in the format YYYYMMDDHH
+        :param norm: {str} dry or moist
+        :return: {generator} Yields the columns of each processed member
+        """
+        adate = datetime.strptime(date, '%Y%m%d%H')
+        for ffname, data in map_members(parse_member, source, 'fic_odb.*.bg.lst', args=(adate,)):
+            if data is None:
+                continue
+            data = data.reset_index()
+            yield {column: data[column].values for column in COLUMNS}
+
+
 if __name__ == '__main__':
 
     parser = ArgumentParser(description='Process Meteo France data',
@@ -275,6 +338,8 @@ if __name__ == '__main__':
     parser.add_argument('-a', '--adate', help='analysis date to process', metavar='YYYYMMDDHH',
                         required=True)
     parser.add_argument('-n', '--norm', help='norm to process', type=str, required=True)
+    parser.add_argument('-p', '--processes', help='number of worker processes', type=int,
+                        default=None, required=False)
     args = parser.parse_args()
 
     datapth = args.indir
@@ -283,27 +348,18 @@ if __name__ == '__main__':
     norm = args.norm
 
     datadir = os.path.join(datapth, norm, args.adate)
-    workdir = os.path.join(datadir, 'work')
-    if os.path.isdir(workdir): shutil.rmtree(workdir)
-    os.makedirs(workdir)
-
-    tf = tarfile.open('%s/fic_odb.all_obs.bg.tar.gz' % datadir)
-    tf.extractall(path=workdir)
-    flist = glob.glob('%s/fic_odb.*.bg.lst' % workdir)
+    tarname = '%s/fic_odb.all_obs.bg.tar.gz' % datadir
 
     nobs = 0
     bufr = []
-    for fname in flist:
-
-        ffname = os.path.basename(fname)
+    for ffname, data in map_members(parse_member, tarname, 'fic_odb.*.bg.lst', args=(adate,),
+                                    processes=args.processes):
 
         print('processing %s' % ffname)
 
-        if os.stat(fname).st_size == 0:
-            print('%s is an empty file ... skipping' % ffname)
+        if data is None:
             continue
 
-        data = parse_file(adate, fname)
         print('number of observations in %s = %d ' % (ffname, len(data)))
 
         nobs += len(data)
@@ -316,6 +372,4 @@ if __name__ == '__main__':
 
     print('total number of observations for %s = %d' % (args.adate, nobs))
 
-    shutil.rmtree(workdir)
-
     sys.exit(0)
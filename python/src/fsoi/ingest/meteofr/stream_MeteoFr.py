@@ -0,0 +1,68 @@
+"""
+Read Meteo France tarballs member by member, without extracting them to a temporary directory.
+Members are read sequentially from the (compressed) archive stream and parsed in parallel in a
+pool of worker processes.
+"""
+
+import os
+import fnmatch
+import tarfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+
+def iter_members(tarname, pattern='*'):
+    """
+    Iterate over the regular files in a tar archive, in archive order, as a stream
+    :param tarname: {str|file} Full path to the tar archive, or an open binary file object
+    :param pattern: {str} Only yield members whose base name matches this glob pattern
+    :return: {generator} Yields (name, data) where name is the member base name and data {bytes}
+    """
+    if isinstance(tarname, str):
+        tf = tarfile.open(tarname, mode='r|*')
+    else:
+        tf = tarfile.open(fileobj=tarname, mode='r|*')
+
+    with tf:
+        for member in tf:
+            if not member.isfile():
+                continue
+            name = os.path.basename(member.name)
+            if not fnmatch.fnmatch(name, pattern):
+                continue
+            if member.size == 0:
+                print('%s is an empty file ... skipping' % name)
+                continue
+            yield name, tf.extractfile(member).read()
+
+
+def map_members(function, tarname, pattern='*', args=(), processes=None):
+    """
+    Apply a function to every member of a tar archive in a pool of worker processes
+    :param function: {function} Top-level function called as function(name, data, *args)
+    :param tarname: {str|file} Full path to the tar archive, or an open binary file object
+    :param pattern: {str} Only process members whose base name matches this glob pattern
+    :param args: {tuple} Additional arguments passed to the function
+    :param processes: {int} Number of worker processes (default: CPU count, 1: no pool)
+    :return: {generator} Yields (name, result) in archive order
+    """
+    members = iter_members(tarname, pattern)
+
+    if processes == 1:
+        for name, data in members:
+            yield name, function(name, data, *args)
+        return
+
+    # keep a few members per worker in flight so that the archive is not read into memory at once
+    processes = processes or os.cpu_count() or 1
+    window = 2 * processes
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        pending = deque()
+        for name, data in members:
+            pending.append((name, pool.submit(function, name, data, *args)))
+            if len(pending) >= window:
+                name, future = pending.popleft()
+                yield name, future.result()
+        while pending:
+            name, future = pending.popleft()
+            yield name, future.result()
@@ -5,15 +5,17 @@ __all__ = ['download_nrl', 'process_nrl', 'download_and_process_nrl']
 
 
 import os
-import yaml
-import pkgutil
+import time
+import json
 from argparse import ArgumentParser
 from argparse import ArgumentDefaultsHelpFormatter as HelpFormatter
 from fsoi.ingest.nrl.download_nrl import download_nrl
+from fsoi.ingest.nrl.download_nrl import stream_nrl
 from fsoi.ingest.nrl.process_nrl import prepare_workspace
 from fsoi.ingest.nrl.process_nrl import download_from_s3
 from fsoi.ingest.nrl.process_nrl import process_nrl
 from fsoi.ingest.nrl.process_nrl import upload_to_s3
+import fsoi.config as fconfig
 from fsoi import log
 
 
@@ -23,7 +25,7 @@ def download_and_process_nrl():
     :return: None
     """
     # load default values from the resource file
-    config = yaml.full_load(pkgutil.get_data('fsoi', 'resources/fsoi/ingest/nrl/nrl_ingest.yaml'))
+    config = fconfig.get('nrl_ingest')
     bucket = config['raw_data_bucket']
     ftp_host = config['ftp_host']
     lag_in_days = config['lag_in_days']
@@ -39,11 +41,10 @@ def download_and_process_nrl():
     parser.add_argument('--s3-bucket', help='Store in this bucket', default=bucket)
     parser.add_argument('--output-bucket', help='S3 for processed data', default=output_bucket)
     parser.add_argument('--output-prefix', help='S3 for processed data', default=output_prefix)
+    parser.add_argument('--stream', help='parse the FTP stream directly while archiving it to S3',
+                        action='store_true')
     args = parser.parse_args()
 
-    # download the file from NRL
-    input_file_s3_url = download_nrl(args.lag, args.host, args.remote_path, args.s3_bucket)
-
     # prepare the working directory
     workspace = prepare_workspace()
     if workspace is None:
@@ -51,13 +52,42 @@ def download_and_process_nrl():
         return
     os.chdir(workspace)
 
-    # download the input file from S3
-    bzip_file = download_from_s3(input_file_s3_url)
+    if args.stream:
+        # tee the FTP stream to S3 and to the parser
+        status = {'ok': False, 'runtime': int(time.time()), 'size': -1, 'name': 'n/a'}
+        tee = stream_nrl(args.lag, args.host, args.remote_path, args.s3_bucket)
+        date = tee.target['key'].split('_')[2][:-4]
+        output_file = 'NRL.dry.%s.h5' % date
+        try:
+            processed_files = process_nrl(tee, workspace, output_file, date)
+        except (IOError, EOFError) as e:
+            log.error('Failed to read NRL stream: %s' % e)
+            processed_files = None
+        finally:
+            tee.local.discard()
+
+        # wait for the raw file to be archived and print our CloudWatch information
+        status['ok'] = tee.join()
+        status['size'] = tee.size
+        status['name'] = tee.target['key']
+        print(json.dumps(status))
+        if not status['ok']:
+            log.error('Failed to archive raw file: s3://%s/%s' % (args.s3_bucket, status['name']))
+    else:
+        # download the file from NRL
+        input_file_s3_url = download_nrl(args.lag, args.host, args.remote_path, args.s3_bucket)
+
+        # download the input file from S3
+        bzip_file = download_from_s3(input_file_s3_url)
 
-    # process the NRL file
-    date = bzip_file.split('_')[2][:-4]
-    output_file = 'NRL.dry.%s.h5' % date
-    processed_files = process_nrl(bzip_file, workspace, output_file, date)
+        # process the NRL file
+        date = bzip_file.split('_')[2][:-4]
+        output_file = 'NRL.dry.%s.h5' % date
+        processed_files = process_nrl(bzip_file, workspace, output_file, date)
+
+    if not processed_files:
+        log.error('Failed to process NRL file for %s' % date)
+        return
 
     # upload the processed file to S3 target
     for processed_file in processed_files:
@@ -7,13 +7,15 @@ This script is intended to be called once per day by CloudWatch Events.
 import os
 import time
 import datetime
-import pkgutil
 import json
 import boto3
-import yaml
+from threading import Thread
 from ftplib import FTP
 from argparse import ArgumentParser
 from argparse import ArgumentDefaultsHelpFormatter as HelpFormatter
+from fsoi.data.s3_datastore import S3DataStore
+from fsoi.data.tee import TeeStream
+import fsoi.config as fconfig
 from fsoi import log
 
 
@@ -47,6 +49,67 @@ def ftp_download_file(host, remote_file, local_file=None):
     return local_file
 
 
+def ftp_stream_file(host, remote_file, callback):
+    """
+    Stream a file from an FTP site anonymously, passing each block of data to a callback
+    :param host: FTP hostname
+    :param remote_file: Full path to the remote file
+    :param callback: {function} Called with each block of data as {bytes}
+    :return: None
+    """
+    # connect and login
+    ftp = FTP(host)
+    ftp.login()
+    ftp.makepasv()
+
+    # parse file names
+    remote_dir = remote_file[0:remote_file.rfind('/')]
+    remote_file_only = remote_file[1 + remote_file.rfind('/'):]
+
+    # log info
+    log.info('attempting to stream ftp://%s/%s' % (host, remote_file))
+
+    # stream the remote file
+    ftp.cwd(remote_dir)
+    ftp.retrbinary('RETR ' + remote_file_only, callback)
+    ftp.quit()
+
+
+def stream_nrl(lag, ftp_host, remote_file_template, bucket_name):
+    """
+    Stream a file from NRL: the raw bytes are archived to S3 in the background, and the returned
+    stream can be read (e.g. decompressed and parsed) while the transfer is still in progress
+    :param lag: {int} Look for the file N days ago
+    :param ftp_host: {str} The FTP host name (FQDN)
+    :param remote_file_template: {str} The template to create the remote file name
+    :param bucket_name: {str} The bucket name where the file should be archived
+    :return: {TeeStream} The raw bzip2 stream; target['key'] is the file name, join() waits for S3
+    """
+    # compute the date and remote file name
+    date = datetime.datetime.utcfromtimestamp(time.time() - lag * 86400)
+    date_str = '%04d%02d%02d' % (date.year, date.month, date.day)
+    remote_file = remote_file_template.replace('DATE', date_str)
+
+    # create the S3 object key and start archiving
+    key = remote_file[remote_file.rfind('/') + 1:]
+    log.info('archiving stream to s3://%s/%s' % (bucket_name, key))
+    tee = TeeStream(S3DataStore(), {'bucket': bucket_name, 'key': key})
+
+    def transfer():
+        try:
+            ftp_stream_file(ftp_host, remote_file, tee.write)
+            tee.close()
+        except Exception as e:
+            log.error('Failed to stream ftp://%s/%s' % (ftp_host, remote_file))
+            log.error(e)
+            tee.abort(e)
+
+    # start the transfer on a separate thread
+    Thread(target=transfer, daemon=True).start()
+
+    return tee
+
+
 def download_nrl(lag, ftp_host, remote_file_template, bucket_name):
     """
     A function to download a file from NRL and upload it to S3
@@ -100,7 +163,7 @@ def main():
     :return: None
     """
     # load default values from the resource file
-    config = yaml.full_load(pkgutil.get_data('fsoi', 'resources/fsoi/ingest/nrl/nrl_ingest.yaml'))
+    config = fconfig.get('nrl_ingest')
     bucket = config['raw_data_bucket']
     ftp_host = config['ftp_host']
     lag_in_days = config['lag_in_days']
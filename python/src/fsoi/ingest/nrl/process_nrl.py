@@ -1,13 +1,14 @@
 import os
 import bz2
-import pkgutil
-import yaml
 import boto3
 import shutil
-import fsoi.stats.lib_utils as lutils
-import fsoi.stats.lib_obimpact as loi
-from datetime import datetime
+import numpy as np
 from fortranformat import FortranRecordReader
+from fsoi.ingest.lookup import map_unique
+from fsoi.ingest.engine import Decoder
+from fsoi.ingest.engine import register
+from fsoi.ingest.engine import write_products
+import fsoi.config as fconfig
 from fsoi import log
 
 
@@ -76,12 +77,8 @@ def _skip_ob(instyp, impact):
     # if num_reject != 0:
     #    return True
 
-    # discard [land_surface,ship] obs with zero impact
-    if instyp in [1, 10]:
-        if impact == 0.:
-            return True
-
-    return False
+    # discard [land_surface,ship] obs with zero impact (works on scalars or arrays)
+    return np.isin(instyp, [1, 10]) & (impact == 0.)
 
 
 def _get_platform_channel(instyp, schar, kx):
@@ -213,21 +210,17 @@ def _get_platform_channel(instyp, schar, kx):
     return platform, channel
 
 
-def process_nrl(raw_bzip2_file, output_path, output_file, date):
+def decode_nrl(raw_bzip2_file):
     """
-    Process a raw NRL file
-    :param raw_bzip2_file: {str} Full path to a raw NRL gzip file
-    :param output_path: {str} Full path to the output directory
-    :param output_file: {str} Output file name only (will also create files with some prefixes)
-    :param date: {str} Date and time string in the format YYYYMMDDHH
-    :return: {list} A list of output files, or None
+    Decode a raw NRL file into columns
+    :param raw_bzip2_file: {str|object} Full path to a raw NRL bzip2 file, or a readable binary
+                           stream with the bzip2 data (e.g. a TeeStream)
+    :return: {dict} An array for each column, @see fsoi.ingest.engine.COLUMNS, or None
     """
-    parsed_date = datetime.strptime(date, '%Y%m%d%H')
-
     # open the raw data file
     try:
         fh = bz2.BZ2File(raw_bzip2_file, 'rb')
-    except RuntimeError as e:
+    except (RuntimeError, IOError) as e:
         log.error('Failed to open file: %s' % raw_bzip2_file)
         return None
 
@@ -240,71 +233,84 @@ def process_nrl(raw_bzip2_file, output_path, output_file, date):
     fh.close()
 
     # load constant values from a resources file
-    config = yaml.full_load(pkgutil.get_data('fsoi', 'resources/fsoi/ingest/nrl/nrl_ingest.yaml'))
+    config = fconfig.get('nrl_ingest')
     fortran_format = config['fortran_format_string']
     kt = config['kt']
     kx = config['kx']
 
-    # process each line
-    line_number = 75
-    n_obs = 0
-    bufr = []
-    for line in lines:
-
-        line_number += 1
-
-        # convert any byte array to a string
-        if isinstance(line, bytes):
-            line = line.decode()
-
-        data = _parse_line(line, kt, kx, fortran_format)
-
-        if data is None:
-            continue
-
-        n_obs += 1
-
-        plat = data['platform']
-        channel = data['channel']
-        obtype = data['obtype']
-        lon = data['lon'] if data['lon'] >= 0.0 else data['lon'] + 360.0
-        lat = data['lat']
-        lev = data['lev']
-        imp = data['impact']
-        omf = data['omf']
-        oberr = data['oberr']
-
-        line = [plat, obtype, channel, lon, lat, lev, imp, omf, oberr]
+    # parse each line into columns
+    # pylint wrongly believes that the FortranRecordReader constructor is not callable
+    # pylint: disable=E1102
+    line_reader = FortranRecordReader(fortran_format)
+    records = [line_reader.read(line.decode() if isinstance(line, bytes) else line)
+               for line in lines]
+    if not records:
+        return None
+    fields = list(zip(*records))
+    omf = np.array(fields[4], dtype=np.float64)
+    sens = np.array(fields[23], dtype=np.float64)
+    instyp = np.array(fields[11])
+    schar = np.char.add(np.char.add(np.array(fields[15], dtype=str), '  '),
+                        np.array(fields[16], dtype=str))
+    impact = omf * sens
 
-        bufr.append(line)
+    # discard observations, then resolve platforms and channels once per unique key
+    keep = ~_skip_ob(instyp, impact)
+    platform, channel = map_unique(lambda i, s: _get_platform_channel(i, s, kx),
+                                   instyp[keep], schar[keep], nresults=2)
+    obtype = map_unique(lambda t: kt[t][0], np.array(fields[10])[keep])
+    lon = np.array(fields[8], dtype=np.float64)[keep]
+    lon = np.where(lon >= 0.0, lon, lon + 360.0)
+
+    return {
+        'PLATFORM': platform,
+        'OBTYPE': obtype,
+        'CHANNEL': channel,
+        'LONGITUDE': lon,
+        'LATITUDE': np.array(fields[7], dtype=np.float64)[keep],
+        'PRESSURE': np.array(fields[9], dtype=np.float64)[keep],
+        'IMPACT': impact[keep],
+        'OMF': omf[keep],
+        'OBERR': np.array(fields[5], dtype=np.float64)[keep]
+    }
 
-    # write a file if bufr is not empty
-    output_files = []
-    if bufr:
-        out = '%s/%s' % (output_path, output_file)
-        df = loi.list_to_dataframe(parsed_date, bufr)
-        if os.path.isfile(out): os.remove(out)
-        lutils.writeHDF(out, 'df', df, complevel=1, complib='zlib', fletcher32=True)
-        output_files.append(out)
 
-        df = loi.BulkStats(df)
-        lutils.writeHDF('%s/bulk.%s' % (output_path, output_file), 'df', df)
-        output_files.append('%s/bulk.%s' % (output_path, output_file))
+@register('NRL')
+class NRLDecoder(Decoder):
+    """
+    Decode the raw NRL files (obimpact_gemops_YYYYMMDDHH.bz2)
+    """
+    pattern = 'obimpact_gemops_%(date)s.bz2'
 
-        df = loi.accumBulkStats(df)
-        lutils.writeHDF('%s/accumbulk.%s' % (output_path, output_file), 'df', df)
-        output_files.append('%s/accumbulk.%s' % (output_path, output_file))
+    def decode(self, source, date, norm):
+        """
+        Decode a raw NRL file
+        :param source: {str} Full path to the raw NRL bzip2 file
+        :param date: {str} Date string in the format YYYYMMDDHH
+        :param norm: {str} dry (the only norm provided by NRL)
+        :return: {generator} Yields the columns of the file
+        """
+        columns = decode_nrl(source)
+        if columns is not None:
+            yield columns
 
-        platforms = loi.Platforms('OnePlatform')
-        df = loi.groupBulkStats(df, platforms)
-        lutils.writeHDF('%s/groupbulk.%s' % (output_path, output_file), 'df', df)
-        output_files.append('%s/groupbulk.%s' % (output_path, output_file))
 
-    else:
+def process_nrl(raw_bzip2_file, output_path, output_file, date):
+    """
+    Process a raw NRL file
+    :param raw_bzip2_file: {str|object} Full path to a raw NRL bzip2 file, or a readable binary
+                           stream with the bzip2 data (e.g. a TeeStream)
+    :param output_path: {str} Full path to the output directory
+    :param output_file: {str} Output file name only (will also create files with some prefixes)
+    :param date: {str} Date and time string in the format YYYYMMDDHH
+    :return: {list} A list of output files, or None
+    """
+    columns = decode_nrl(raw_bzip2_file)
+    if columns is None:
         return None
 
-    log.debug('Total obs = %d' % n_obs)
-    return output_files
+    # write the file and the bulk statistics if there are any observations
+    return write_products([columns], date, output_path, output_file)
 
 
 def main():
@@ -2,4 +2,5 @@
 FSOI Plots
 """
 __all__ = ['compare_fsoi', 'correlations_binned_map', 'correlations_binned_Taylor',
-           'correlations_bulk_Taylor', 'summary_fsoi', 'summary_fsoi_map']
+           'correlations_bulk_Taylor', 'render_pool', 'summary_fsoi', 'summary_fsoi_map',
+           'summary_renderer']
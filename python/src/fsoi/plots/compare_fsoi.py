@@ -3,12 +3,17 @@ lib_obimpact.py contains functions for FSOI project
 Some functions can be used elsewhere
 """
 
+import os
 import pandas as pd
 import numpy as np
 from argparse import ArgumentParser, ArgumentDefaultsHelpFormatter
 from matplotlib import pyplot as plt
 import fsoi.stats.lib_utils as lutils
 import fsoi.stats.lib_obimpact as loi
+import fsoi.stats.lib_aggregate as lagg
+import fsoi.stats.lib_bootstrap as lbs
+import fsoi.plots.render_pool as rpool
+from fsoi import log
 from fsoi.web.batch_wrapper import filter_platforms_from_data
 
 
@@ -23,15 +28,17 @@ def load_centers(rootdir, centers, norm, cycle):
     """
     DF = []
     for center in centers:
-
-        fpkl = '%s/work/%s/%s/group_stats.pkl' % (rootdir, center, norm)
-        df = lutils.unpickle(fpkl)
-        indx = df.index.get_level_values('DATETIME').hour == -1
-        for c in cycle:
-            indx = np.ma.logical_or(indx, df.index.get_level_values('DATETIME').hour == c)
-        df = df[indx]
-
-        df, df_std = loi.tavg(df, level='PLATFORM')
+        fpkl, streamed = statistics_file(rootdir, center, norm)
+        if streamed:
+            df, df_std = lutils.unpickle(fpkl).result(cycles=cycle)
+        else:
+            df = lutils.unpickle(fpkl)
+            indx = df.index.get_level_values('DATETIME').hour == -1
+            for c in cycle:
+                indx = np.ma.logical_or(indx, df.index.get_level_values('DATETIME').hour == c)
+            df = df[indx]
+
+            df, df_std = loi.tavg(df, level='PLATFORM')
         df = loi.summarymetrics(df)
 
         DF.append(df)
@@ -39,6 +46,53 @@ def load_centers(rootdir, centers, norm, cycle):
     return DF
 
 
+def statistics_file(rootdir, center, norm):
+    """
+    Get the statistics of a center: the streamed time-average if there is one, otherwise the
+    concatenated statistics of each cycle
+    :param rootdir: {str} Root directory of the work files
+    :param center: {str} Center
+    :param norm: {str} dry or moist
+    :return: ({str}, {bool}) Full path to the pickle, and whether it is the time-average
+             (group_tavg.pkl, a TavgAccumulator) or the statistics of each cycle (group_stats.pkl)
+    """
+    ftavg = '%s/work/%s/%s/group_tavg.pkl' % (rootdir, center, norm)
+    if os.path.isfile(ftavg):
+        return ftavg, True
+    return '%s/work/%s/%s/group_stats.pkl' % (rootdir, center, norm), False
+
+
+def load_intervals(rootdir, centers, norm, cycle, replicates, block=4):
+    """
+    Compute bootstrap confidence intervals of the summary metrics of each center, from the same
+    statistics as load_centers; the bootstrap needs the statistics of each cycle, so there are no
+    intervals for the centers with a streamed time-average
+    :param rootdir: {str} Root directory of the work files
+    :param centers: {list} Centers
+    :param norm: {str} dry or moist
+    :param cycle: {list} Cycle hours
+    :param replicates: {int} Number of bootstrap replicates
+    :param block: {int} Number of consecutive cycles in a bootstrap block
+    :return: {list} (lower, upper) bounds {pandas.DataFrame} of each center, None where the
+             statistics of each cycle are not available
+    """
+    CI = []
+    for center in centers:
+        fpkl, streamed = statistics_file(rootdir, center, norm)
+        if streamed or not os.path.isfile(fpkl):
+            log.warn('No confidence intervals for %s, the statistics of each cycle are not '
+                     'available' % center)
+            CI.append(None)
+            continue
+
+        df = lutils.unpickle(fpkl)
+        df = df[np.isin(df.index.get_level_values('DATETIME').hour, cycle)]
+        CI.append(lbs.bootstrap(lagg.partial(df, center, norm), replicates=replicates,
+                                block=block))
+
+    return CI
+
+
 def sort_centers(DF):
     """
 
@@ -82,7 +136,7 @@ def sort_centers(DF):
 def compare_fsoi_main():
     """
 
-    :return:
+    :return: {dict} Errors of the saved figures that failed, by the full path to the figure
     """
     parser = ArgumentParser(description='Create and Plot Comparison Observation Impact Statistics',
                             formatter_class=ArgumentDefaultsHelpFormatter)
@@ -96,6 +150,13 @@ def compare_fsoi_main():
     parser.add_argument('--centers', help='list of centers', type=str, nargs='+',
                         choices=['EMC', 'GMAO', 'NRL', 'JMA_adj', 'JMA_ens', 'MET', 'MeteoFr'],
                         required=True)
+    parser.add_argument('--bootstrap', help='number of bootstrap replicates of the confidence '
+                        'intervals (0: none)', type=int, default=0, required=False)
+    parser.add_argument('--block', help='number of consecutive cycles in a bootstrap block',
+                        type=int, default=4, required=False)
+    parser.add_argument('--processes', help='number of processes rendering the saved figures '
+                        '(default: FSOI_RENDER_PROCESSES or 1, 0: the number of CPUs)', type=int,
+                        default=None, required=False)
 
     args = parser.parse_args()
 
@@ -111,6 +172,11 @@ def compare_fsoi_main():
 
     DF = load_centers(rootdir, centers, norm, cycle)
     DF, platforms = sort_centers(DF)
+    CI = load_intervals(rootdir, centers, norm, cycle, args.bootstrap, args.block) \
+        if args.bootstrap > 0 else None
+
+    # render the saved figures in parallel
+    pool = rpool.RenderPool(args.processes) if savefig else None
 
     for qty in ['TotImp', 'ImpPerOb', 'FracBenObs', 'FracNeuObs', 'FracImp', 'ObCnt']:
         plotOpt = loi.getPlotOpt(qty, savefigure=savefig, center=None, cycle=cycle)
@@ -133,12 +199,28 @@ def compare_fsoi_main():
         df = df.reindex(platforms)
         filter_platforms_from_data(df, platform_list_csv)
 
-        loi.comparesummaryplot(df, palette, qty=qty, plotOpt=plotOpt)
+        ci = None
+        if CI is not None:
+            bounds = ([], [])
+            for center, center_ci in zip(centers, CI):
+                for bound, values in zip(bounds, center_ci or ()):
+                    values = values[qty].rename(center)
+                    values.index = values.index.str.upper()
+                    bound.append(values)
+            ci = tuple(pd.concat(bound, axis=1) for bound in bounds) if bounds[0] else None
+
+        if pool is None:
+            loi.comparesummaryplot(df, palette, qty=qty, plotOpt=plotOpt, ci=ci)
+        else:
+            pool.submit_compare(plotOpt['figname'], df, palette, qty, plotOpt, ci=ci)
 
     if savefig:
-        plt.close('all')
-    else:
-        plt.show()
+        rpool.write(pool.collect())
+        pool.close()
+        return pool.failures
+
+    plt.show()
+    return {}
 
 
 if __name__ == '__main__':
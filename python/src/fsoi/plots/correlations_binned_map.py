@@ -8,6 +8,7 @@ from matplotlib import pyplot as plt
 import fsoi.stats.lib_mapping as lmapping
 import fsoi.stats.lib_utils as lutils
 import fsoi.stats.lib_obimpact as loi
+import fsoi.stats.lib_correlation as lcorr
 
 
 def read_centers_raw():
@@ -44,33 +45,16 @@ def read_centers():
     return df
 
 
-def compute_std_corr(df):
+def compute_std_corr(df, centers, ref_center):
     """
     Compute the standard deviation and correlation from dictionary of dataframe
-    :param df:
-    :return:
+    :param df: {dict} Binned data frames, by center
+    :param centers: {list} Centers
+    :param ref_center: {str} Reference center
+    :return: ({pandas.DataFrame}, {pandas.DataFrame}) Standard deviations and correlations with the
+             reference center, @see fsoi.stats.lib_correlation.std_corr
     """
-    stdv = {};
-    corr = {}
-    for center in centers:
-
-        stdv[center] = df[center].std(level=['LATITUDE', 'LONGITUDE'])
-
-        if center != ref_center:
-            r1 = df[ref_center].join(df[center], lsuffix=ref_center, rsuffix=center)
-            r2 = r1.groupby(level=['LATITUDE', 'LONGITUDE'])
-            r3 = r2.corr()[::2][center].reset_index()
-            r3.drop('level_2', axis=1, inplace=True)
-            corr[center] = r3.set_index(['LATITUDE', 'LONGITUDE'])
-
-    df_stdv = stdv[ref_center]
-    df_corr = corr[center] / corr[center];
-    df_corr.columns = [ref_center]
-    for center in centers[1:]:
-        df_stdv = df_stdv.join(stdv[center])
-        df_corr = df_corr.join(corr[center])
-
-    return df_stdv, df_corr
+    return lcorr.std_corr(df, centers, ref_center)
 
 
 def plot_corr(center, corr, titlestr):
@@ -86,8 +70,8 @@ def plot_corr(center, corr, titlestr):
 
     fig = plt.figure()
     lmapping.drawMap(bmap, proj, fillcontinents=False)
-    sc = bmap.scatter(xg, yg, c=corr, s=20, marker='s', cmap=cmap, alpha=0.8, edgecolors='face',
-                      vmin=vmin, vmax=vmax)
+    sc = lmapping.drawGrid(bmap, proj, lons, lats, corr, dlat=dlat, dlon=dlon, cmap=cmap,
+                           alpha=0.8, vmin=vmin, vmax=vmax)
     bmap.colorbar(sc, 'right', size='5%', pad='2%')
     plt.title('%s' % (titlestr), fontsize=18)
 
@@ -107,7 +91,7 @@ def main():
     """
     global rootdir, centers, cycle, platform, obtype, channel, norm, savefig
     global ref_center, cyclestr
-    global cmap, proj, bmap, xg, yg
+    global cmap, proj, bmap, lons, lats, dlat, dlon
 
     parser = ArgumentParser(description='Create and Plot Observation Impact Correlation Maps',
                             formatter_class=ArgumentDefaultsHelpFormatter)
@@ -127,6 +111,10 @@ def main():
     parser.add_argument('--channel', help='channel to process', nargs='+', type=int, default=None,
                         required=False)
     parser.add_argument('--savefigure', help='save figures', action='store_true', required=False)
+    parser.add_argument('--dlat', help='latitude box of the bins (default: inferred)', type=float,
+                        default=None, required=False)
+    parser.add_argument('--dlon', help='longitude box of the bins (default: inferred)', type=float,
+                        default=None, required=False)
 
     args = parser.parse_args()
 
@@ -138,6 +126,7 @@ def main():
     obtype = args.obtype
     channel = args.channel
     savefig = args.savefigure
+    dlat, dlon = args.dlat, args.dlon
 
     cyclestr = ' '.join('%02dZ' % c for c in cycle)
     if channel is not None:
@@ -154,7 +143,7 @@ def main():
         # Read and select by cycles, obtypes and channels
         df = read_centers()
         # Compute stdev and correlations between centers
-        df_stdv, df_corr = compute_std_corr(df)
+        df_stdv, df_corr = compute_std_corr(df, centers, ref_center)
         # Store as a pkl file
         os.remove(fcorrpkl)
         lutils.pickle(fcorrpkl, [df_stdv, df_corr])
@@ -168,8 +157,7 @@ def main():
 
     cmap = plt.cm.get_cmap(name='coolwarm', lut=20)
     proj = lmapping.Projection('mill', resolution='c', llcrnrlat=-80., urcrnrlat=80.)
-    bmap = lmapping.createMap(proj)
-    xg, yg = bmap(lons, lats)
+    bmap = lmapping.getMap(proj)
 
     title_substr = '%s' % cyclestr
     if channel is not None:
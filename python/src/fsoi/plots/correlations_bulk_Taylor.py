@@ -3,9 +3,11 @@ Make Taylor Diagrams of correlations in bulk mode
 """
 
 import sys
+import numpy as np
 import pandas as pd
 import fsoi.stats.lib_utils as lutils
 import fsoi.stats.lib_obimpact as loi
+import fsoi.stats.lib_taylor as ltaylor
 from argparse import ArgumentParser, ArgumentDefaultsHelpFormatter
 from matplotlib import pyplot as plt
 from fsoi.stats.TaylorDiagram import TaylorDiagram
@@ -35,15 +37,13 @@ def read_center_bulk(rootdir, center, norm, platform, cycle, obtype, channel):
 def compute_std_corr_bulk(df):
     """
     Compute the standard deviation and correlation from dictionary of dataframe
-    :param df:
-    :return:
+    :param df: {dict} Time series with a single column, by center
+    :return: ({pandas.Series}, {pandas.DataFrame}) Standard deviations and correlation matrix of
+             the centers, @see fsoi.stats.lib_taylor.std_corr
     """
-    df2 = pd.concat(df, axis=1)
-    df2.columns = df2.columns.levels[0]
-    df_stdv = df2.std()
-    df_corr = df2.corr()
-
-    return df_stdv, df_corr
+    series = pd.concat([df[center].iloc[:, 0].rename(center) for center in df], axis=1)
+    series.columns.name = 'CENTER'
+    return ltaylor.std_corr(series)[None]
 
 
 def compute_std_corr_bulk_brute_force(df, centers):
@@ -78,6 +78,17 @@ def compute_std_corr_bulk_brute_force(df, centers):
     return df_stdv, df_corr
 
 
+def finite_centers(centers, stdv):
+    """
+    Get the centers with a finite standard deviation, the others have no (or not all of the) data
+    of a diagram
+    :param centers: {list} Centers
+    :param stdv: {pandas.Series} Standard deviation by center
+    :return: {list} The centers that can be plotted
+    """
+    return [center for center in centers if center in stdv.index and np.isfinite(stdv[center])]
+
+
 def plot_taylor(ref_center, stdv, corr, fig=None, full=False, norm=True, title=None, colors=None,
                 center_names=None):
     """
@@ -112,7 +123,7 @@ def plot_taylor(ref_center, stdv, corr, fig=None, full=False, norm=True, title=N
 
     for center in centers:
 
-        if center == ref_center: continue
+        if center == ref_center or center not in finite_centers([center], stdv): continue
 
         std = stdv[center]
         cor = corr[center]
@@ -155,11 +166,13 @@ def main():
                         required=True)
     parser.add_argument('--cycle', help='cycle to process', nargs='+', type=int, default=None,
                         choices=[0, 6, 12, 18], required=False)
-    parser.add_argument('--platform', help='platform to plot', type=str, required=True)
+    parser.add_argument('--platform', help='platforms to plot', nargs='+', type=str, required=True)
     parser.add_argument('--obtype', help='observation types to include', nargs='+', type=str,
                         default=None, required=False)
     parser.add_argument('--channel', help='channel to process', nargs='+', type=int, default=None,
                         required=False)
+    parser.add_argument('--by-channel', help='plot each channel separately', action='store_true',
+                        required=False)
     parser.add_argument('--savefigure', help='save figures', action='store_true', required=False)
 
     args = parser.parse_args()
@@ -168,7 +181,7 @@ def main():
     norm = args.norm
     centers = args.centers
     cycle = [0, 6, 12, 18] if args.cycle is None else sorted(list(set(args.cycle)))
-    platform = args.platform
+    platforms = args.platform
     obtype = args.obtype
     channel = args.channel
     savefig = args.savefigure
@@ -181,22 +194,28 @@ def main():
 
     fsoi = loi.FSOI()
 
-    df = {}
-    for center in centers:
-        df[center] = read_center_bulk(rootdir, center, norm, platform, cycle, obtype, channel)
+    # load all of the series at once, and compute the statistics of every diagram together
+    series = ltaylor.load_series(rootdir, centers, norm, platforms, cycle, obtype, channel,
+                                 by_channel=args.by_channel)
+    stats = ltaylor.std_corr(series)
 
-    df_stdv, df_corr = compute_std_corr_bulk(df)
+    for key, (df_stdv, df_corr) in stats.items():
 
-    titlestr = '%s' % (platform)
+        titlestr = ' ch. '.join('%s' % k for k in key) if args.by_channel else '%s' % key
 
-    for center in centers:
+        plotted = finite_centers(centers, df_stdv)
+        for center in centers:
+            if center not in plotted:
+                print('No data for %s in %s, skipping' % (center, titlestr))
+                continue
 
-        fig = plot_taylor(center, df_stdv, df_corr, title=titlestr, colors=fsoi.center_color,
-                          center_names=fsoi.center_name)
+            fig = plot_taylor(center, df_stdv, df_corr, title=titlestr, colors=fsoi.center_color,
+                              center_names=fsoi.center_name)
 
-        if savefig:
-            fname = 'Taylor-%s-%s' % (center, platform)
-            lutils.savefigure(fname=fname, format='pdf', fh=fig)
+            if savefig:
+                fname = 'Taylor-%s-%s' % (center, titlestr.replace(' ch. ', '-ch'))
+                lutils.savefigure(fname=fname, format='pdf', fh=fig)
+                plt.close(fig)
 
     plt.close('all') if savefig else plt.show()
 
@@ -0,0 +1,206 @@
+"""
+render_pool.py - render independent figures on worker processes
+
+Figure jobs, a summary figure of a (center, quantity) or a comparison figure of a quantity, are
+submitted with the precomputed frames they plot and a key (typically the full path to the figure
+without the extension).  The workers render with the Agg backend, each reusing one SummaryRenderer
+for its summary figures, and the PNG images are collected by key.
+
+Worker processes are opt-in (argument or FSOI_RENDER_PROCESSES), by default the figures are
+rendered in this process: AWS Lambda has no /dev/shm for the process pool.  A pool that cannot
+start also falls back to rendering in this process.
+"""
+
+import io
+import os
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from fsoi import log
+
+# environment variable with the default number of worker processes (0: the number of CPUs)
+PROCESSES_VARIABLE = 'FSOI_RENDER_PROCESSES'
+
+
+class RenderPool:
+    """
+    Distribute figure jobs across worker processes and collect the PNG images
+    """
+
+    def __init__(self, processes=None):
+        """
+        Create a pool; the worker processes are started with the first job
+        :param processes: {int} Number of worker processes, 0 for the number of CPUs, 1 renders in
+                          this process when the results are collected (default:
+                          FSOI_RENDER_PROCESSES, or 1)
+        """
+        if processes is None:
+            processes = int(os.environ.get(PROCESSES_VARIABLE, 1))
+        self.processes = processes or None
+        self.executor = None
+        self.jobs = {}
+        self.failures = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def submit_summary(self, key, df, qty, std=None, ci=None, **kwargs):
+        """
+        Submit a summary figure of a center (@see summary_renderer.SummaryRenderer)
+        :param key: {str} Key of the image in the results
+        :param df: {pandas.DataFrame} Summary metrics indexed by platform
+        :param qty: {str} Quantity
+        :param std: {pandas.DataFrame} Standard deviations, drawn as error bars of TotImp
+        :param ci: {tuple} Lower and upper bounds {pandas.DataFrame} of the quantities
+        :param kwargs: Plot options, @see lib_obimpact.getPlotOpt
+        :return: None
+        """
+        self._submit(key, _summary_image, df, qty, std, ci, kwargs)
+
+    def submit_compare(self, key, df, palette, qty, plot_options, ci=None):
+        """
+        Submit a comparison figure of a quantity (@see lib_obimpact.comparesummaryplot)
+        :param key: {str} Key of the image in the results
+        :param df: {pandas.DataFrame} Quantity indexed by platform, one column per center
+        :param palette: {list} Colors of the centers
+        :param qty: {str} Quantity
+        :param plot_options: {dict} Plot options, @see lib_obimpact.getPlotOpt
+        :param ci: {tuple} Lower and upper bounds {pandas.DataFrame} of the quantity
+        :return: None
+        """
+        self._submit(key, _compare_image, df, palette, qty, plot_options, ci)
+
+    def _submit(self, key, function, *args):
+        """
+        Submit a job to the workers, or keep it to render in this process
+        :param key: {str} Key of the image in the results
+        :param function: {function} Function that returns the PNG image
+        :param args: Arguments passed to the function
+        :return: None
+        """
+        if self.processes != 1:
+            try:
+                if self.executor is None:
+                    self.executor = ProcessPoolExecutor(self.processes, initializer=_init_worker)
+                self.jobs[key] = self.executor.submit(function, *args)
+                return
+            except (OSError, NotImplementedError) as e:
+                log.warn('Cannot start render processes, rendering in this process: %s' % str(e))
+                self._fall_back()
+        self.jobs[key] = (function, args)
+
+    def _fall_back(self):
+        """
+        Render in this process from now on, the jobs submitted to the workers are kept
+        :return: None
+        """
+        self.processes = 1
+        if self.executor is not None:
+            self.executor.shutdown(wait=False)
+            self.executor = None
+
+    def collect(self):
+        """
+        Wait for the submitted jobs to finish; the errors of the failed jobs are in failures
+        :return: {dict} PNG image {bytes} by key, of the jobs that succeeded
+        """
+        jobs, self.jobs = self.jobs, {}
+        images = {}
+        for key, job in jobs.items():
+            if isinstance(job, tuple):
+                function, args = job
+                try:
+                    images[key] = function(*args)
+                except Exception as e:
+                    self._failed(key, e)
+
+        futures = {job: key for key, job in jobs.items() if not isinstance(job, tuple)}
+        for future in as_completed(futures):
+            try:
+                images[futures[future]] = future.result()
+            except Exception as e:
+                self._failed(futures[future], e)
+        return images
+
+    def _failed(self, key, error):
+        """
+        Record a failed job
+        :param key: {str} Key of the image
+        :param error: {Exception} The error
+        :return: None
+        """
+        log.error('Failed to render %s: %s' % (key, str(error)))
+        self.failures[key] = str(error)
+
+    def close(self):
+        """
+        Stop the worker processes
+        :return: None
+        """
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
+
+def write(images):
+    """
+    Write the collected images to PNG files
+    :param images: {dict} PNG image {bytes} by the full path to the figure without the extension
+    :return: {list} Full paths to the PNG files
+    """
+    files = []
+    for figname, image in images.items():
+        with open('%s.png' % figname, 'wb') as f:
+            f.write(image)
+        files.append('%s.png' % figname)
+    return files
+
+
+def _init_worker():
+    """
+    Render the figures of a worker process with the Agg backend
+    :return: None
+    """
+    import matplotlib
+    matplotlib.use('Agg')
+
+
+@lru_cache(maxsize=None)
+def _renderer():
+    """
+    Get the summary renderer of this process
+    :return: {SummaryRenderer} The renderer
+    """
+    from fsoi.plots.summary_renderer import SummaryRenderer
+    return SummaryRenderer()
+
+
+def _summary_image(df, qty, std, ci, kwargs):
+    """
+    Render a summary figure
+    :return: {bytes} PNG image
+    """
+    images = dict(_renderer().images(df, [qty], std=std, ci=ci, **kwargs))
+    if qty not in images:
+        raise ValueError('No summary figure of %s' % qty)
+    return images[qty]
+
+
+def _compare_image(df, palette, qty, plot_options, ci):
+    """
+    Render a comparison figure
+    :return: {bytes} PNG image
+    """
+    from matplotlib import pyplot as plt
+    import fsoi.stats.lib_obimpact as loi
+
+    plot_options = dict(plot_options, savefigure=False)
+    try:
+        loi.comparesummaryplot(df, palette, qty=qty, plotOpt=plot_options, ci=ci)
+        buffer = io.BytesIO()
+        plt.savefig(buffer, format='png', dpi=100)
+        return buffer.getvalue()
+    finally:
+        plt.close('all')
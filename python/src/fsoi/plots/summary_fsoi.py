@@ -9,6 +9,10 @@ from argparse import ArgumentParser, ArgumentDefaultsHelpFormatter
 from matplotlib import pyplot as plt
 import fsoi.stats.lib_utils as lutils
 import fsoi.stats.lib_obimpact as loi
+import fsoi.stats.lib_aggregate as lagg
+import fsoi.stats.lib_bootstrap as lbs
+from fsoi.plots.summary_renderer import QUANTITIES
+import fsoi.plots.render_pool as rpool
 from fsoi import log
 
 
@@ -31,6 +35,11 @@ def summary_fsoi_main():
     parser.add_argument('--exclude', help='exclude platforms', type=str, nargs='+', required=False)
     parser.add_argument('--cycle', help='cycle to process', nargs='+', type=int, default=[0],
                         choices=[0, 6, 12, 18], required=False)
+    parser.add_argument('--bootstrap', help='number of bootstrap replicates of the confidence '
+                        'intervals (0: plot the standard deviation of TotImp)', type=int, default=0,
+                        required=False)
+    parser.add_argument('--block', help='number of consecutive cycles in a bootstrap block',
+                        type=int, default=4, required=False)
 
     args = parser.parse_args()
 
@@ -71,6 +80,8 @@ def summary_fsoi_main():
         indx = np.ma.logical_or(indx, df.index.get_level_values('DATETIME').hour == c)
     df = df[indx]
 
+    cycles_df = df
+
     # Do time-averaging on the data
     df, df_std = loi.tavg(df, level='PLATFORM')
 
@@ -90,20 +101,32 @@ def summary_fsoi_main():
 
     df = loi.summarymetrics(df)
 
-    for qty in ['TotImp', 'ImpPerOb', 'FracBenObs', 'FracNeuObs', 'FracImp', 'ObCnt']:
+    ci = None
+    if args.bootstrap > 0:
+        platforms = cycles_df.index.get_level_values('PLATFORM')
+        partials = lagg.partial(cycles_df[platforms.isin(df.index)], center, norm)
+        ci = lbs.bootstrap(partials, replicates=args.bootstrap, block=args.block)
+
+    if savefig:
+        with rpool.RenderPool() as pool:
+            for qty in QUANTITIES:
+                figname = '%s/plots/summary/%s/%s_%s_%s' % (rootdir, center, center, qty, cyclestr)
+                pool.submit_summary(figname, df, qty, std=df_std, ci=ci, cycle=cycle,
+                                    center=center, platform=platform, domain='Global')
+            rpool.write(pool.collect())
+        return
+
+    for qty in QUANTITIES:
         try:
             plotOpt = loi.getPlotOpt(qty, cycle=cycle, center=center, savefigure=savefig,
                                      platform=platform, domain='Global')
             plotOpt['figname'] = '%s/plots/summary/%s/%s_%s' % (
             rootdir, center, plotOpt.get('figname'), cyclestr)
-            loi.summaryplot(df, qty=qty, plotOpt=plotOpt, std=df_std)
+            loi.summaryplot(df, qty=qty, plotOpt=plotOpt, std=df_std, ci=ci)
         except Exception as e:
             log.error('Failed to create summary plot for %s' % qty, e)
 
-    if savefig:
-        plt.close('all')
-    else:
-        plt.show()
+    plt.show()
 
 
 if __name__ == '__main__':
@@ -33,6 +33,10 @@ def main():
     parser.add_argument('--channel', help='channel to process', nargs='+', type=int, default=None,
                         required=False)
     parser.add_argument('--savefigure', help='save figures', action='store_true', required=False)
+    parser.add_argument('--dlat', help='latitude box of the bins (default: inferred)', type=float,
+                        default=None, required=False)
+    parser.add_argument('--dlon', help='longitude box of the bins (default: inferred)', type=float,
+                        default=None, required=False)
 
     args = parser.parse_args()
 
@@ -84,12 +88,11 @@ def main():
     plt.figure()
 
     proj = lmapping.Projection('mill', resolution='c', llcrnrlat=-80., urcrnrlat=80.)
-    bmap = lmapping.createMap(proj)
-    x, y = bmap(lons, lats)
+    bmap = lmapping.getMap(proj)
 
     lmapping.drawMap(bmap, proj, fillcontinents=False)
-    sc = bmap.scatter(x, y, c=imps, s=20, marker='s', cmap=cmap, alpha=1.0, edgecolors='face',
-                      vmin=-cmax, vmax=cmax)
+    sc = lmapping.drawGrid(bmap, proj, lons, lats, imps, dlat=args.dlat, dlon=args.dlon,
+                           cmap=cmap, alpha=1.0, vmin=-cmax, vmax=cmax)
     bmap.colorbar(sc, 'right', size='5%', pad='2%')
 
     titlestr = plotOpt['title']
@@ -0,0 +1,207 @@
+"""
+summary_renderer.py - render the summary figures of all quantities of a center in one pass
+
+The figure, axes, colorbar, bar colors and platform order are built once on an Agg canvas, and
+only the bars, error bars, tick labels and text are updated for each quantity (@see
+lib_obimpact.summaryplot for the equivalent single figure).
+"""
+
+import io
+import numpy as np
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib import cm
+from matplotlib import colors
+from matplotlib.ticker import ScalarFormatter
+import fsoi.stats.lib_obimpact as loi
+from fsoi import log
+
+# quantities of the summary figures
+QUANTITIES = ['TotImp', 'ImpPerOb', 'FracBenObs', 'FracNeuObs', 'FracImp', 'ObCnt']
+
+
+class SummaryRenderer:
+    """
+    Render the summary figures of a center's time-averaged statistics
+    """
+
+    def __init__(self, figsize=(10, 8), dpi=100):
+        """
+        Create the figure on an Agg canvas
+        :param figsize: {tuple} Figure size in inches
+        :param dpi: {int} Resolution of the PNG files
+        """
+        self.figure = Figure(figsize=figsize, dpi=dpi)
+        self.canvas = FigureCanvasAgg(self.figure)
+        self.ax = self.figure.add_subplot(111, facecolor='w')
+        self.colorbar = None
+        self.colorbar_options = None
+        self.bars = []
+        self.errorbar = None
+        self.layout = None
+
+        xfmt = ScalarFormatter()
+        xfmt.set_powerlimits((-3, 3))
+        self.ax.xaxis.set_major_formatter(xfmt)
+        self.ax.get_xaxis().get_offset_text().set_x(0)
+        self.ax.set_ylabel('', visible=False)
+        self.ax.grid(False)
+        self.vline = self.ax.axvline(50., color='k', linestyle='--', linewidth=1.25, visible=False)
+
+    def render(self, df, fignames, std=None, ci=None, **kwargs):
+        """
+        Render and save the summary figure of each quantity
+        :param df: {pandas.DataFrame} Summary metrics indexed by platform, @see
+                   lib_obimpact.summarymetrics
+        :param fignames: {dict} Full path to the figure without the extension, by quantity
+        :param std: {pandas.DataFrame} Standard deviations, drawn as error bars of TotImp
+        :param ci: {tuple} Lower and upper bounds {pandas.DataFrame} of the quantities, drawn as
+                   error bars instead of the std (@see lib_bootstrap.bootstrap)
+        :param kwargs: Plot options, @see lib_obimpact.getPlotOpt
+        :return: {list} Full paths to the PNG files that were written
+        """
+        files = []
+        for qty, image in self.images(df, list(fignames), std=std, ci=ci, **kwargs):
+            with open('%s.png' % fignames[qty], 'wb') as f:
+                f.write(image)
+            files.append('%s.png' % fignames[qty])
+
+        return files
+
+    def images(self, df, quantities=QUANTITIES, std=None, ci=None, **kwargs):
+        """
+        Render the summary figure of each quantity as a PNG image
+        :param df: {pandas.DataFrame} Summary metrics indexed by platform, @see
+                   lib_obimpact.summarymetrics
+        :param quantities: {list} Quantities to render
+        :param std: {pandas.DataFrame} Standard deviations, drawn as error bars of TotImp
+        :param ci: {tuple} Lower and upper bounds {pandas.DataFrame} of the quantities
+        :param kwargs: Plot options, @see lib_obimpact.getPlotOpt
+        :return: {generator} (quantity, PNG bytes) of the quantities that were rendered
+        """
+        options = {qty: loi.getPlotOpt(qty, savefigure=True, **kwargs) for qty in quantities}
+        if not options:
+            return
+        self._setup(df, options[quantities[0]])
+
+        for qty in quantities:
+            try:
+                self._draw(df, qty, options[qty], std, ci)
+                # the layout depends on the platform labels, shared by the quantities
+                if self.layout != tuple(df.index):
+                    self.figure.tight_layout()
+                    self.layout = tuple(df.index)
+                buffer = io.BytesIO()
+                self.canvas.print_png(buffer)
+            except Exception as e:
+                log.error('Failed to create summary plot for %s: %s' % (qty, str(e)))
+                continue
+            yield qty, buffer.getvalue()
+
+    def _setup(self, df, plot_options):
+        """
+        Create the colorbar and bars shared by the figures, and the colors of the platforms
+        :param df: {pandas.DataFrame} Summary metrics indexed by platform
+        :param plot_options: {dict} Plot options of any quantity
+        :return: None
+        """
+        alpha = plot_options['alpha']
+        cmin, cmax = plot_options['cmin'], plot_options['cmax']
+        cmap = cm.get_cmap(plot_options['cmap'])
+        self.platform_order = bool(plot_options['platform'])
+        self.colors = dict(zip(df.index, loi.getbarcolors(df['ObCnt'], plot_options['logscale'],
+                                                          cmax, cmin, cmap)))
+
+        colorbar_options = (cmin, cmax, plot_options['logscale'], plot_options['cmap'], alpha)
+        if self.colorbar is not None and self.colorbar_options != colorbar_options:
+            self.colorbar.remove()
+            self.colorbar = None
+            self.layout = None
+        if self.colorbar is None:
+            self.colorbar_options = colorbar_options
+            norm = colors.LogNorm(vmin=cmin, vmax=cmax) if plot_options['logscale'] else \
+                colors.Normalize(vmin=cmin, vmax=cmax)
+            mappable = cm.ScalarMappable(norm=norm, cmap=cmap)
+            self.colorbar = self.figure.colorbar(
+                mappable, ax=self.ax, aspect=30, format='%.0e', alpha=alpha,
+                ticks=[1e0, 1e1, 1e2, 1e3, 1e4, 1e5, 1e6])
+            self.colorbar.solids.set_edgecolor('face')
+            self.colorbar.outline.set_visible(True)
+            self.colorbar.outline.set_linewidth(1.25)
+            self.colorbar.ax.tick_params(labelsize=12)
+            self.colorbar.set_label('Observation Count per Analysis', rotation=90, fontsize=14,
+                                    labelpad=20)
+
+        # one bar per platform, hidden when a quantity has fewer finite values
+        for bar in self.bars[len(df):]:
+            bar.remove()
+        self.bars = self.bars[:len(df)]
+        if len(self.bars) < len(df):
+            positions = np.arange(len(self.bars), len(df))
+            self.bars.extend(self.ax.barh(positions, np.zeros(len(positions)), height=1.0,
+                                          alpha=alpha, edgecolor='k', linewidth=1.25).patches)
+        for bar in self.bars:
+            bar.set_alpha(alpha)
+
+    def _draw(self, df, qty, plot_options, std, ci):
+        """
+        Update the bars, error bars and labels for a quantity
+        :param df: {pandas.DataFrame} Summary metrics indexed by platform
+        :param qty: {str} Quantity
+        :param plot_options: {dict} Plot options of the quantity
+        :param std: {pandas.DataFrame} Standard deviations
+        :param ci: {tuple} Lower and upper bounds {pandas.DataFrame}
+        :return: None
+        """
+        values = df[qty]
+        if plot_options['finite']:
+            values = values[np.isfinite(values)]
+        if self.platform_order:
+            values = values.sort_index(ascending=False)
+        else:
+            values = values.sort_values(ascending=plot_options['sortAscending'],
+                                        na_position='first')
+
+        for i, bar in enumerate(self.bars):
+            bar.set_visible(i < len(values))
+            if i < len(values):
+                bar.set_width(values.iloc[i])
+                bar.set_facecolor(self.colors[values.index[i]])
+
+        if self.errorbar is not None:
+            self.errorbar.remove()
+            self.errorbar = None
+        xerr = None
+        if ci is not None and qty in ci[0]:
+            xerr = loi.cierrors(values, (ci[0][qty], ci[1][qty]))
+        elif qty == 'TotImp' and std is not None:
+            xerr = std[qty].reindex(values.index).values
+        if xerr is not None:
+            self.errorbar = self.ax.errorbar(values.values, np.arange(len(values)), xerr=xerr,
+                                             fmt='none', capsize=2.0, ecolor='#FF6103')
+
+        self.vline.set_visible(qty == 'FracBenObs')
+
+        xmin, xmax = np.nanmin(values.values), np.nanmax(values.values)
+        if ci is not None and xerr is not None:
+            xmin, xmax = np.nanmin(values.values - xerr[0]), np.nanmax(values.values + xerr[1])
+        dx = xmax - xmin
+        self.ax.set_xlim(xmin - 0.1 * dx, xmax + 0.1 * dx)
+        self.ax.set_ylim(-0.5, len(values) - 0.5)
+        self.ax.set_yticks(np.arange(len(values)))
+        self.ax.set_yticklabels(values.index, fontsize=12)
+        self.ax.set_title(plot_options['title'], fontsize=18)
+        self.ax.set_xlabel(plot_options['xlabel'], fontsize=14)
+
+
+def render_summary(df, fignames, std=None, ci=None, **kwargs):
+    """
+    Render and save the summary figures of a center with a new renderer
+    :param df: {pandas.DataFrame} Summary metrics indexed by platform
+    :param fignames: {dict} Full path to the figure without the extension, by quantity
+    :param std: {pandas.DataFrame} Standard deviations, drawn as error bars of TotImp
+    :param ci: {tuple} Lower and upper bounds {pandas.DataFrame} of the quantities
+    :param kwargs: Plot options, @see lib_obimpact.getPlotOpt
+    :return: {list} Full paths to the PNG files that were written
+    """
+    return SummaryRenderer().render(df, fignames, std=std, ci=ci, **kwargs)
@@ -1,6 +1,7 @@
 """
 FSOI Stats
 """
-__all__ = ['extract_platform', 'extract_platform_bin', 'extract_platform_bulk', 'get_metadata',
-           'lib_mapping', 'lib_obimpact', 'lib_utils', 'mk_tavgsummary', 'summary_bulk',
-           'TaylorDiagram']
+__all__ = ['build_cube', 'convert_storage', 'extract_platform', 'extract_platform_bin',
+           'extract_platform_bulk', 'get_metadata', 'lib_aggregate', 'lib_bootstrap',
+           'lib_correlation', 'lib_cube', 'lib_mapping', 'lib_obimpact', 'lib_spatial',
+           'lib_taylor', 'lib_utils', 'mk_tavgsummary', 'summary_bulk', 'TaylorDiagram']
@@ -0,0 +1,128 @@
+"""
+Build the cube of FSOI statistics (@see fsoi.stats.lib_cube) from the groupbulk products of the
+intercomp/hdf5 tree.  The source is either a local copy of the tree or an S3 bucket and prefix.
+New cycles are added to the cube at ingest time (@see fsoi.ingest.engine --cube).  The day and
+month partial products (@see fsoi.stats.lib_aggregate) can be backfilled at the same time.
+
+usage: build_cube -s SOURCE -o CUBE [-c CENTER ...] [--start YYYYMMDD] [--end YYYYMMDD]
+                  [--partials TREE]
+"""
+
+import os
+import calendar
+import tempfile
+from argparse import ArgumentParser
+from argparse import ArgumentDefaultsHelpFormatter
+import fsoi.stats.lib_utils as lutils
+import fsoi.stats.lib_aggregate as lagg
+from fsoi.stats.lib_cube import Cube
+from fsoi.stats.convert_storage import list_local, list_s3
+from fsoi import log
+
+
+def build(source, centers=None, start_date=None, end_date=None, backend=None):
+    """
+    Build a cube from the groupbulk products
+    :param source: {str} Full path to the local tree, or s3://bucket/prefix
+    :param centers: {list} Only add these centers (default: all)
+    :param start_date: {str} Only add cycles from this day, YYYYMMDD (default: all)
+    :param end_date: {str} Only add cycles until this day, YYYYMMDD (default: all)
+    :param backend: {StorageBackend} Also write the day and month partial products here
+                    (optional), @see backfill
+    :return: {Cube} The cube, or None if the source could not be listed
+    """
+    s3 = source.startswith('s3://')
+    if s3:
+        from fsoi.data.s3_datastore import S3DataStore
+        bucket, _, prefix = source[len('s3://'):].partition('/')
+        files = list_s3(bucket, prefix, centers)
+        datastore = S3DataStore()
+    else:
+        files = list_local(source, centers)
+    if files is None:
+        log.error('Failed to list the source files: %s' % source)
+        return None
+
+    files = [(path, center, norm) for path, (product, center, norm, date) in files
+             if product == 'groupbulk' and (start_date is None or date[:8] >= start_date)
+             and (end_date is None or date[:8] <= end_date)]
+
+    partials = []
+    with tempfile.TemporaryDirectory() as work_dir:
+        for path, center, norm in files:
+            local_file = path
+            if s3:
+                local_file = os.path.join(work_dir, os.path.basename(path))
+                if not datastore.load_to_local_file({'bucket': bucket, 'key': path}, local_file):
+                    log.error('Failed to download s3://%s/%s' % (bucket, path))
+                    continue
+
+            try:
+                partials.append(lagg.partial(lagg.unify(lutils.readHDF(local_file, 'df')),
+                                             center, norm))
+            except (IOError, KeyError, ValueError) as e:
+                log.error('Failed to read %s: %s' % (path, str(e)))
+            finally:
+                if s3 and os.path.isfile(local_file):
+                    os.remove(local_file)
+
+    log.info('Added %d of %d files to the cube' % (len(partials), len(files)))
+    cube = Cube()
+    if partials:
+        partials = lagg.combine(*partials)
+        cube.add(partials)
+        if backend is not None:
+            backfill(backend, partials, start_date, end_date)
+    return cube
+
+
+def backfill(backend, partials, start_date=None, end_date=None):
+    """
+    Write the day and month partial products of cycle partial aggregates.  Months that are not
+    entirely in the date range are not written, their days are.
+    :param backend: {StorageBackend} Storage of the 'partial' products, @see lib_utils
+    :param partials: {pandas.DataFrame} Cycle partial aggregates, @see lib_aggregate.partial
+    :param start_date: {str} First day of the cycles, YYYYMMDD (default: all)
+    :param end_date: {str} Last day of the cycles, YYYYMMDD (default: all)
+    :return: {list} Paths of the written products
+    """
+    days = lagg.rollup(partials, lagg.DAY)
+    months = lagg.rollup(days, lagg.MONTH)
+
+    def whole(month):
+        last = calendar.monthrange(int(month[:4]), int(month[4:]))[1]
+        return (start_date is None or start_date <= '%s01' % month) and \
+            (end_date is None or end_date >= '%s%02d' % (month, last))
+
+    months = months[[whole(month) for month in months.index.get_level_values('PERIOD')]]
+    return lagg.store(backend, days) + lagg.store(backend, months)
+
+
+def main():
+    """
+    Parse command line parameters and build the cube
+    :return: None
+    """
+    parser = ArgumentParser(description='Build the cube of FSOI statistics',
+                            formatter_class=ArgumentDefaultsHelpFormatter)
+    parser.add_argument('-s', '--source', help='local intercomp/hdf5 tree, or s3://bucket/prefix',
+                        required=True)
+    parser.add_argument('-o', '--output', help='path to the cube directory', required=True)
+    parser.add_argument('-c', '--centers', help='centers to add (default: all)', nargs='+',
+                        default=None)
+    parser.add_argument('--start', help='first day to add', metavar='YYYYMMDD', default=None)
+    parser.add_argument('--end', help='last day to add', metavar='YYYYMMDD', default=None)
+    parser.add_argument('--partials', help='also write the day and month partial aggregates to '
+                        'this HDF5 tree', default=None)
+    args = parser.parse_args()
+
+    backend = None
+    if args.partials is not None:
+        backend = lutils.get_backend('hdf5', args.partials, profile='web')
+    cube = build(args.source, args.centers, args.start, args.end, backend)
+    if cube is not None:
+        cube.save(args.output)
+
+
+if __name__ == '__main__':
+    main()
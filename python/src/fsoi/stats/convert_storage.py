@@ -0,0 +1,139 @@
+"""
+Convert the intercomp/hdf5 tree of HDF5 products to another storage backend (e.g. a partitioned
+Parquet dataset).  The source is either a local copy of the tree or an S3 bucket and prefix.
+
+usage: convert_storage -s SOURCE -d DEST [-b BACKEND] [-c CENTER ...]
+"""
+
+import os
+import re
+import tempfile
+from argparse import ArgumentParser
+from argparse import ArgumentDefaultsHelpFormatter
+import fsoi.stats.lib_utils as lutils
+from fsoi import log
+
+# [product.]center.norm.date.h5, @see fsoi.stats.lib_utils.HDF5Backend.path
+PRODUCT_NAME = re.compile(r'^(?:(bulk|accumbulk|groupbulk|partial)\.)?([^./]+)\.(dry|moist)\.(\d{10})\.h5$')
+
+
+def parse_name(name):
+    """
+    Parse the name of a product file
+    :param name: {str} File name or path, e.g. bulk.GMAO.dry.2015010100.h5
+    :return: {tuple} (product, center, norm, date), or None if the name is not a product
+    """
+    match = PRODUCT_NAME.match(os.path.basename(name))
+    if match is None:
+        return None
+    product, center, norm, date = match.groups()
+    return product or 'raw', center, norm, date
+
+
+def list_local(source, centers=None):
+    """
+    List the product files of a local intercomp/hdf5 tree
+    :param source: {str} Full path to the root directory
+    :param centers: {list} Only list these centers (default: all)
+    :return: {list} (path, (product, center, norm, date)) for each product file
+    """
+    files = []
+    for directory, _, names in os.walk(source):
+        for name in sorted(names):
+            parsed = parse_name(name)
+            if parsed is not None and (not centers or parsed[1] in centers):
+                files.append((os.path.join(directory, name), parsed))
+    return files
+
+
+def list_s3(bucket, prefix, centers=None):
+    """
+    List the product files of an intercomp/hdf5 tree on S3
+    :param bucket: {str} S3 bucket
+    :param prefix: {str} S3 key prefix of the tree
+    :param centers: {list} Only list these centers (default: all)
+    :return: {list} (key, (product, center, norm, date)) for each product file, or None
+    """
+    from fsoi.data.s3_datastore import S3DataStore
+
+    objects = S3DataStore().list_data_store({'bucket': bucket, 'prefix': prefix})
+    if objects is None:
+        return None
+
+    files = []
+    for obj in objects:
+        parsed = parse_name(obj['key'])
+        if parsed is not None and (not centers or parsed[1] in centers):
+            files.append((obj['key'], parsed))
+    return files
+
+
+def convert(source, destination, centers=None):
+    """
+    Convert the product files of an intercomp/hdf5 tree to a storage backend
+    :param source: {str} Full path to the local tree, or s3://bucket/prefix
+    :param destination: {StorageBackend} The destination backend
+    :param centers: {list} Only convert these centers (default: all)
+    :return: {int} Number of converted files, or None if the source could not be listed
+    """
+    s3 = source.startswith('s3://')
+    if s3:
+        from fsoi.data.s3_datastore import S3DataStore
+        bucket, _, prefix = source[len('s3://'):].partition('/')
+        files = list_s3(bucket, prefix, centers)
+        datastore = S3DataStore()
+    else:
+        files = list_local(source, centers)
+    if files is None:
+        log.error('Failed to list the source files: %s' % source)
+        return None
+
+    converted = 0
+    with tempfile.TemporaryDirectory() as work_dir:
+        for path, (product, center, norm, date) in files:
+            local_file = path
+            if s3:
+                local_file = os.path.join(work_dir, os.path.basename(path))
+                if not datastore.load_to_local_file({'bucket': bucket, 'key': path}, local_file):
+                    log.error('Failed to download s3://%s/%s' % (bucket, path))
+                    continue
+
+            try:
+                data = lutils.readHDF(local_file, 'df')
+            except (IOError, KeyError, ValueError) as e:
+                log.error('Failed to read %s: %s' % (path, str(e)))
+                continue
+            finally:
+                if s3 and os.path.isfile(local_file):
+                    os.remove(local_file)
+
+            destination.write(data, product, center, norm, date)
+            converted += 1
+            log.debug('converted %s' % path)
+
+    log.info('Converted %d of %d files' % (converted, len(files)))
+    return converted
+
+
+def main():
+    """
+    Parse command line parameters and convert the tree
+    :return: None
+    """
+    parser = ArgumentParser(description='Convert the HDF5 products to another storage backend',
+                            formatter_class=ArgumentDefaultsHelpFormatter)
+    parser.add_argument('-s', '--source', help='local intercomp/hdf5 tree, or s3://bucket/prefix',
+                        required=True)
+    parser.add_argument('-d', '--destination', help='root of the destination (directory or S3 URI)',
+                        required=True)
+    parser.add_argument('-b', '--backend', help='destination storage backend', default='parquet',
+                        choices=['hdf5', 'parquet'])
+    parser.add_argument('-c', '--centers', help='centers to convert (default: all)', nargs='+',
+                        default=None)
+    args = parser.parse_args()
+
+    convert(args.source, lutils.get_backend(args.backend, args.destination), args.centers)
+
+
+if __name__ == '__main__':
+    main()
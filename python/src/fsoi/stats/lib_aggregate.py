@@ -0,0 +1,284 @@
+"""
+lib_aggregate.py contains mergeable partial aggregates of the bulk statistics.
+
+A partial aggregate holds, for each center, norm, period, cycle and platform, the number of cycles
+and the sum and sum of squares of each bulk statistic.  Partials are combined by adding them, so
+cycle partials can be rolled up into days and months, and merged across workers.  The time-average
+(@see lib_obimpact.tavg) of any date range is then computed from the partials of the whole months
+in the range and of the remaining days.  The day and month partial products are rewritten after
+each ingested cycle (@see roll and fsoi.ingest.engine --partials), or backfilled from the groupbulk
+products (@see fsoi.stats.build_cube --partials).
+
+Periods are strings: YYYYMMDDHH (cycle), YYYYMMDD (day) or YYYYMM (month).
+"""
+
+import calendar
+import numpy as _np
+import pandas as _pd
+from datetime import datetime, timedelta
+from fsoi import log
+
+# statistics that are aggregated
+COLUMNS = ['TotImp', 'ObCnt', 'ObCntBen', 'ObCntNeu']
+# measures of the partial aggregates: the number of cycles, and sums and sums of squares
+MEASURES = ['Count'] + [name for col in COLUMNS for name in [col, col + 'Sq']]
+# index of the partial aggregates
+INDEX = ['CENTER', 'NORM', 'PERIOD', 'CYCLE', 'PLATFORM']
+# length of the period strings
+CYCLE, DAY, MONTH = 10, 8, 6
+
+
+def unify(DF):
+    """
+    Aggregate group bulk statistics by unified platform (e.g. MODIS_Wind and AMV-MODIS are summed
+    under MODIS Wind), @see lib_obimpact.Platforms('OnePlatform')
+    :param DF: {pandas.DataFrame} Group bulk statistics indexed by DATETIME and PLATFORM
+    :return: {pandas.DataFrame} Group bulk statistics indexed by DATETIME and unified PLATFORM
+    """
+    from fsoi.stats.lib_obimpact import Platforms
+
+    unified = {}
+    for common, platforms in Platforms('OnePlatform').items():
+        unified.update({platform: common for platform in platforms})
+        unified[common] = common
+
+    platforms = DF.index.get_level_values('PLATFORM')
+    platforms = platforms.map(lambda platform: unified.get(platform, platform))
+    df = DF[COLUMNS].groupby([DF.index.get_level_values('DATETIME'), platforms], sort=False).sum()
+    df.index.names = ['DATETIME', 'PLATFORM']
+    return df
+
+
+def partial(DF, center, norm):
+    """
+    Create the cycle partial aggregates of group bulk statistics
+    :param DF: {pandas.DataFrame} Group bulk statistics indexed by DATETIME and PLATFORM
+    :param center: {str} Center name
+    :param norm: {str} dry or moist
+    :return: {pandas.DataFrame} Partial aggregates, @see INDEX
+    """
+    dates = DF.index.get_level_values('DATETIME')
+
+    df = measures(DF[COLUMNS]).reset_index()
+    df['CENTER'] = center
+    df['NORM'] = norm
+    df['PERIOD'] = dates.strftime('%Y%m%d%H')
+    df['CYCLE'] = dates.hour
+
+    return combine(df.drop(columns='DATETIME').set_index(INDEX))
+
+
+def measures(DF):
+    """
+    Get the measures of each row of statistics: a count of 1, and the value and square of each
+    column, @see MEASURES
+    :param DF: {pandas.DataFrame} Statistics, e.g. the COLUMNS of group bulk statistics
+    :return: {pandas.DataFrame} The measures, with the index of DF
+    """
+    values = DF.astype(_np.float64)
+
+    df = _pd.DataFrame({'Count': 1.}, index=DF.index)
+    for col in DF.columns:
+        df[col] = values[col].values
+        df[col + 'Sq'] = values[col].values ** 2
+
+    return df
+
+
+def combine(*partials):
+    """
+    Combine partial aggregates (associative and commutative)
+    :param partials: {pandas.DataFrame} Partial aggregates, @see INDEX
+    :return: {pandas.DataFrame} The combined partial aggregates
+    """
+    df = _pd.concat(partials) if len(partials) > 1 else partials[0]
+    return df.groupby(level=INDEX, sort=True).sum()
+
+
+def rollup(partials, length):
+    """
+    Roll partial aggregates up into longer periods
+    :param partials: {pandas.DataFrame} Partial aggregates, @see INDEX
+    :param length: {int} Length of the new periods, DAY or MONTH
+    :return: {pandas.DataFrame} The partial aggregates of the longer periods
+    """
+    df = partials.reset_index()
+    df['PERIOD'] = df['PERIOD'].str[:length]
+    return combine(df.set_index(INDEX))
+
+
+def cover(start_date, end_date):
+    """
+    Cover a date range with whole months and the remaining days
+    :param start_date: {str} First day of the range, YYYYMMDD
+    :param end_date: {str} Last day of the range, YYYYMMDD
+    :return: {list} Periods, YYYYMM for whole months and YYYYMMDD for other days
+    """
+    day = datetime.strptime(start_date[:DAY], '%Y%m%d')
+    end = datetime.strptime(end_date[:DAY], '%Y%m%d')
+
+    periods = []
+    while day <= end:
+        month_end = day.replace(day=calendar.monthrange(day.year, day.month)[1])
+        if day.day == 1 and month_end <= end:
+            periods.append(day.strftime('%Y%m'))
+            day = month_end + timedelta(days=1)
+        else:
+            periods.append(day.strftime('%Y%m%d'))
+            day += timedelta(days=1)
+
+    return periods
+
+
+def load(backend, center, norm, start_date, end_date):
+    """
+    Load the partial aggregates covering a date range.  Months without a monthly partial are read
+    from their daily partials, and days without a daily partial from their cycle partials.
+    :param backend: {StorageBackend} Storage of the 'partial' products, @see lib_utils
+    :param center: {str} Center name
+    :param norm: {str} dry or moist
+    :param start_date: {str} First day of the range, YYYYMMDD
+    :param end_date: {str} Last day of the range, YYYYMMDD
+    :return: {pandas.DataFrame} Partial aggregates, or None if there are none in the range
+    """
+    found = []
+    for period in cover(start_date, end_date):
+        df = _read(backend, center, norm, period)
+        if df is None and len(period) == MONTH:
+            df = [_read(backend, center, norm, day) for day in _days(period)]
+            df = [d for d in df if d is not None]
+            df = combine(*df) if df else None
+        if df is not None:
+            found.append(df)
+
+    if not found:
+        log.error('No partial aggregates for %s %s from %s to %s' %
+                  (center, norm, start_date, end_date))
+        return None
+
+    return combine(*found)
+
+
+def store(backend, partials):
+    """
+    Write partial aggregates as 'partial' products, one for each center, norm and period
+    :param backend: {StorageBackend} Storage of the 'partial' products, @see lib_utils
+    :param partials: {pandas.DataFrame} Partial aggregates, @see INDEX
+    :return: {list} Paths of the written products
+    """
+    return [backend.write(df, 'partial', center, norm, period)
+            for (center, norm, period), df in partials.groupby(level=['CENTER', 'NORM', 'PERIOD'])]
+
+
+def roll(backend, center, norm, date):
+    """
+    Rewrite the day and month partial products of a cycle, after its cycle partial was written:
+    the day from the cycle partials of the day, and the month from the day partials of the month
+    :param backend: {StorageBackend} Storage of the 'partial' products, @see lib_utils
+    :param center: {str} Center name
+    :param norm: {str} dry or moist
+    :param date: {str} Date string in the format YYYYMMDDHH
+    :return: {list} Paths of the written products, empty if the day has no cycle partials
+    """
+    day, month = date[:DAY], date[:MONTH]
+    cycles = _find(backend, center, norm, _cycles(day))
+    if not cycles:
+        log.error('No cycle partial aggregates for %s %s %s' % (center, norm, day))
+        return []
+
+    written = store(backend, rollup(combine(*cycles), DAY))
+    days = _find(backend, center, norm, _days(month))
+    return written + store(backend, rollup(combine(*days), MONTH))
+
+
+def _cycles(day):
+    """
+    Get the cycles of a day
+    :param day: {str} YYYYMMDD
+    :return: {list} YYYYMMDDHH
+    """
+    return ['%s%02d' % (day, cycle) for cycle in range(0, 24, 6)]
+
+
+def _days(month):
+    """
+    Get the days of a month
+    :param month: {str} YYYYMM
+    :return: {list} YYYYMMDD
+    """
+    last = calendar.monthrange(int(month[:4]), int(month[4:]))[1]
+    return ['%s%02d' % (month, day) for day in range(1, last + 1)]
+
+
+def _read(backend, center, norm, period):
+    """
+    Read the partial aggregates of a period, or of its cycles for a day
+    :param backend: {StorageBackend} Storage of the 'partial' products
+    :param center: {str} Center name
+    :param norm: {str} dry or moist
+    :param period: {str} YYYYMM or YYYYMMDD
+    :return: {pandas.DataFrame} Partial aggregates, or None if not found
+    """
+    found = _find(backend, center, norm, [period])
+    if not found and len(period) == DAY:
+        # the day partial is missing, combine the cycles that exist
+        found = _find(backend, center, norm, _cycles(period))
+    return combine(*found) if found else None
+
+
+def _find(backend, center, norm, periods):
+    """
+    Read the partial aggregates of the periods that exist
+    :param backend: {StorageBackend} Storage of the 'partial' products
+    :param center: {str} Center name
+    :param norm: {str} dry or moist
+    :param periods: {list} Periods
+    :return: {list} The non-empty partial aggregates that were found
+    """
+    found = []
+    for period in periods:
+        try:
+            df = backend.read('partial', center, norm, period)
+        except (IOError, OSError):
+            continue
+        if len(df) > 0:
+            found.append(df)
+    return found
+
+
+def summarize(partials, cycles=None, levels=('CENTER', 'NORM', 'PLATFORM')):
+    """
+    Time-average the partial aggregates, as lib_obimpact.tavg
+    :param partials: {pandas.DataFrame} Partial aggregates, @see INDEX
+    :param cycles: {list} Only average these cycle hours (default: all)
+    :param levels: {tuple} Index levels to average over
+    :return: ({pandas.DataFrame}, {pandas.DataFrame}) mean and standard deviation, indexed by the
+             levels
+    """
+    df = partials
+    if cycles is not None:
+        df = df[df.index.get_level_values('CYCLE').isin(cycles)]
+    return statistics(df.groupby(level=list(levels)).sum())
+
+
+def statistics(sums):
+    """
+    Compute the mean and standard deviation from summed partial aggregates
+    :param sums: {pandas.DataFrame} The measures (@see MEASURES and measures), summed over the
+                 periods and cycles
+    :return: ({pandas.DataFrame}, {pandas.DataFrame}) mean and standard deviation
+    """
+    count = sums['Count']
+    mean = _pd.DataFrame(index=sums.index)
+    std = _pd.DataFrame(index=sums.index)
+    for col in [col for col in sums if col + 'Sq' in sums]:
+        mean[col] = sums[col] / count
+        # sample variance from the sums, clipped at 0 against round-off
+        variance = (sums[col + 'Sq'] - sums[col] ** 2 / count) / (count - 1)
+        std[col] = _np.sqrt(variance.clip(lower=0.)).where(count > 1)
+
+    for col in [col for col in ['ObCnt', 'ObCntBen', 'ObCntNeu'] if col in mean]:
+        mean[col] = mean[col].astype(int)
+        std[col] = std[col].fillna(0).astype(int)
+
+    return mean, std
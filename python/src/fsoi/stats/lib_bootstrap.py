@@ -0,0 +1,116 @@
+"""
+lib_bootstrap.py contains block bootstrap confidence intervals of the summary metrics.
+
+The bootstrap is computed from the cycle partial aggregates (@see lib_aggregate.partial), whose
+additive measures (@see lib_aggregate.MEASURES) are arranged into per-cycle sums of each platform,
+and the sums of every moving block of consecutive cycles are computed once.  A bootstrap replicate
+draws blocks with replacement, so that autocorrelation within a block is preserved, and is the sum
+of its blocks: with the number of draws of each block in a matrix, the sums of all replicates are a
+single matrix product.  The summary metrics (@see lib_obimpact.summarymetrics) are ratios of these
+sums.  Replicates are computed in chunks with independent seeded random streams, across a process
+pool, so the result does not depend on the number of processes.
+"""
+
+import numpy as _np
+import pandas as _pd
+from concurrent.futures import ProcessPoolExecutor
+import fsoi.stats.lib_aggregate as _lagg
+
+# metrics with confidence intervals
+METRICS = ['TotImp', 'ImpPerOb', 'FracBenObs', 'FracNeuObs', 'FracImp']
+
+
+def cycle_sums(partials):
+    """
+    Arrange cycle partial aggregates into a dense array of per-cycle sums
+    :param partials: {pandas.DataFrame} Cycle partial aggregates, @see lib_aggregate.partial
+    :return: ({pandas.Index}, {numpy.ndarray}) Platforms, and sums of the lib_aggregate.MEASURES
+             with shape (cycle, platform, measure) in the order of the cycles
+    """
+    periods = partials.index.get_level_values('PERIOD').values.astype(str)
+    if len(periods) and min(len(period) for period in periods) != _lagg.CYCLE:
+        raise ValueError('The bootstrap needs cycle partial aggregates')
+    cycles, t = _np.unique(periods, return_inverse=True)
+    platforms, p = _np.unique(partials.index.get_level_values('PLATFORM').values.astype(str),
+                              return_inverse=True)
+
+    sums = _np.zeros((len(cycles), len(platforms), len(_lagg.MEASURES)))
+    _np.add.at(sums, (t, p), partials[_lagg.MEASURES].values.astype(_np.float64))
+
+    return _pd.Index(platforms, name='PLATFORM'), sums
+
+
+def metrics(sums):
+    """
+    Compute the summary metrics from sums over cycles
+    :param sums: {numpy.ndarray} Sums of the lib_aggregate.MEASURES with shape
+                 (..., platform, measure)
+    :return: {dict} Metric arrays with shape (..., platform), @see METRICS
+    """
+    count, totimp, obcnt, ben, neu = [sums[..., _lagg.MEASURES.index(name)] for name in
+                                      ['Count', 'TotImp', 'ObCnt', 'ObCntBen', 'ObCntNeu']]
+    with _np.errstate(invalid='ignore', divide='ignore'):
+        mean = totimp / count
+        return {
+            'TotImp': mean,
+            'ImpPerOb': totimp / obcnt,
+            'FracBenObs': ben / (obcnt - neu) * 100.,
+            'FracNeuObs': neu / (obcnt - ben) * 100.,
+            'FracImp': mean / _np.nansum(mean, axis=-1, keepdims=True) * 100.
+        }
+
+
+def _replicates(blocks, draws, replicates, seed):
+    """
+    Compute the metrics of bootstrap replicates
+    :param blocks: {numpy.ndarray} Sums of each moving block, with shape (block, platform, measure)
+    :param draws: {int} Number of blocks drawn in each replicate
+    :param replicates: {int} Number of replicates
+    :param seed: {numpy.random.SeedSequence} Seed of the random stream
+    :return: {dict} Metric arrays with shape (replicate, platform)
+    """
+    rng = _np.random.default_rng(seed)
+    counts = rng.multinomial(draws, _np.full(len(blocks), 1. / len(blocks)), size=replicates)
+    sums = counts.astype(_np.float64) @ blocks.reshape(len(blocks), -1)
+    return metrics(sums.reshape((replicates,) + blocks.shape[1:]))
+
+
+def bootstrap(partials, replicates=1000, block=4, level=0.95, seed=0, processes=1, chunk=100):
+    """
+    Compute moving block bootstrap confidence intervals of the summary metrics
+    :param partials: {pandas.DataFrame} Cycle partial aggregates, @see lib_aggregate.partial
+    :param replicates: {int} Number of bootstrap replicates
+    :param block: {int} Number of consecutive cycles in a block (4 is a day of 6-hourly cycles)
+    :param level: {float} Confidence level
+    :param seed: {int} Seed of the random number generator
+    :param processes: {int} Number of worker processes (1 computes in this process, None uses
+                      all of the CPUs)
+    :param chunk: {int} Number of replicates computed in each task
+    :return: ({pandas.DataFrame}, {pandas.DataFrame}) Lower and upper bounds of the METRICS,
+             indexed by PLATFORM
+    """
+    platforms, sums = cycle_sums(partials)
+    block = max(1, min(block, len(sums)))
+
+    # sums of the blocks of consecutive cycles, from the cumulative sums
+    cumulative = _np.concatenate([_np.zeros((1,) + sums.shape[1:]), sums.cumsum(axis=0)])
+    blocks = cumulative[block:] - cumulative[:-block]
+    draws = max(1, int(round(len(sums) / float(block))))
+
+    sizes = [min(chunk, replicates - start) for start in range(0, replicates, chunk)]
+    seeds = _np.random.SeedSequence(seed).spawn(len(sizes))
+    args = [(blocks, draws, size, stream) for size, stream in zip(sizes, seeds)]
+    if processes == 1:
+        results = [_replicates(*arg) for arg in args]
+    else:
+        with ProcessPoolExecutor(processes) as executor:
+            results = list(executor.map(_replicates, *zip(*args)))
+
+    alpha = (1. - level) / 2.
+    lower, upper = {}, {}
+    for metric in METRICS:
+        values = _np.concatenate([result[metric] for result in results])
+        lower[metric], upper[metric] = _np.nanpercentile(
+            values, [100. * alpha, 100. * (1. - alpha)], axis=0)
+
+    return _pd.DataFrame(lower, index=platforms), _pd.DataFrame(upper, index=platforms)
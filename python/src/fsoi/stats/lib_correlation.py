@@ -0,0 +1,128 @@
+"""
+lib_correlation.py contains the cross-center standard deviations and correlations of binned
+observation impacts.
+
+The time series of all centers are aligned once into a dense (time x cell x center) array, with
+NaN where a center has no data, and the statistics of every cell and center are computed with
+NumPy reductions.  Correlations against the reference center use the pairwise-complete times.
+"""
+
+import numpy as _np
+import pandas as _pd
+
+# levels of the binned frames
+TIME = 'DATETIME'
+CELL = ['LATITUDE', 'LONGITUDE']
+
+
+def align(frames, centers, ref_center):
+    """
+    Align the time series of the centers into a dense array
+    :param frames: {dict} Data frame with a single column, indexed by DATETIME, LATITUDE and
+                   LONGITUDE (in any order), by center
+    :param centers: {list} Centers to align
+    :param ref_center: {str} Reference center, whose cells are kept
+    :return: ({pandas.DatetimeIndex}, {pandas.MultiIndex}, {numpy.ndarray}) Times, cells
+             (LATITUDE, LONGITUDE) and values with shape (time, cell, center)
+    """
+    # the axes are resolved on the (small) index levels, and the rows mapped through the codes
+    ref = frames[ref_center].index
+    lats, lons = [_pd.Index(ref.levels[ref.names.index(name)]).sort_values() for name in CELL]
+    times = _pd.Index(_np.unique(_np.concatenate(
+        [frames[center].index.levels[frames[center].index.names.index(TIME)].values
+         for center in centers])))
+
+    # cells of the latitude x longitude grid that the reference center has
+    cell = _cell(ref, lats, lons)
+    present = _np.zeros(len(lats) * len(lons), dtype=bool)
+    present[cell[cell >= 0]] = True
+    position = _np.cumsum(present) - 1
+    cells = _pd.MultiIndex.from_product([lats, lons], names=CELL)[present]
+
+    values = _np.full((len(times), len(cells), len(centers)), _np.nan)
+    for i, center in enumerate(centers):
+        index = frames[center].index
+        t = _positions(index, TIME, times)
+        cell = _cell(index, lats, lons)
+        keep = (t >= 0) & (cell >= 0)
+        keep[keep] = present[cell[keep]]
+        values[t[keep], position[cell[keep]], i] = frames[center].iloc[:, 0].values[keep]
+
+    return times, cells, values
+
+
+def _positions(index, name, labels):
+    """
+    Get the position of each row's level value in a list of labels
+    :param index: {pandas.MultiIndex} The index
+    :param name: {str} Level name
+    :param labels: {pandas.Index} The labels
+    :return: {numpy.ndarray} Position of each row, -1 if the value is not a label
+    """
+    level = index.names.index(name)
+    positions = labels.get_indexer(index.levels[level])
+    codes = _np.asarray(index.codes[level])
+    return _np.where(codes >= 0, positions[codes], -1)
+
+
+def _cell(index, lats, lons):
+    """
+    Get the cell of each row in the latitude x longitude grid
+    :param index: {pandas.MultiIndex} The index
+    :param lats: {pandas.Index} Latitudes of the grid
+    :param lons: {pandas.Index} Longitudes of the grid
+    :return: {numpy.ndarray} Cell of each row, -1 if it is not in the grid
+    """
+    lat, lon = _positions(index, 'LATITUDE', lats), _positions(index, 'LONGITUDE', lons)
+    return _np.where((lat >= 0) & (lon >= 0), lat * len(lons) + lon, -1)
+
+
+def std_corr(frames, centers, ref_center=None):
+    """
+    Compute the standard deviation of each center and its correlation with the reference center,
+    in each cell
+    :param frames: {dict} Data frame with a single column, indexed by DATETIME, LATITUDE and
+                   LONGITUDE, by center
+    :param centers: {list} Centers
+    :param ref_center: {str} Reference center (default: the first center)
+    :return: ({pandas.DataFrame}, {pandas.DataFrame}) Standard deviations and correlations,
+             indexed by the LATITUDE and LONGITUDE of the reference cells, one column per center.
+             NaN where there are fewer than 2 (pairs of) values or no variance.
+    """
+    centers = list(centers)
+    ref_center = centers[0] if ref_center is None else ref_center
+    _, cells, values = align(frames, centers, ref_center)
+    ref = values[:, :, [centers.index(ref_center)]]
+
+    valid = ~_np.isnan(values)
+    std = _std(values, valid)
+
+    # pairwise-complete values of the reference and each center
+    pairs = valid & ~_np.isnan(ref)
+    x = _np.where(pairs, ref, 0.)
+    y = _np.where(pairs, values, 0.)
+    count = pairs.sum(axis=0)
+    with _np.errstate(invalid='ignore', divide='ignore'):
+        dx = _np.where(pairs, x - x.sum(axis=0) / count, 0.)
+        dy = _np.where(pairs, y - y.sum(axis=0) / count, 0.)
+        corr = (dx * dy).sum(axis=0) / _np.sqrt((dx ** 2).sum(axis=0) * (dy ** 2).sum(axis=0))
+    corr[(count < 2) | ~_np.isfinite(corr)] = _np.nan
+
+    return _pd.DataFrame(std, index=cells, columns=centers), \
+        _pd.DataFrame(corr, index=cells, columns=centers)
+
+
+def _std(values, valid):
+    """
+    Sample standard deviation over the times, ignoring the missing values
+    :param values: {numpy.ndarray} Values with shape (time, cell, center)
+    :param valid: {numpy.ndarray} Mask of the values that are not missing
+    :return: {numpy.ndarray} Standard deviations with shape (cell, center)
+    """
+    count = valid.sum(axis=0)
+    with _np.errstate(invalid='ignore', divide='ignore'):
+        mean = _np.where(valid, values, 0.).sum(axis=0) / count
+        deviations = _np.where(valid, values - mean, 0.)
+        std = _np.sqrt((deviations ** 2).sum(axis=0) / (count - 1))
+    std[count < 2] = _np.nan
+    return std
@@ -0,0 +1,274 @@
+"""
+lib_cube.py contains a pre-aggregated cube of the FSOI statistics for the web requests.
+
+The cube holds the additive measures of the partial aggregates (@see lib_aggregate.MEASURES) over
+the dimensions DAY x CENTER x NORM x CYCLE x PLATFORM (unified platforms).  The measures are stored
+as cumulative sums over the days, so the sum over any date range is the difference of two slices,
+whatever the length of the range.  A (day, center, norm, cycle) slot holds a single cycle, so adding
+a cycle that is already in the cube (a retried or reprocessed ingest) replaces its contribution.
+
+The cube is saved as a version directory with the array (prefix.npy), which is memory-mapped when
+it is loaded, and its axes (axes.json).  The cube path is a symbolic link to the current version,
+swapped in one step, and readers resolve it once so they read the array and axes of one version.
+Writers of a saved cube (@see update) are serialized with a lock file next to the cube path.
+"""
+
+import os
+import json
+import fcntl
+import shutil
+import tempfile
+from contextlib import contextmanager
+import numpy as _np
+import pandas as _pd
+from datetime import datetime
+import fsoi.stats.lib_aggregate as _lagg
+from fsoi import log
+
+# labelled dimensions of the cube, after the day
+AXES = ['CENTER', 'NORM', 'CYCLE', 'PLATFORM']
+
+
+class Cube(object):
+    """
+    Cube of the daily partial aggregates, stored as cumulative sums over the days
+    """
+
+    def __init__(self):
+        """
+        Create an empty cube
+        """
+        self.start = None
+        self.axes = {axis: [] for axis in AXES}
+        self.prefix = _np.zeros((1,) + (0,) * len(AXES) + (len(_lagg.MEASURES),))
+        # ingested cycles, CENTER/NORM/YYYYMMDDHH
+        self.ingested = set()
+
+    def days(self):
+        """
+        Get the number of days in the cube
+        :return: {int} Number of days
+        """
+        return self.prefix.shape[0] - 1
+
+    def add(self, partials):
+        """
+        Add partial aggregates to the cube, replacing the cycles that are already in the cube
+        :param partials: {pandas.DataFrame} Cycle or day partial aggregates, @see lib_aggregate
+        :return: {Cube} self
+        """
+        if len(partials) == 0:
+            return self
+        df = _lagg.rollup(partials, _lagg.DAY)
+        days = _pd.to_datetime(df.index.get_level_values('PERIOD'), format='%Y%m%d')
+        self._extend(days.min(), days.max(), df.index)
+
+        keys = set(zip(df.index.get_level_values('CENTER'), df.index.get_level_values('NORM'),
+                       df.index.get_level_values('PERIOD'), df.index.get_level_values('CYCLE')))
+        keys = {'%s/%s/%s%02d' % (center, norm, day, int(cycle))
+                for center, norm, day, cycle in keys}
+        if keys & self.ingested:
+            log.info('Replacing %d cycles in the cube' % len(keys & self.ingested))
+        self.ingested |= keys
+
+        first = (days.min() - self.start).days
+        span = (days.max() - days.min()).days + 1
+        position = [(days - days.min()).days.values]
+        for axis in AXES:
+            position.append(_pd.Index(self.axes[axis]).get_indexer(df.index.get_level_values(axis)))
+
+        # sum the new days, and replace the (day, center, norm, cycle) slots they cover
+        daily = _np.zeros((span,) + self.prefix.shape[1:])
+        _np.add.at(daily, tuple(position), df[_lagg.MEASURES].values)
+        slots = _np.zeros(daily.shape[:len(AXES)], dtype=bool)
+        slots[tuple(position[:len(AXES)])] = True
+        if not self.prefix.flags.writeable:
+            self.prefix = _np.array(self.prefix)
+        previous = _np.diff(self.prefix[first:first + span + 1], axis=0)
+        daily = _np.where(slots[..., None, None], daily - previous, 0.)
+
+        # accumulate the changes over the following days
+        cumulative = daily.cumsum(axis=0)
+        self.prefix[first + 1:first + span + 1] += cumulative
+        self.prefix[first + span + 1:] += cumulative[-1]
+
+        return self
+
+    def _extend(self, first, last, index):
+        """
+        Extend the cube to cover days and labels
+        :param first: {datetime} First day
+        :param last: {datetime} Last day
+        :param index: {pandas.MultiIndex} Index with the labels of each axis
+        :return: None
+        """
+        prefix = self.prefix
+        if self.start is None:
+            self.start = first
+        if first < self.start:
+            before = (self.start - first).days
+            prefix = _np.concatenate([_np.zeros((before,) + prefix.shape[1:]), prefix])
+            self.start = first
+        after = (last - self.start).days + 1 - (prefix.shape[0] - 1)
+        if after > 0:
+            prefix = _np.concatenate([prefix, _np.repeat(prefix[-1:], after, axis=0)])
+
+        for i, axis in enumerate(AXES):
+            labels = index.get_level_values(axis).unique()
+            new = [label for label in labels if label not in self.axes[axis]]
+            if new:
+                self.axes[axis] += sorted(new)
+                width = [(0, 0)] * prefix.ndim
+                width[i + 1] = (0, len(new))
+                prefix = _np.pad(prefix, width)
+
+        self.prefix = prefix
+
+    def sums(self, start_date, end_date, centers=None, norms=None, cycles=None):
+        """
+        Sum the measures over a date range, norms and cycles
+        :param start_date: {str} First day of the range, YYYYMMDD
+        :param end_date: {str} Last day of the range, YYYYMMDD
+        :param centers: {list} Centers (default: all)
+        :param norms: {list} Norms to add up (default: all)
+        :param cycles: {list} Cycle hours to add up (default: all)
+        :return: {pandas.DataFrame} Summed MEASURES indexed by CENTER and PLATFORM, without the
+                 platforms that have no data
+        """
+        labels = [centers, norms, cycles, None]
+        labels = [self.axes[axis] if label is None else [x for x in label if x in self.axes[axis]]
+                  for axis, label in zip(AXES, labels)]
+        index = _pd.MultiIndex.from_product([labels[0], labels[3]], names=['CENTER', 'PLATFORM'])
+
+        first, last = self._day(start_date), self._day(end_date) + 1
+        first, last = max(first, 0), min(last, self.days())
+        if self.start is None or first >= last:
+            return _pd.DataFrame(columns=_lagg.MEASURES, index=index[:0], dtype=_np.float64)
+
+        total = self.prefix[last] - self.prefix[first]
+        positions = [[self.axes[axis].index(x) for x in label] for axis, label in zip(AXES, labels)]
+        total = total[_np.ix_(*positions)].sum(axis=(1, 2))
+
+        df = _pd.DataFrame(total.reshape(-1, len(_lagg.MEASURES)), index=index,
+                           columns=_lagg.MEASURES)
+        return df[df['Count'] > 0]
+
+    def query(self, request):
+        """
+        Answer a web request from the cube
+        :param request: {dict} A validated request, with start_date, end_date, centers, norm
+                        (dry, moist or both) and cycles
+        :return: {dict} (mean, std) time-averages indexed by PLATFORM, by center,
+                 @see lib_obimpact.tavg
+        """
+        norms = ['dry', 'moist'] if request['norm'] == 'both' else [request['norm']]
+        cycles = [int(cycle) for cycle in request['cycles']]
+        df = self.sums(request['start_date'], request['end_date'], request['centers'], norms, cycles)
+
+        results = {}
+        for center in request['centers']:
+            if center in df.index.get_level_values('CENTER'):
+                results[center] = _lagg.statistics(df.xs(center, level='CENTER'))
+        return results
+
+    def _day(self, date):
+        """
+        Get the position of a day in the cube
+        :param date: {str} YYYYMMDD
+        :return: {int} Number of days since the start of the cube
+        """
+        if self.start is None:
+            return 0
+        return (datetime.strptime(date[:_lagg.DAY], '%Y%m%d') - self.start).days
+
+    def save(self, path):
+        """
+        Save the cube to a new version directory, and point the cube path to it in one step so
+        that readers see either the old or the new cube.  The previous version is kept for the
+        readers that resolved the path before the swap, older versions are removed.
+        :param path: {str} Full path to the cube (a symbolic link to the version directory)
+        :return: None
+        """
+        path = os.path.abspath(path)
+        parent, name = os.path.split(path)
+        os.makedirs(parent, exist_ok=True)
+        axes = {axis: [str(x) if axis != 'CYCLE' else int(x) for x in self.axes[axis]]
+                for axis in AXES}
+        axes['start'] = self.start.strftime('%Y%m%d') if self.start is not None else None
+        axes['ingested'] = sorted(self.ingested)
+
+        version = tempfile.mkdtemp(prefix='%s.v-' % name, dir=parent)
+        os.chmod(version, 0o755)
+        _np.save(os.path.join(version, 'prefix.npy'), self.prefix)
+        with open(os.path.join(version, 'axes.json'), 'w') as f:
+            json.dump(axes, f)
+
+        previous = os.path.realpath(path) if os.path.islink(path) else None
+        # a cube saved as a plain directory (before versions) becomes the previous version
+        if os.path.isdir(path) and not os.path.islink(path):
+            previous = tempfile.mkdtemp(prefix='%s.v-' % name, dir=parent)
+            os.rename(path, previous)
+
+        link = '%s.tmp-%d' % (path, os.getpid())
+        os.symlink(os.path.basename(version), link)
+        os.replace(link, path)
+
+        for entry in os.listdir(parent):
+            old = os.path.join(parent, entry)
+            if entry.startswith('%s.v-' % name) and old not in (version, previous):
+                shutil.rmtree(old, ignore_errors=True)
+
+    @staticmethod
+    def load(path, mmap=True):
+        """
+        Load a cube
+        :param path: {str} Full path to the cube
+        :param mmap: {bool} Memory-map the array, so that a query only reads the days it needs
+        :return: {Cube} The cube
+        """
+        # resolve the version once, the path may be swapped to a new version while reading
+        path = os.path.realpath(path)
+        with open(os.path.join(path, 'axes.json')) as f:
+            axes = json.load(f)
+
+        cube = Cube()
+        cube.start = datetime.strptime(axes['start'], '%Y%m%d') if axes['start'] else None
+        cube.axes = {axis: axes[axis] for axis in AXES}
+        cube.ingested = set(axes.get('ingested', []))
+        cube.prefix = _np.load(os.path.join(path, 'prefix.npy'), mmap_mode='r' if mmap else None)
+        return cube
+
+
+@contextmanager
+def _lock(path):
+    """
+    Hold the exclusive lock of the writers of a cube
+    :param path: {str} Full path to the cube
+    :return: None
+    """
+    path = os.path.abspath(path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open('%s.lock' % path, 'a') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def update(path, partials):
+    """
+    Add partial aggregates to a saved cube, or create it; concurrent updates are serialized
+    :param path: {str} Full path to the cube
+    :param partials: {pandas.DataFrame} Cycle or day partial aggregates
+    :return: {Cube} The updated cube
+    """
+    with _lock(path):
+        if os.path.isfile(os.path.join(path, 'axes.json')):
+            cube = Cube.load(path, mmap=False)
+        else:
+            log.info('Creating the cube: %s' % path)
+            cube = Cube()
+        cube.add(partials)
+        cube.save(path)
+    return cube
@@ -1,8 +1,33 @@
 """
 lib_mapping.py contains mapping related functions:
+
+Prepared maps (@see getMap) are cached in memory, keyed by the projection parameters, and can be
+pickled to a cache directory so that other processes skip the coastline and boundary processing.
+The disk cache is opt-in (FSOI_MAP_CACHE), and only used in a directory that is owned by the user
+and not writable by others, since loading a pickle runs code.  The projected coordinates of the
+lat/lon grids of the binned values (@see drawGrid) are cached in memory.
+
+Binned values are drawn as a mesh of their cells (@see drawGrid): they are scattered into a dense
+lat/lon array, drawn with pcolormesh on the projected cell edges.  Basemap is imported when a map
+is created, the gridding does not need it.
 """
 
-from mpl_toolkits.basemap import Basemap as _Basemap
+import os as _os
+import pickle as _pickle
+import hashlib as _hashlib
+from collections import OrderedDict as _OrderedDict
+import numpy as _np
+from fsoi import log
+
+# directory of the pickled maps, FSOI_MAP_CACHE in the environment overrides it (default: none)
+MAP_CACHE = None
+
+# number of maps and projected grids kept in memory
+MAX_MAPS = 8
+MAX_GRIDS = 32
+
+_maps = _OrderedDict()
+_grids = _OrderedDict()
 
 
 class Projection(object):
@@ -103,6 +128,212 @@ class Projection(object):
 
         return
 
+    def key(self):
+        """
+        Get a hashable key of the projection parameters
+        :return: {tuple} The parameters, sorted by name
+        """
+        return tuple(sorted((name, tuple(value) if isinstance(value, (range, list)) else value)
+                            for name, value in vars(self).items()))
+
+
+def getMap(proj, cache_dir=None, **kwargs):
+    """
+    Get a prepared basemap object for the projection, from the memory or disk cache if possible
+    :param proj: {Projection} The projection
+    :param cache_dir: {str} Directory of the pickled maps (default: FSOI_MAP_CACHE or MAP_CACHE),
+                      False to only cache in memory; created with mode 0700, and not used unless it
+                      is owned by the user and not writable by others
+    :param kwargs: Passed to createMap
+    :return: {Basemap} The basemap object, shared by the callers
+    """
+    key = (proj.key(), tuple(sorted(kwargs.items())))
+    if key in _maps:
+        _maps.move_to_end(key)
+        return _maps[key]
+
+    if cache_dir is None:
+        cache_dir = _os.environ.get('FSOI_MAP_CACHE', MAP_CACHE)
+    fname = None
+    if cache_dir and _privateDir(cache_dir):
+        import mpl_toolkits.basemap as _basemap
+        digest = _hashlib.sha1(repr((_basemap.__version__, key)).encode('utf-8')).hexdigest()
+        fname = _os.path.join(cache_dir, 'basemap_%s.pickle' % digest)
+
+    bmap = _loadMap(fname)
+    if bmap is None:
+        bmap = createMap(proj, **kwargs)
+        _saveMap(bmap, fname)
+
+    _remember(_maps, key, bmap, MAX_MAPS)
+    return bmap
+
+
+def _privateDir(path):
+    """
+    Create a directory only accessible by the user, and check that an existing one is owned by
+    the user and not writable by others
+    :param path: {str} Full path to the directory
+    :return: {bool} True if the directory can be trusted
+    """
+    try:
+        _os.makedirs(path, mode=0o700, exist_ok=True)
+        trusted = _isPrivate(path)
+    except OSError as e:
+        log.warn('Cannot use the map cache %s: %s' % (path, str(e)))
+        return False
+    if not trusted:
+        log.warn('Not using the map cache %s: not owned by the user or writable by others' % path)
+    return trusted
+
+
+def _isPrivate(path):
+    """
+    Check that a file or directory is owned by the user and not writable by group or others
+    :param path: {str} Full path
+    :return: {bool} True if it is
+    """
+    status = _os.stat(path)
+    return status.st_uid == _os.getuid() and not status.st_mode & 0o022
+
+
+def _loadMap(fname):
+    """
+    Load a pickled map
+    :param fname: {str} Full path to the pickle, or None
+    :return: {Basemap} The map, or None if there is no valid pickle
+    """
+    if fname is None or not _os.path.isfile(fname):
+        return None
+    if not _isPrivate(fname):
+        log.warn('Ignoring the cached map %s: not owned by the user or writable by others' % fname)
+        return None
+    try:
+        with open(fname, 'rb') as f:
+            return _pickle.load(f)
+    except Exception as e:
+        log.warn('Ignoring the cached map %s: %s' % (fname, str(e)))
+        return None
+
+
+def _saveMap(bmap, fname):
+    """
+    Pickle a map, replacing the file atomically
+    :param bmap: {Basemap} The map
+    :param fname: {str} Full path to the pickle, or None
+    :return: None
+    """
+    if fname is None:
+        return
+    tmp = '%s.%d.tmp' % (fname, _os.getpid())
+    try:
+        with open(tmp, 'wb') as f:
+            _pickle.dump(bmap, f, protocol=_pickle.HIGHEST_PROTOCOL)
+        _os.replace(tmp, fname)
+    except Exception as e:
+        log.warn('Failed to cache the map %s: %s' % (fname, str(e)))
+        if _os.path.exists(tmp):
+            _os.remove(tmp)
+
+
+def _remember(cache, key, value, size):
+    """
+    Add a value to a least recently used cache
+    :param cache: {OrderedDict} The cache
+    :param key: Key of the value
+    :param value: The value
+    :param size: {int} Maximum number of values in the cache
+    :return: None
+    """
+    cache[key] = value
+    cache.move_to_end(key)
+    while len(cache) > size:
+        cache.popitem(last=False)
+
+
+def _projectGrid(bmap, proj, grid_lons, grid_lats):
+    """
+    Project a lat/lon grid, or get it from the cache
+    :param bmap: {Basemap} The map of the projection
+    :param proj: {Projection} The projection
+    :param grid_lons: {numpy.ndarray} Longitudes of the grid
+    :param grid_lats: {numpy.ndarray} Latitudes of the grid
+    :return: ({numpy.ndarray}, {numpy.ndarray}) Projected x and y, with shape (lat, lon)
+    """
+    key = (proj.key(), grid_lons.tobytes(), grid_lats.tobytes())
+    if key in _grids:
+        _grids.move_to_end(key)
+        return _grids[key]
+
+    x, y = bmap(*_np.meshgrid(grid_lons, grid_lats))
+    _remember(_grids, key, (x, y), MAX_GRIDS)
+    return x, y
+
+
+def gridValues(lons, lats, values, dlat=None, dlon=None):
+    """
+    Scatter binned values into a dense lat/lon array
+    :param lons: {numpy.ndarray} Longitude of the lower-left corner of each bin
+                 (@see lib_obimpact.bin_df)
+    :param lats: {numpy.ndarray} Latitude of the lower-left corner of each bin
+    :param values: {numpy.ndarray} Value of each bin
+    :param dlat: {float} Latitude box in degrees (default: the spacing of the latitudes)
+    :param dlon: {float} Longitude box in degrees (default: the spacing of the longitudes)
+    :return: ({numpy.ndarray}, {numpy.ndarray}, {numpy.ma.MaskedArray}) Longitude and latitude
+             edges of the cells, and the mean value of each cell with shape (lat, lon), masked
+             where there are no values
+    """
+    lons = _np.asarray(lons, dtype=_np.float64)
+    lats = _np.asarray(lats, dtype=_np.float64)
+    values = _np.asarray(values, dtype=_np.float64)
+    dlon = _spacing(lons) if dlon is None else float(dlon)
+    dlat = _spacing(lats) if dlat is None else float(dlat)
+
+    valid = _np.isfinite(values) & _np.isfinite(lons) & _np.isfinite(lats)
+    lon0, lat0 = _np.min(lons[valid], initial=0.), _np.min(lats[valid], initial=-90.)
+    # bins are labelled by their lower-left corner, the tolerance absorbs rounding of the labels
+    ilon = _np.floor((lons[valid] - lon0) / dlon + 1.e-6).astype(int)
+    ilat = _np.floor((lats[valid] - lat0) / dlat + 1.e-6).astype(int)
+    nlon, nlat = ilon.max(initial=0) + 1, ilat.max(initial=0) + 1
+
+    cell = ilat * nlon + ilon
+    counts = _np.bincount(cell, minlength=nlat * nlon)
+    sums = _np.bincount(cell, weights=values[valid], minlength=nlat * nlon)
+    grid = _np.ma.masked_array(sums / _np.maximum(counts, 1), mask=counts == 0)
+
+    lon_edges = lon0 + dlon * _np.arange(nlon + 1)
+    lat_edges = _np.clip(lat0 + dlat * _np.arange(nlat + 1), -90., 90.)
+    return lon_edges, lat_edges, grid.reshape(nlat, nlon)
+
+
+def _spacing(coordinates, default=5.):
+    """
+    Infer the bin size from the spacing of the bin coordinates
+    :param coordinates: {numpy.ndarray} Bin coordinates
+    :param default: {float} Bin size if there are fewer than two distinct coordinates
+    :return: {float} The smallest spacing of the distinct coordinates
+    """
+    spacing = _np.diff(_np.unique(coordinates[_np.isfinite(coordinates)]))
+    return float(spacing.min()) if len(spacing) else default
+
+
+def drawGrid(bmap, proj, lons, lats, values, dlat=None, dlon=None, **kwargs):
+    """
+    Draw binned values as a mesh of their lat/lon cells on the map
+    :param bmap: {Basemap} The map of the projection
+    :param proj: {Projection} The projection
+    :param lons: {numpy.ndarray} Longitude of the lower-left corner of each bin
+    :param lats: {numpy.ndarray} Latitude of the lower-left corner of each bin
+    :param values: {numpy.ndarray} Value of each bin
+    :param dlat: {float} Latitude box in degrees (default: the spacing of the latitudes)
+    :param dlon: {float} Longitude box in degrees (default: the spacing of the longitudes)
+    :param kwargs: Passed to pcolormesh (cmap, vmin, vmax, alpha...)
+    :return: {matplotlib.collections.QuadMesh} The mesh, for a colorbar
+    """
+    lon_edges, lat_edges, grid = gridValues(lons, lats, values, dlat=dlat, dlon=dlon)
+    x, y = _projectGrid(bmap, proj, lon_edges, lat_edges)
+    return bmap.pcolormesh(x, y, grid, **kwargs)
+
 
 def createMap(proj, **kwargs):
     """
@@ -114,6 +345,8 @@ def createMap(proj, **kwargs):
     :return:
     """
 
+    from mpl_toolkits.basemap import Basemap as _Basemap
+
     if proj.projection == 'stere':
         bmap = _Basemap(projection=proj.projection, **kwargs)
 
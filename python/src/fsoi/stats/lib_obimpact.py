@@ -3,16 +3,17 @@ lib_obimpact.py contains functions for FSOI project
 Some functions can be used elsewhere
 """
 
-import yaml
-import pkgutil
 import numpy as _np
 import pandas as _pd
 from matplotlib import pyplot as _plt
 from matplotlib import cm as _cm
 import matplotlib.colors as _colors
 from matplotlib.ticker import ScalarFormatter as _ScalarFormatter
+import copy as _copy
 import itertools as _itertools
 import fsoi.stats.lib_utils as _lutils
+import fsoi.stats.lib_aggregate as _lagg
+import fsoi.config as _config
 from fsoi import log
 
 
@@ -300,12 +301,13 @@ def Platforms(center):
     :param center: {str} Name of the center
     :return: {dict} A dictionary of platforms for the given center
     """
-    platforms = yaml.full_load(pkgutil.get_data('fsoi', 'resources/fsoi/platforms.yaml'))
+    platforms = _config.get('platforms')
     if center not in platforms:
         log.warn('Unknown center requested: %s' % center)
         return None
 
-    return platforms[center]
+    # the parsed resource is shared, callers get their own copy
+    return _copy.deepcopy(platforms[center])
 
 
 def add_dicts(dicts, unique=False):
@@ -387,65 +389,153 @@ def list_to_dataframe(adate, data):
     return df
 
 
-def select(df, cycles=None, dates=None, platforms=None, obtypes=None, channels=None, latitudes=None,
-           longitudes=None, pressures=None):
+def columns_to_dataframe(adate, data):
     """
-    Successively slice a dataframe given ranges of cycles, dates, platforms, obtypes, channels, latitudes, longitudes and pressures
-    :param df:
-    :param cycles:
-    :param dates:
-    :param platforms:
-    :param obtypes:
-    :param channels:
-    :param latitudes:
-    :param longitudes:
-    :param pressures:
+    INPUT:  data = dictionary of equal length columns with keys PLATFORM, OBTYPE, CHANNEL,
+                   LONGITUDE, LATITUDE, PRESSURE, IMPACT, OMF and OBERR
+           adate = date to append to the dataframe
+    OUTPUT:   df = same dataframe as list_to_dataframe, built without a list of rows
+    :param adate:
+    :param data:
     :return:
     """
-    if cycles is not None:
-        indx = df.index.get_level_values('DATETIME') == ''
-        for cycle in cycles:
-            indx = _np.ma.logical_or(indx, df.index.get_level_values('DATETIME').hour == cycle)
-        df = df.iloc[indx]
-    if dates is not None:
-        indx = df.index.get_level_values('DATETIME') == ''
-        for date in dates:
-            indx = _np.ma.logical_or(indx, df.index.get_level_values('DATETIME') == date)
-        df = df.iloc[indx]
-    if platforms is not None:
-        indx = df.index.get_level_values('PLATFORM') == ''
-        for platform in platforms:
-            indx = _np.ma.logical_or(indx, df.index.get_level_values('PLATFORM') == platform)
-        df = df.iloc[indx]
-    if obtypes is not None:
-        indx = df.index.get_level_values('OBTYPE') == ''
-        for obtype in obtypes:
-            indx = _np.ma.logical_or(indx, df.index.get_level_values('OBTYPE') == obtype)
-        df = df.iloc[indx]
-    if channels is not None:
-        indx = df.index.get_level_values('CHANNEL') == ''
-        for channel in channels:
-            indx = _np.ma.logical_or(indx, df.index.get_level_values('CHANNEL') == channel)
-        df = df.iloc[indx]
-    if latitudes is not None:
-        indx1 = df.index.get_level_values('LATITUDE') >= _np.min(latitudes)
-        indx2 = df.index.get_level_values('LATITUDE') <= _np.max(latitudes)
-        indx = _np.ma.logical_and(indx1, indx2)
-        df = df.iloc[indx]
-    if longitudes is not None:
-        indx1 = df.index.get_level_values('LONGITUDE') >= _np.min(longitudes)
-        indx2 = df.index.get_level_values('LONGITUDE') <= _np.max(longitudes)
-        indx = _np.ma.logical_and(indx1, indx2)
-        df = df.iloc[indx]
-    if pressures is not None:
-        indx1 = df.index.get_level_values('PRESSURE') >= _np.min(pressures)
-        indx2 = df.index.get_level_values('PRESSURE') <= _np.max(pressures)
-        indx = _np.ma.logical_and(indx1, indx2)
-        df = df.iloc[indx]
+    columns = ['PLATFORM', 'OBTYPE', 'CHANNEL', 'LONGITUDE', 'LATITUDE', 'PRESSURE', 'IMPACT',
+               'OMF', 'OBERR']
+    index_cols = columns[0:3]
+
+    n = len(data['IMPACT'])
+    index = _pd.MultiIndex.from_arrays(
+        [_pd.DatetimeIndex([adate]).repeat(n),
+         _np.asarray(data['PLATFORM'], dtype=object),
+         _np.asarray(data['OBTYPE'], dtype=object),
+         _np.asarray(data['CHANNEL']).astype(_np.int64)],
+        names=['DATETIME'] + index_cols)
+
+    df = _pd.DataFrame({col: _np.asarray(data[col], dtype=_np.float64) for col in columns[3:]},
+                       index=index, columns=columns[3:])
 
     return df
 
 
+def select(df, cycles=None, dates=None, platforms=None, obtypes=None, channels=None, latitudes=None,
+           longitudes=None, pressures=None):
+    """
+    Select the rows of a dataframe given cycles, dates, platforms, obtypes, channels, and ranges of
+    latitudes, longitudes and pressures, @see IndexSelector
+    :param df: {pandas.DataFrame} Data frame with a MultiIndex
+    :param cycles: {list} Cycle hours
+    :param dates: {list} Dates
+    :param platforms: {list} Platforms
+    :param obtypes: {list} Observation types
+    :param channels: {list} Channels
+    :param latitudes: {list} Latitude range, [min, max] inclusive
+    :param longitudes: {list} Longitude range, [min, max] inclusive
+    :param pressures: {list} Pressure range, [min, max] inclusive
+    :return: {pandas.DataFrame} The selected rows, sorted by the index
+    """
+    return IndexSelector(df).select(cycles=cycles, dates=dates, platforms=platforms,
+                                    obtypes=obtypes, channels=channels, latitudes=latitudes,
+                                    longitudes=longitudes, pressures=pressures)
+
+
+class IndexSelector(object):
+    """
+    Select rows of a dataframe by the levels of its MultiIndex.  The frame is sorted and its index
+    codes cached once, so that each criterion is resolved on the (small) level values into a lookup
+    table of the codes, and the criteria are combined into a single mask before the rows are taken.
+    Criteria on the outer level also restrict the mask to the span of rows it selects.
+    """
+
+    # criterion: level, and whether it is a set of values or a [min, max] range
+    CRITERIA = {
+        'cycles': ('DATETIME', 'hours'),
+        'dates': ('DATETIME', 'values'),
+        'platforms': ('PLATFORM', 'values'),
+        'obtypes': ('OBTYPE', 'values'),
+        'channels': ('CHANNEL', 'values'),
+        'latitudes': ('LATITUDE', 'range'),
+        'longitudes': ('LONGITUDE', 'range'),
+        'pressures': ('PRESSURE', 'range')
+    }
+
+    def __init__(self, df):
+        """
+        Sort a dataframe and cache its index
+        :param df: {pandas.DataFrame} Data frame with a MultiIndex
+        """
+        if not df.index.is_monotonic_increasing:
+            df = df.sort_index()
+        self.df = df
+        self.names = list(df.index.names)
+        self.levels = df.index.levels if df.index.nlevels > 1 else [df.index]
+        self.codes = [_np.asarray(codes) for codes in df.index.codes] if df.index.nlevels > 1 \
+            else [_np.arange(len(df))]
+        # the outer codes are sorted if the outer level values are
+        self.sorted = self.levels[0].is_monotonic_increasing
+
+    def table(self, level, kind, values):
+        """
+        Resolve a criterion into a lookup table of the level codes
+        :param level: {int} Level number
+        :param kind: {str} hours, values or range
+        :param values: {list} Cycle hours, values, or [min, max]
+        :return: {numpy.ndarray} Boolean for each code, and False for the missing values (-1)
+        """
+        index = self.levels[level]
+        if kind == 'hours':
+            table = _np.asarray(index.hour.isin(values))
+        elif kind == 'values':
+            table = _np.asarray(index.isin(values))
+        elif index.is_monotonic_increasing:
+            # binary search of the sorted level values
+            table = _np.zeros(len(index), dtype=bool)
+            table[index.searchsorted(_np.min(values), 'left'):
+                  index.searchsorted(_np.max(values), 'right')] = True
+        else:
+            table = _np.asarray((index >= _np.min(values)) & (index <= _np.max(values)))
+        return _np.append(table, False)
+
+    def positions(self, **criteria):
+        """
+        Get the positions of the rows that match all of the criteria
+        :param criteria: Lists of values by criterion, @see CRITERIA (None is ignored)
+        :return: {numpy.ndarray} Row positions
+        """
+        tables = []
+        for criterion, values in criteria.items():
+            if values is None:
+                continue
+            name, kind = self.CRITERIA[criterion]
+            if name not in self.names:
+                raise KeyError('Level %s not found' % name)
+            level = self.names.index(name)
+            tables.append((level, self.table(level, kind, values)))
+
+        # the codes of the outer level are sorted, select the span of rows first
+        start, stop = 0, len(self.df)
+        for level, table in tables:
+            if level == 0 and self.sorted:
+                selected = _np.flatnonzero(table[:-1])
+                if len(selected) == 0:
+                    return _np.array([], dtype=_np.intp)
+                start = max(start, self.codes[0].searchsorted(selected[0], 'left'))
+                stop = min(stop, self.codes[0].searchsorted(selected[-1], 'right'))
+
+        mask = _np.ones(max(stop - start, 0), dtype=bool)
+        for level, table in tables:
+            mask &= table[self.codes[level][start:stop]]
+
+        return start + _np.flatnonzero(mask)
+
+    def select(self, **criteria):
+        """
+        Select the rows that match all of the criteria
+        :param criteria: Lists of values by criterion, @see CRITERIA (None is ignored)
+        :return: {pandas.DataFrame} The selected rows
+        """
+        return self.df.iloc[self.positions(**criteria)]
+
+
 def BulkStats(DF, threshold=1.e-10):
     """
     Collapse PRESSURE, LATITUDE, LONGITUDE
@@ -455,17 +545,18 @@ def BulkStats(DF, threshold=1.e-10):
     """
     log.debug('... computing bulk statistics ...')
 
-    columns = ['TotImp', 'ObCnt', 'ObCntBen', 'ObCntNeu']
     names = ['DATETIME', 'PLATFORM', 'OBTYPE', 'CHANNEL']
-    df = _lutils.EmptyDataFrame(columns, names, dtype=_np.float)
 
-    tmp = DF.reset_index()
-    tmp.drop(['LONGITUDE', 'LATITUDE', 'PRESSURE', 'OMF', 'OBERR'], axis=1, inplace=True)
+    tmp = DF.reset_index()[names + ['IMPACT']]
+    tmp['ObCntBen'] = tmp['IMPACT'] < -threshold
+    tmp['ObCntNeu'] = (-threshold < tmp['IMPACT']) & (tmp['IMPACT'] < threshold)
 
-    df[['TotImp', 'ObCnt']] = tmp.groupby(names)['IMPACT'].agg(['sum', 'count'])
-    df[['ObCntBen']] = tmp.groupby(names)['IMPACT'].apply(lambda c: (c < -threshold).sum())
-    df[['ObCntNeu']] = tmp.groupby(names)['IMPACT'].apply(
-        lambda c: ((-threshold < c) & (c < threshold)).sum())
+    grouped = tmp.groupby(names)
+    df = grouped['IMPACT'].agg(['sum', 'count'])
+    df.columns = ['TotImp', 'ObCnt']
+    df['TotImp'] = df['TotImp'].astype(_np.float64)
+    df['ObCntBen'] = grouped['ObCntBen'].sum()
+    df['ObCntNeu'] = grouped['ObCntNeu'].sum()
 
     for col in ['ObCnt', 'ObCntBen', 'ObCntNeu']:
         df[col] = df[col].astype(_np.int)
@@ -533,14 +624,79 @@ def tavg(DF, level=None):
 
     log.debug('... time-averaging bulk statistics over level = %s' % level)
 
-    df = DF.mean(level=level)
-    df2 = DF.std(level=level)
+    return TavgAccumulator(level).add(DF).result()
 
-    for col in ['ObCnt', 'ObCntBen', 'ObCntNeu']:
-        df[col] = df[col].astype(_np.int)
-        df2[col] = df2[col].fillna(0).astype(_np.int)
 
-    return df, df2
+class TavgAccumulator(object):
+    """
+    Streaming time-average of bulk statistics (@see tavg).  Frames are folded in one at a time and
+    can be dropped afterwards: only the partial aggregates (@see lib_aggregate) of each cycle hour
+    and value of the level (e.g. platform) are kept, so that cycles can be selected later, and
+    accumulators are merged by adding them.
+    """
+
+    def __init__(self, level='PLATFORM'):
+        """
+        Constructor
+        :param level: {str} Level to average over, e.g. PLATFORM or CHANNEL
+        """
+        self.level = level
+        self.partials = None
+
+    def add(self, DF):
+        """
+        Fold a frame into the time-average
+        :param DF: {pandas.DataFrame} Bulk statistics indexed by DATETIME and the level
+        :return: {TavgAccumulator} self
+        """
+        if 'DATETIME' in DF.index.names:
+            hours = DF.index.get_level_values('DATETIME').hour
+        else:
+            hours = _np.full(len(DF), -1)
+
+        keys = [_pd.Index(hours, name='CYCLE'), DF.index.get_level_values(self.level)]
+        return self._fold(_lagg.measures(DF).groupby(keys).sum())
+
+    def merge(self, other):
+        """
+        Merge the time-average of other frames into this one
+        :param other: {TavgAccumulator} Accumulator over the same level
+        :return: {TavgAccumulator} self
+        """
+        return self._fold(other.partials) if other.partials is not None else self
+
+    def _fold(self, partials):
+        """
+        Add partial aggregates to the accumulator
+        :param partials: {pandas.DataFrame} Measures indexed by CYCLE and the level
+        :return: {TavgAccumulator} self
+        """
+        if self.partials is not None:
+            partials = _pd.concat([self.partials, partials])
+            partials = partials.groupby(level=['CYCLE', self.level]).sum()
+        self.partials = partials
+        return self
+
+    def hours(self):
+        """
+        Get the cycle hours that were folded in
+        :return: {list} Sorted cycle hours
+        """
+        if self.partials is None:
+            return []
+        return sorted(set(self.partials.index.get_level_values('CYCLE')))
+
+    def result(self, cycles=None):
+        """
+        Get the time-averaged mean and standard deviation, as tavg
+        :param cycles: {list} Only average these cycle hours (default: all)
+        :return: ({pandas.DataFrame}, {pandas.DataFrame}) mean and standard deviation
+        """
+        hours = self.hours() if cycles is None else [h for h in self.hours() if h in cycles]
+        if not hours:
+            raise ValueError('No data to time-average for cycles: %s' % cycles)
+
+        return _lagg.summarize(self.partials, hours, levels=[self.level])
 
 
 def bin_df(DF, dlat=5., dlon=5., dpres=None):
@@ -712,33 +868,38 @@ def getbarcolors(data, logscale, cmax, cmin, cmap):
     :param cmap:
     :return:
     """
-    lmin = _np.log10(cmin)
-    lmax = _np.log10(cmax)
-    barcolors = []
-    for cnt in data:
-        if cnt <= cmin:
-            cindex = 0
-        elif cnt >= cmax:
-            cindex = cmap.N - 1
-        else:
-            if logscale:  # linear in log-space
-                lcnt = _np.log10(cnt)
-                cindex = (lcnt - lmin) / (lmax - lmin) * (cmap.N - 1)
-            else:
-                cindex = (cnt - cmin) / (cmax - cmin) * (cmap.N - 1)
-        cindex = _np.int(cindex)
-        barcolors.append(cmap(cindex))
+    cnt = _np.clip(_np.asarray(data, dtype=_np.float64), cmin, cmax)
+    if logscale:  # linear in log-space
+        cindex = (_np.log10(cnt) - _np.log10(cmin)) / (_np.log10(cmax) - _np.log10(cmin))
+    else:
+        cindex = (cnt - cmin) / (cmax - cmin)
+    cindex = _np.nan_to_num(cindex * (cmap.N - 1)).astype(int)
 
-    return barcolors
+    return [tuple(color) for color in cmap(cindex)]
 
 
-def summaryplot(df, qty='TotImp', plotOpt={}, std=None):
+def cierrors(values, ci):
+    """
+    Convert confidence intervals into asymmetric error bar lengths
+    :param values: {pandas.Series} Plotted values
+    :param ci: {tuple} Lower and upper bounds {pandas.Series}, indexed as the values
+    :return: {numpy.ndarray} Lengths below and above the values, with shape (2, len(values))
+    """
+    lower, upper = [bound.reindex(values.index).values for bound in ci]
+    errors = _np.stack([values.values - lower, upper - values.values])
+    # a percentile interval of a ratio need not contain the point estimate
+    return _np.where(_np.isfinite(errors), _np.clip(errors, 0., None), 0.)
+
+
+def summaryplot(df, qty='TotImp', plotOpt={}, std=None, ci=None):
     """
 
     :param df:
     :param qty:
     :param plotOpt:
     :param std:
+    :param ci: {tuple} Lower and upper bounds {pandas.DataFrame} of the quantities, indexed by
+               platform, drawn as error bars instead of the std (@see lib_bootstrap.bootstrap)
     :return:
     """
     if plotOpt['finite']:
@@ -764,15 +925,22 @@ def summaryplot(df, qty='TotImp', plotOpt={}, std=None):
     cmap = _cm.get_cmap(plotOpt['cmap'])
 
     barcolors = getbarcolors(df['ObCnt'], logscale, cmax, cmin, cmap)
-    norm = _colors.LogNorm() if logscale else _colors.Normalize()
+    norm = _colors.LogNorm(vmin=cmin, vmax=cmax) if logscale else _colors.Normalize(vmin=cmin,
+                                                                                    vmax=cmax)
 
     # dummy plot for keeping colorbar on a bar plot
     x = _np.array([0, 1, 2, 3, 4, 5, 6])
     y = _np.array([1e0, 1e1, 1e2, 1e3, 1e4, 1e5, 1e6])
-    tmp = _plt.scatter(x, y, c=y, alpha=alpha, cmap=cmap, norm=norm, vmin=cmin, vmax=cmax)
+    tmp = _plt.scatter(x, y, c=y, alpha=alpha, cmap=cmap, norm=norm)
     _plt.clf()
     cbar = _plt.colorbar(tmp, aspect=30, ticks=y, format='%.0e', alpha=alpha)
 
+    xerr = None
+    if ci is not None and qty in ci[0]:
+        xerr = cierrors(df[qty], (ci[0][qty], ci[1][qty]))
+    elif qty == 'TotImp' and std is not None:
+        xerr = std[qty]
+
     width = 1.0
     if qty == 'FracBenNeuObs':
         left = df['FracBenObs'].values
@@ -780,9 +948,9 @@ def summaryplot(df, qty='TotImp', plotOpt={}, std=None):
                                    linewidth=1.25)
         bax = df['FracNeuObs'].plot.barh(left=left, width=width, color=barcolors, alpha=alpha,
                                          edgecolor='k', linewidth=1.25)
-    elif qty == 'TotImp':
+    elif xerr is not None:
         df[qty].plot.barh(width=width, color=barcolors, alpha=alpha, edgecolor='k', linewidth=1.25,
-                          xerr=std[qty], capsize=2.0, ecolor='#FF6103')
+                          xerr=xerr, capsize=2.0, ecolor='#FF6103')
     else:
         df[qty].plot.barh(width=width, color=barcolors, alpha=alpha, edgecolor='k', linewidth=1.25)
 
@@ -810,6 +978,8 @@ def summaryplot(df, qty='TotImp', plotOpt={}, std=None):
     else:
         df = df[qty]
         xmin, xmax = df.min(), df.max()
+        if ci is not None and xerr is not None:
+            xmin, xmax = _np.nanmin(df.values - xerr[0]), _np.nanmax(df.values + xerr[1])
     dx = xmax - xmin
     xmin, xmax = xmin - 0.1 * dx, xmax + 0.1 * dx
     _plt.xlim(xmin, xmax)
@@ -877,13 +1047,15 @@ def getcomparesummarypalette(
     return palette
 
 
-def comparesummaryplot(df, palette, qty='TotImp', plotOpt={}):
+def comparesummaryplot(df, palette, qty='TotImp', plotOpt={}, ci=None):
     """
 
     :param df:
     :param palette:
     :param qty:
     :param plotOpt:
+    :param ci: {tuple} Lower and upper bounds {pandas.DataFrame} of the quantity, indexed and
+               with columns as df (@see lib_bootstrap.bootstrap), drawn as error bars
     :return:
     """
     alpha = plotOpt['alpha']
@@ -892,9 +1064,16 @@ def comparesummaryplot(df, palette, qty='TotImp', plotOpt={}):
     if palette is not None:
         barcolors = palette
 
+    kwargs = {}
+    if ci is not None:
+        kwargs = {'capsize': 2.0, 'ecolor': 'k',
+                  'xerr': _np.stack([cierrors(df[col], (ci[0][col], ci[1][col]))
+                                     if col in ci[0] else _np.zeros((2, len(df)))
+                                     for col in df.columns])}
+
     width = 0.9
     df.plot.barh(width=width, stacked=True, color=barcolors, alpha=alpha, edgecolor='k',
-                 linewidth=1.25)
+                 linewidth=1.25, **kwargs)
     _plt.axvline(0., color='k', linestyle='-', linewidth=1.25)
 
     _plt.legend(frameon=False, loc=0)
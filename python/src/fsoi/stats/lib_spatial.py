@@ -0,0 +1,249 @@
+"""
+lib_spatial.py contains the spatial index of the raw observation files and regional queries.
+
+Each observation is assigned the id of the fixed lat/lon cell it falls in (CELL column, @see
+cell_ids) when it is ingested.  Cell ids are numbered row by row from the South Pole and Greenwich,
+so that a latitude band is one contiguous range of ids and a box is one range per row of cells.
+The CELL column is a data column of the HDF tables (indexed by PyTables) and the sort key of the
+Parquet products, so a regional read only fetches the rows of the cells that overlap the region,
+and the observations of the boundary cells are then filtered on their coordinates.
+"""
+
+import numpy as _np
+import pandas as _pd
+import fsoi.stats.lib_utils as _lutils
+import fsoi.stats.lib_obimpact as _loi
+from fsoi import log
+
+# size of the cells in degrees (360 x 180 cells)
+CELL_SIZE = 1.
+NLON = int(round(360. / CELL_SIZE))
+NLAT = int(round(180. / CELL_SIZE))
+
+# named regions: [min latitude, max latitude, min longitude, max longitude], longitudes in
+# [0, 360), a box with min longitude > max longitude crosses Greenwich
+REGIONS = {
+    'Global': [-90., 90., 0., 360.],
+    'NH': [0., 90., 0., 360.],
+    'SH': [-90., 0., 0., 360.],
+    'Tropics': [-20., 20., 0., 360.],
+    'NHExtratropics': [20., 90., 0., 360.],
+    'SHExtratropics': [-90., -20., 0., 360.],
+    'NHPolar': [60., 90., 0., 360.],
+    'SHPolar': [-90., -60., 0., 360.]
+}
+
+# ranges of cells in a single query; closer ranges are merged beyond this number
+MAX_RANGES = 16
+
+
+def cell_ids(lons, lats):
+    """
+    Get the cell of observations
+    :param lons: {numpy.ndarray} Longitudes in degrees, [-180, 360)
+    :param lats: {numpy.ndarray} Latitudes in degrees, [-90, 90]
+    :return: {numpy.ndarray} Cell ids {int32}
+    """
+    lons = _np.mod(_np.asarray(lons, dtype=_np.float64), 360.)
+    lats = _np.asarray(lats, dtype=_np.float64)
+    ilon = _np.clip(_np.floor(lons / CELL_SIZE), 0, NLON - 1).astype(_np.int32)
+    ilat = _np.clip(_np.floor((lats + 90.) / CELL_SIZE), 0, NLAT - 1).astype(_np.int32)
+    return ilat * NLON + ilon
+
+
+def add_cells(df):
+    """
+    Add the CELL column to raw observations, and sort them by cell so that the rows of a cell are
+    contiguous in the chunk written to the file
+    :param df: {pandas.DataFrame} Observations with LONGITUDE and LATITUDE columns
+    :return: {pandas.DataFrame} The observations, with the CELL column
+    """
+    cells = cell_ids(df['LONGITUDE'].values, df['LATITUDE'].values)
+    order = _np.argsort(cells, kind='stable')
+    df = df.iloc[order].copy()
+    df['CELL'] = cells[order]
+    return df
+
+
+def get_region(region):
+    """
+    Get the box of a region
+    :param region: {str|list} Name of a region (@see REGIONS) or
+                   [min latitude, max latitude, min longitude, max longitude]
+    :return: {list} [min latitude, max latitude, min longitude, max longitude]
+    """
+    if isinstance(region, str):
+        if region not in REGIONS:
+            raise ValueError('Unknown region: %s' % region)
+        return REGIONS[region]
+    if len(region) != 4:
+        raise ValueError('A region box is [min latitude, max latitude, min longitude, '
+                         'max longitude]: %s' % str(region))
+
+    lat_min, lat_max, lon_min, lon_max = [float(value) for value in region]
+    if lat_min > lat_max:
+        raise ValueError('Region latitudes are reversed: %s' % str(region))
+    if lon_max - lon_min < 360.:
+        lon_min, lon_max = lon_min % 360., lon_max % 360.
+        # a box ending at Greenwich (e.g. [.., .., 300, 0]) ends at 360
+        if lon_max == 0. and lon_min > 0.:
+            lon_max = 360.
+    else:
+        lon_min, lon_max = 0., 360.
+    return [lat_min, lat_max, lon_min, lon_max]
+
+
+def region_cells(region):
+    """
+    Get the cells that overlap a region
+    :param region: {str|list} Name or box of the region, @see get_region
+    :return: {numpy.ndarray} Sorted cell ids
+    """
+    lat_min, lat_max, lon_min, lon_max = get_region(region)
+    rows = _np.arange(_cell_index(lat_min + 90., NLAT), _cell_index(lat_max + 90., NLAT) + 1)
+    if lon_min <= lon_max:
+        columns = _np.arange(_cell_index(lon_min, NLON), _cell_index(lon_max, NLON) + 1)
+    else:
+        columns = _np.concatenate([_np.arange(_cell_index(lon_min, NLON), NLON),
+                                   _np.arange(0, _cell_index(lon_max, NLON) + 1)])
+    return _np.unique(rows[:, None] * NLON + _np.unique(columns)[None, :]).astype(_np.int32)
+
+
+def _cell_index(degrees, n):
+    """
+    Get the row or column of the cell that contains a coordinate, from the origin of the grid
+    :param degrees: {float} Degrees from the origin (South Pole or Greenwich)
+    :param n: {int} Number of rows or columns
+    :return: {int} The row or column
+    """
+    return int(min(max(_np.floor(degrees / CELL_SIZE), 0), n - 1))
+
+
+def cell_ranges(cells, max_ranges=MAX_RANGES):
+    """
+    Group sorted cell ids into inclusive ranges, merging the ranges separated by the smallest gaps
+    until there are at most max_ranges
+    :param cells: {numpy.ndarray} Sorted cell ids
+    :param max_ranges: {int} Maximum number of ranges
+    :return: {list} (first, last) cell ids
+    """
+    cells = _np.asarray(cells)
+    if len(cells) == 0:
+        return []
+
+    gaps = _np.diff(cells)
+    breaks = _np.flatnonzero(gaps > 1)
+    if len(breaks) >= max_ranges:
+        # keep the largest gaps as the breaks between ranges
+        largest = _np.argsort(gaps[breaks], kind='stable')[len(breaks) - max_ranges + 1:]
+        breaks = _np.sort(breaks[largest])
+    firsts = cells[_np.concatenate([[0], breaks + 1])]
+    lasts = cells[_np.concatenate([breaks, [len(cells) - 1]])]
+    return [(int(first), int(last)) for first, last in zip(firsts, lasts)]
+
+
+def cell_where(cells, max_ranges=MAX_RANGES):
+    """
+    Get the HDFStore.select condition of the rows in the cells
+    :param cells: {numpy.ndarray} Sorted cell ids
+    :param max_ranges: {int} Maximum number of ranges in the condition
+    :return: {str} The condition
+    """
+    ranges = cell_ranges(cells, max_ranges)
+    if not ranges:
+        return 'CELL<0'
+    return ' | '.join('(CELL>=%d & CELL<=%d)' % (first, last) if first < last else
+                      '(CELL=%d)' % first for first, last in ranges)
+
+
+def in_region(df, region):
+    """
+    Get the observations inside a region
+    :param df: {pandas.DataFrame} Observations with LONGITUDE and LATITUDE columns
+    :param region: {str|list} Name or box of the region, @see get_region
+    :return: {numpy.ndarray} Boolean mask of the observations
+    """
+    lat_min, lat_max, lon_min, lon_max = get_region(region)
+    lats = df['LATITUDE'].values
+    lons = _np.mod(df['LONGITUDE'].values, 360.)
+    mask = (lats >= lat_min) & (lats <= lat_max)
+    if lon_max - lon_min >= 360.:
+        return mask
+    if lon_min <= lon_max:
+        return mask & (lons >= lon_min) & (lons <= lon_max)
+    return mask & ((lons >= lon_min) | (lons <= lon_max))
+
+
+def read_region(fname, region, vname='df', columns=None):
+    """
+    Read the observations of a region from a raw observation file.  Only the rows of the cells that
+    overlap the region are read from files with the CELL column, files without it are read whole.
+    :param fname: {str} Full path to the HDF file
+    :param region: {str|list} Name or box of the region, @see get_region
+    :param vname: {str} Name of the node
+    :param columns: {list} Only return these columns (index levels are always returned)
+    :return: {pandas.DataFrame} The observations inside the region
+    """
+    read_columns = None if columns is None else \
+        list(dict.fromkeys(list(columns) + ['LONGITUDE', 'LATITUDE']))
+    try:
+        df = _lutils.readHDF(fname, vname, where=cell_where(region_cells(region)),
+                             columns=read_columns)
+    except (ValueError, TypeError) as e:
+        log.debug('No spatial index in %s, reading the whole file: %s' % (fname, str(e)))
+        df = _lutils.readHDF(fname, vname, columns=read_columns)
+
+    df = df[in_region(df, region)]
+    return df if columns is None else df[list(columns)]
+
+
+def read_product_region(backend, region, center, norm, date, product='raw', columns=None):
+    """
+    Read the observations of a region from a storage backend
+    :param backend: {lib_utils.StorageBackend} The storage backend
+    :param region: {str|list} Name or box of the region, @see get_region
+    :param center: {str} Center name
+    :param norm: {str} dry or moist
+    :param date: {str} Date string in the format YYYYMMDDHH
+    :param product: {str} Product name, @see lib_utils.PRODUCTS
+    :param columns: {list} Only return these columns (index levels are always returned)
+    :return: {pandas.DataFrame} The observations inside the region
+    """
+    if isinstance(backend, _lutils.HDF5Backend):
+        return read_region(backend.path(product, center, norm, date), region, columns=columns)
+
+    # Parquet products are sorted by cell, the row group statistics skip the other cells
+    read_columns = None if columns is None else \
+        list(dict.fromkeys(list(columns) + ['LONGITUDE', 'LATITUDE']))
+    df = backend.read(product, center=center, norm=norm, date=date, columns=read_columns,
+                      filters=[('CELL', 'in', region_cells(region).tolist())])
+    df = df[in_region(df, region)]
+    return df if columns is None else df[list(columns)]
+
+
+def region_bulk(fnames, region, platforms=None):
+    """
+    Compute the group bulk statistics of a region from raw observation files, e.g. the cycles of a
+    season, @see lib_obimpact.tavg and lib_obimpact.summarymetrics for the regional summary
+    :param fnames: {list} Full paths to the raw observation files
+    :param region: {str|list} Name or box of the region, @see get_region
+    :param platforms: {dict} Aggregated platforms (default: OnePlatform), @see
+                      lib_obimpact.Platforms
+    :return: {pandas.DataFrame} Group bulk statistics indexed by DATETIME and PLATFORM, or None if
+             there are no observations in the region
+    """
+    if platforms is None:
+        platforms = _loi.Platforms('OnePlatform')
+
+    frames = []
+    for fname in fnames:
+        df = read_region(fname, region, columns=['IMPACT'])
+        if len(df) == 0:
+            continue
+        frames.append(_loi.groupBulkStats(_loi.accumBulkStats(_loi.BulkStats(df)), platforms))
+
+    if not frames:
+        log.error('No observations in region %s' % str(region))
+        return None
+
+    return _pd.concat(frames)
@@ -0,0 +1,107 @@
+"""
+lib_taylor.py contains the statistics of the Taylor diagrams of bulk observation impacts: the
+standard deviation of each center's time series, and the correlations between centers.
+
+The series of all centers, platforms (and channels) are loaded in one pass into a single frame, and
+the statistics of every (platform, channel) are computed together with batched NumPy reductions.
+Correlations use the pairwise-complete times, as pandas.DataFrame.corr.
+"""
+
+import numpy as _np
+import pandas as _pd
+import fsoi.stats.lib_utils as _lutils
+import fsoi.stats.lib_obimpact as _loi
+from fsoi import log
+
+
+def load_series(rootdir, centers, norm, platforms, cycles=None, obtypes=None, channels=None,
+                by_channel=False):
+    """
+    Load the total impact time series of centers and platforms, reading each file once
+    :param rootdir: {str} Root directory of the work files ({rootdir}/work/{center}/{norm}/)
+    :param centers: {list} Centers
+    :param norm: {str} dry or moist
+    :param platforms: {list} Platforms
+    :param cycles: {list} Cycle hours (default: all)
+    :param obtypes: {list} Observation types (default: all)
+    :param channels: {list} Channels (default: all)
+    :param by_channel: {bool} Keep a series for each channel, instead of their sum
+    :return: {pandas.DataFrame} TotImp indexed by DATETIME, with a column for each PLATFORM,
+             (CHANNEL,) and CENTER
+    """
+    keys = ['PLATFORM', 'CHANNEL'] if by_channel else ['PLATFORM']
+
+    series = []
+    for center in centers:
+        for platform in platforms:
+            fname = '%s/work/%s/%s/%s.h5' % (rootdir, center, norm, platform.lower())
+            try:
+                df = _lutils.readHDF(fname, 'df')
+            except (IOError, KeyError) as e:
+                log.warn('Skipping %s: %s' % (fname, str(e)))
+                continue
+            df = _loi.select(df, cycles=cycles, obtypes=obtypes, channels=channels)
+            df = df['TotImp'].groupby(level=['DATETIME'] + keys).sum()
+            series.append(_pd.concat({center: df}, names=['CENTER']))
+
+    if not series:
+        return _pd.DataFrame()
+
+    return _pd.concat(series).unstack(keys + ['CENTER']).sort_index(axis=1)
+
+
+def std_corr(series):
+    """
+    Compute the standard deviation and correlation matrix of the centers, for every key
+    :param series: {pandas.DataFrame} Time series indexed by DATETIME, with columns
+                   (keys..., CENTER) or only CENTER, @see load_series
+    :return: {dict} (standard deviations {pandas.Series}, correlations {pandas.DataFrame}) of the
+             centers, by key (None if the columns are only CENTER)
+    """
+    columns = series.columns
+    if columns.nlevels == 1:
+        keys, key_codes = [None], _np.zeros(len(columns), dtype=int)
+        center_values = columns
+    else:
+        key_values = columns.droplevel('CENTER')
+        keys = key_values.unique().tolist()
+        key_codes = _pd.Index(keys).get_indexer(key_values)
+        center_values = columns.get_level_values('CENTER')
+    centers = center_values.unique().tolist()
+
+    # dense (time x key x center) array with NaN for the missing series
+    values = _np.full((len(series), len(keys), len(centers)), _np.nan)
+    values[:, key_codes, _pd.Index(centers).get_indexer(center_values)] = series.values
+
+    std, corr = _moments(values)
+
+    return {key: (_pd.Series(std[k], index=centers), _pd.DataFrame(corr[k], index=centers,
+                                                                   columns=centers))
+            for k, key in enumerate(keys)}
+
+
+def _moments(values):
+    """
+    Compute the standard deviations and pairwise-complete correlations over the times
+    :param values: {numpy.ndarray} Values with shape (time, key, center), NaN where missing
+    :return: ({numpy.ndarray}, {numpy.ndarray}) Standard deviations with shape (key, center) and
+             correlations with shape (key, center, center)
+    """
+    mask = ~_np.isnan(values)
+    count = mask.sum(axis=0)
+    with _np.errstate(invalid='ignore', divide='ignore'):
+        # center the series first, to avoid cancellation in the sums of products
+        x = _np.where(mask, values - _np.where(mask, values, 0.).sum(axis=0) / count, 0.)
+        std = _np.sqrt((x ** 2).sum(axis=0) / (count - 1))
+        std[count < 2] = _np.nan
+
+        m = mask.astype(_np.float64)
+        n = _np.einsum('tkc,tkd->kcd', m, m)
+        sx = _np.einsum('tkc,tkd->kcd', x, m)
+        sxx = _np.einsum('tkc,tkd->kcd', x ** 2, m)
+        sxy = _np.einsum('tkc,tkd->kcd', x, x)
+        sy, syy = sx.transpose(0, 2, 1), sxx.transpose(0, 2, 1)
+        corr = (sxy - sx * sy / n) / _np.sqrt((sxx - sx ** 2 / n) * (syy - sy ** 2 / n))
+    corr[(n < 2) | ~_np.isfinite(corr)] = _np.nan
+
+    return std, corr
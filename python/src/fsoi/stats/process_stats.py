@@ -88,12 +88,12 @@ def process_file(key, center, force=False):
     print('  Processing %s' % key)
     df0 = readHDF('/tmp/%s/file.h5' % center, 'df')
     df1 = BulkStats(df0)
-    writeHDF('/tmp/%s/bulk.file.h5' % center, 'df', df1)
+    writeHDF('/tmp/%s/bulk.file.h5' % center, 'df', df1, profile='web')
     df2 = accumBulkStats(df1)
-    writeHDF('/tmp/%s/accumbulk.file.h5' % center, 'df', df2)
+    writeHDF('/tmp/%s/accumbulk.file.h5' % center, 'df', df2, profile='web')
     platforms = Platforms(center)
     df3 = groupBulkStats(df2, platforms)
-    writeHDF('/tmp/%s/groupbulk.file.h5' % center, 'df', df3)
+    writeHDF('/tmp/%s/groupbulk.file.h5' % center, 'df', df3, profile='web')
     del df0, df1, df2, df3
 
     # upload the processed data to S3
@@ -3,14 +3,19 @@ This script is an entry point for an AWS Lambda function to download
 H5 files from S3 and create plots using existing functions.
 """
 
+import io
 import sys
 import os
 import json
+import numpy as np
 import pandas as pd
+from concurrent.futures import as_completed
 from fsoi.web.serverless_tools import hash_request, get_reference_id, create_response_body, \
-    create_error_response_body, RequestDao, ApiGatewaySender
+    create_error_response_body, RequestDao, ApiGatewaySender, SUMMARY_DATA
 from fsoi.stats import lib_obimpact as loi
 from fsoi.stats import lib_utils as lutils
+from fsoi.plots.summary_renderer import render_summary, QUANTITIES
+from fsoi.plots import render_pool
 from fsoi import log
 from fsoi.data.datastore import ThreadedDataStore
 from fsoi.data.s3_datastore import S3DataStore
@@ -69,7 +74,8 @@ def process_request(validated_request):
 
     # download data from S3
     update_all_clients(hash_value, 'RUNNING', 'Accessing data objects', progress)
-    objects = download_s3_objects(validated_request)
+    accumulators = {}
+    objects = download_s3_objects(validated_request, accumulators)
     progress += 5
 
     # analyze downloaded data to determine if there were any centers with no
@@ -85,17 +91,31 @@ def process_request(validated_request):
             warns.append('No data available for %s' % center)
             validated_request['centers'].remove(center)
 
-    # iterate over each of the requested centers and create plots
+    # return the summary metrics for the client to chart, instead of rendering images
+    if validated_request.get('response_format', 'png') == 'json':
+        return process_data_request(validated_request, hash_value, reference_id, objects,
+                                    accumulators)
+
+    # iterate over each of the requested centers and submit the plots, rendered in this process
+    # unless worker processes are enabled with FSOI_RENDER_PROCESSES (none on AWS Lambda)
     key_list = []
     centers = validated_request['centers']
+    with render_pool.RenderPool() as pool:
+        for center in centers:
+            validated_request['centers'] = [center]
+            if not errors:
+                prepare_working_dir(validated_request)
+            if not errors:
+                update_all_clients(hash_value, 'RUNNING', 'Creating plots for %s' % center,
+                                   progress)
+                create_plots(validated_request, center, objects, accumulators.get(center), pool)
+                progress += progress_step
+        render_pool.write(pool.collect())
+        for figname in pool.failures:
+            warns.append('Failed to create plot %s' % os.path.basename(figname))
+
     for center in centers:
         validated_request['centers'] = [center]
-        if not errors:
-            prepare_working_dir(validated_request)
-        if not errors:
-            update_all_clients(hash_value, 'RUNNING', 'Creating plots for %s' % center, progress)
-            create_plots(validated_request, center, objects)
-            progress += progress_step
         if not errors:
             update_all_clients(hash_value, 'RUNNING', 'Storing plots for %s' % center, progress)
             key_list += cache_summary_plots_in_s3(hash_value, validated_request)
@@ -133,6 +153,42 @@ def process_request(validated_request):
     return create_error_response_body(hash_value, errors, warns)
 
 
+def process_data_request(request, hash_value, reference_id, objects, accumulators):
+    """
+    Compute the summary metrics of the requested centers and return them as data, without images
+    :param request: {dict} A validated and sanitized request object
+    :param hash_value: {str} The hash value of the request
+    :param reference_id: {str} The reference ID of the request
+    :param objects: {list} Downloaded objects, @see download_s3_objects
+    :param accumulators: {dict} Time-average accumulators by center, @see download_s3_objects
+    :return: JSON response
+    """
+    update_all_clients(hash_value, 'RUNNING', 'Computing summary statistics', 50)
+    data = {'cycles': [int(c) for c in request['cycles']], 'norm': request['norm'], 'centers': {}}
+    for center in request['centers']:
+        df, df_std = center_summary(request, center, objects, accumulators.get(center))
+        if len(df) > 0:
+            data['centers'][center] = summary_data(df, df_std)
+
+    key_list = []
+    if not data['centers']:
+        errors.append('Failed to compute summary statistics')
+    else:
+        update_all_clients(hash_value, 'RUNNING', 'Storing summary statistics', 90)
+        key_list = cache_summary_data_in_s3(hash_value, data)
+
+    clean_up(request)
+
+    if not errors:
+        update_all_clients(hash_value, 'SUCCESS', 'Done.', 100)
+        return create_response_body(key_list, hash_value, warns, data=data)
+
+    update_all_clients(hash_value, 'FAIL', 'Failed to process request', 90)
+    errors.append('Reference ID: ' + reference_id)
+
+    return create_error_response_body(hash_value, errors, warns)
+
+
 def update_all_clients(req_hash, status_id, message, progress, sync=False):
     """
     Update the DB and send a message to all clients with a new status update
@@ -239,10 +295,13 @@ def clean_up(request):
             print('%s not found when cleaning up' % root_dir)
 
 
-def download_s3_objects(request):
+def download_s3_objects(request, accumulators=None):
     """
     Download all required objects from S3
     :param request: {dict} A validated and sanitized request object
+    :param accumulators: {dict} If given, each file is folded into the time-average of its center
+                         (a TavgAccumulator in this dictionary, by center) as soon as it is
+                         downloaded, and then deleted
     :return: {list} A list of lists, where each item in the main list is an object that was expected
                     to be downloaded.  The sub lists contain [s3_key, center, norm, date, cycle,
                     downloaded_boolean, local_file]
@@ -258,6 +317,7 @@ def download_s3_objects(request):
     datastore = ThreadedDataStore(S3DataStore(), 20)
 
     # download all the objects using multi-threaded class
+    downloads = {}
     for obj in objs:
         # create the source
         key = obj[0]
@@ -268,15 +328,11 @@ def download_s3_objects(request):
         local_file = key[key.rfind('/')+1:]
 
         # start the download
-        datastore.load_to_local_file(source, local_dir + local_file)
-
-    # wait for downloads to finish
-    datastore.join()
+        downloads[datastore.load_to_local_file(source, local_dir + local_file)] = obj
 
-    # check that files were downloaded and prepare a response message
-    s3msgs = []
-    all_data_missing = True
-    for obj in objs:
+    # check that files were downloaded as they finish, and reduce them while others download
+    for future in as_completed(downloads):
+        obj = downloads[future]
         key = obj[0]
 
         # create the local file name
@@ -285,18 +341,36 @@ def download_s3_objects(request):
 
         # check that the file was downloaded
         if not os.path.exists(local_dir + local_file):
-            log.warn('Could not download S3 object: s3://%s/%s/%s' % (bucket, prefix, key))
             obj.append(False)
-            tokens = key.split('.')
-            center = tokens[1]
-            norm = tokens[2]
-            date = tokens[3][0:8]
-            cycle = tokens[3][8:]
-            s3msgs.append('Missing data: %s %s %s %sZ' % (center, date, norm, cycle))
-        else:
+            continue
+
+        obj.append(True)
+        obj.append('%s%s' % (local_dir, local_file))
+        if accumulators is not None:
+            if obj[1] not in accumulators:
+                accumulators[obj[1]] = loi.TavgAccumulator('PLATFORM')
+            accumulators[obj[1]].add(aggregate_by_platform(lutils.readHDF(obj[6], 'df')))
+            os.remove(obj[6])
+
+    # wait for downloads to finish
+    datastore.join()
+
+    # prepare a response message for the files that were not downloaded
+    s3msgs = []
+    all_data_missing = True
+    for obj in objs:
+        if obj[5]:
             all_data_missing = False
-            obj.append(True)
-            obj.append('%s%s' % (local_dir, local_file))
+            continue
+
+        key = obj[0]
+        log.warn('Could not download S3 object: s3://%s/%s/%s' % (bucket, prefix, key))
+        tokens = key.split('.')
+        center = tokens[1]
+        norm = tokens[2]
+        date = tokens[3][0:8]
+        cycle = tokens[3][8:]
+        s3msgs.append('Missing data: %s %s %s %sZ' % (center, date, norm, cycle))
 
     # put the S3 download messages either into errors or warns
     for msg in s3msgs:
@@ -308,7 +382,7 @@ def download_s3_objects(request):
     return objs
 
 
-def create_plots(request, center, objects):
+def create_plots(request, center, objects, accumulator=None, pool=None):
     """
     Run the fsoi_summary.py script on the bulk statistics
     :param request: {dict} A validated and sanitized request object
@@ -316,38 +390,25 @@ def create_plots(request, center, objects):
     :param objects: {list} A list of lists, where each item in the main list is an object that was expected
                     to be downloaded.  The sub lists contain [s3_key, center, norm, date, cycle,
                     downloaded_boolean, local_file]  (as returned from @download_s3_objects)
+    :param accumulator: {TavgAccumulator} Time-average of the center's files, if they were already
+                        folded in by @download_s3_objects
+    :param pool: {RenderPool} Submit the plots to this pool, instead of creating them now; the
+                 caller collects and writes the images
     :return: None
     """
-    # create a list of downloaded files for this center
-    files = []
-    for obj in objects:
-        if obj[1] == center and obj[5]:
-            files.append(obj[6])
-
-    # read all of the files
-    ddf = {}
-    for (i, file) in enumerate(files):
-        ddf[i] = aggregate_by_platform(lutils.readHDF(file, 'df'))
-
-    # concatenate the group bulk data and save to a pickle
-    concatenated = pd.concat(ddf, axis=0)
+    # save the time-average to a pickle for the comparison plots
+    accumulator = fold_center(center, objects, accumulator)
     pickle_dir = '%s/work/%s/%s' % (request['root_dir'], center, request['norm'])
-    pickle_file = '%s/group_stats.pkl' % pickle_dir
+    pickle_file = '%s/group_tavg.pkl' % pickle_dir
     os.makedirs(pickle_dir, exist_ok=True)
     if os.path.exists(pickle_file):
         os.remove(pickle_file)
-    lutils.pickle(pickle_file, concatenated)
-
-    # time-average the data frames
-    df, df_std = loi.tavg(concatenated, 'PLATFORM')
-    df = loi.summarymetrics(df)
+    lutils.pickle(pickle_file, accumulator)
 
-    # filter out the platforms that were not in the request
-    filter_platforms_from_data(df, request['platforms'])
+    df, df_std = center_summary(request, center, objects, accumulator)
 
     # do not continue if all platforms have been removed
     if len(df) == 0:
-        warns.append('Selected platforms are unavailable for %s' % center)
         return
 
     # create the cycle identifier
@@ -358,15 +419,72 @@ def create_plots(request, center, objects):
         cycle_ints.append(int(c))
 
     # create the plots
-    for qty in ['TotImp', 'ImpPerOb', 'FracBenObs', 'FracNeuObs', 'FracImp', 'ObCnt']:
-        try:
-            plot_options = loi.getPlotOpt(qty, cycle=cycle_ints, center=center,
-                                          savefigure=True, platform=loi.Platforms('OnePlatform'), domain='Global')
-            plot_options['figname'] = '%s/plots/summary/%s/%s_%s_%s' % \
-                                      (request['root_dir'], center, center, qty, cycle_id)
-            loi.summaryplot(df, qty=qty, plotOpt=plot_options, std=df_std)
-        except Exception as e:
-            log.error('Failed to generate plots for %s' % qty, e)
+    fignames = {qty: '%s/plots/summary/%s/%s_%s_%s' % (request['root_dir'], center, center, qty,
+                                                       cycle_id) for qty in QUANTITIES}
+    plot_options = {'cycle': cycle_ints, 'center': center,
+                    'platform': loi.Platforms('OnePlatform'), 'domain': 'Global'}
+    if pool is None:
+        render_summary(df, fignames, std=df_std, **plot_options)
+        return
+    for qty, figname in fignames.items():
+        pool.submit_summary(figname, df, qty, std=df_std, **plot_options)
+
+
+def fold_center(center, objects, accumulator=None):
+    """
+    Fold the downloaded files of a center into a time-average, one at a time
+    :param center: {str} Name of the center
+    :param objects: {list} Downloaded objects, @see download_s3_objects
+    :param accumulator: {TavgAccumulator} Time-average of the center's files, if they were already
+                        folded in by @download_s3_objects
+    :return: {TavgAccumulator} Time-average of the center's files
+    """
+    if accumulator is None:
+        accumulator = loi.TavgAccumulator('PLATFORM')
+        for obj in objects:
+            if obj[1] == center and obj[5]:
+                accumulator.add(aggregate_by_platform(lutils.readHDF(obj[6], 'df')))
+    return accumulator
+
+
+def center_summary(request, center, objects, accumulator=None):
+    """
+    Compute the summary metrics of a center's requested platforms
+    :param request: {dict} A validated and sanitized request object
+    :param center: {str} Name of the center
+    :param objects: {list} Downloaded objects, @see download_s3_objects
+    :param accumulator: {TavgAccumulator} Time-average of the center's files, if already folded
+    :return: ({pandas.DataFrame}, {pandas.DataFrame}) Summary metrics (empty if none of the
+             requested platforms are available) and standard deviations, indexed by PLATFORM
+    """
+    df, df_std = fold_center(center, objects, accumulator).result()
+    df = loi.summarymetrics(df)
+
+    # filter out the platforms that were not in the request
+    filter_platforms_from_data(df, request['platforms'])
+    if len(df) == 0:
+        warns.append('Selected platforms are unavailable for %s' % center)
+
+    return df, df_std
+
+
+def summary_data(df, df_std):
+    """
+    Convert the summary metrics of a center into columns of a JSON document
+    :param df: {pandas.DataFrame} Summary metrics indexed by PLATFORM
+    :param df_std: {pandas.DataFrame} Standard deviations indexed by PLATFORM
+    :return: {dict} Platforms, metrics {dict} and standard deviations {dict} of the quantities, as
+             lists in the order of the platforms, with None for missing values
+    """
+    def column(values):
+        return [float(v) if np.isfinite(v) else None for v in values.astype(np.float64)]
+
+    std = df_std.reindex(df.index)
+    return {
+        'platforms': [str(platform) for platform in df.index],
+        'metrics': {qty: column(df[qty].values) for qty in QUANTITIES if qty in df},
+        'std': {qty: column(std[qty].values) for qty in QUANTITIES if qty in std}
+    }
 
 
 def aggregate_by_platform(df):
@@ -479,7 +597,8 @@ def process_fsoi_compare(request):
         ]
 
         print('running compare_fsoi_main: %s' % ' '.join(sys.argv))
-        compare_fsoi_main()
+        for figname in compare_fsoi_main():
+            warns.append('Failed to create plot %s' % os.path.basename(figname))
     except Exception as e:
         log.error('Failed to create comparison plots', e)
         warns.append('Error creating FSOI comparison plots')
@@ -593,6 +712,24 @@ def cache_compare_plots_in_s3(hash_value, request):
     return key_list
 
 
+def cache_summary_data_in_s3(hash_value, data):
+    """
+    Store the summary metrics in S3, for cached responses
+    :param hash_value: {str} The hash value of the request
+    :param data: {dict} Summary metrics, @see process_data_request
+    :return: {list} The object key in the S3 cache bucket, empty if it failed
+    """
+    bucket = os.environ['CACHE_BUCKET']
+    key = hash_value + '/' + SUMMARY_DATA
+
+    stream = io.BytesIO(json.dumps(data, separators=(',', ':')).encode('utf-8'))
+    if not S3DataStore().save_from_stream(stream, {'bucket': bucket, 'key': key}):
+        warns.append('Failed to cache the summary statistics')
+        return []
+
+    return [key]
+
+
 def cache_summary_plots_in_s3(hash_value, request):
     """
     Copy all of the new summary plots to S3
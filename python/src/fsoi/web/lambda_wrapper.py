@@ -7,8 +7,7 @@ import os
 import json
 import boto3
 from fsoi.web.serverless_tools import ApiGatewaySender, RequestDao, get_reference_id, hash_request, \
-    create_response_body
-from fsoi.web.batch_wrapper import handler
+    create_response_body, RESPONSE_FORMATS
 
 
 def handle_request(event, context):
@@ -92,7 +91,9 @@ def process_here(validated_request, hash_value, client_url, ref_id):
     RequestDao.add_request(job)
     ApiGatewaySender.send_message_to_ws_client(client_url, json.dumps(job))
 
-    # call the request handler directly
+    # call the request handler directly; it is imported here because it loads the scientific
+    # libraries (pandas, matplotlib), which the status and cached responses do not need
+    from fsoi.web.batch_wrapper import handler
     handler(validated_request)
 
 
@@ -146,6 +147,9 @@ def validate_request(request):
         if 'cache_id' in request:
             return request
 
+        if request.get('response_format', 'png') not in RESPONSE_FORMATS:
+            raise ValueError('Unknown response format: %s' % request['response_format'])
+
         request['centers'] = request['centers'].split(',')
         cycles = []
         for item in request['cycles'].split(','):
@@ -10,6 +10,12 @@ import urllib.parse
 import requests
 import boto3
 
+# formats of the responses: URLs to images, or the summary data (@see batch_wrapper)
+RESPONSE_FORMATS = ['png', 'json']
+
+# name of the cached summary data
+SUMMARY_DATA = 'summary.json'
+
 
 def hash_request(request):
     """
@@ -58,12 +64,13 @@ def create_error_response_body(req_hash, error_list, warn_list):
     return {'req_hash': req_hash, 'errors': error_list, 'warnings': warn_list}
 
 
-def create_response_body(key_list, hash_value, warns):
+def create_response_body(key_list, hash_value, warns, data=None):
     """
-    Create a response body with URLs to all created images
-    :param key_list: {list} A list of S3 keys to images
+    Create a response body with URLs to all created images, and to the summary data
+    :param key_list: {list} A list of S3 keys to images or to the summary data
     :param hash_value: {str} Hash value of the request
     :param warns: {list} A list of warnings possibly empty
+    :param data: {dict} Summary data to include in the response, for the client to chart
     :return: {str} A JSON string to be used for a response body
     """
     import os
@@ -78,15 +85,21 @@ def create_response_body(key_list, hash_value, warns):
     response['images'] = []
     response['warnings'] = warns
 
+    if data is not None:
+        response['data'] = data
+
     # add each key in the list to the response
     for key in key_list:
+        url = 'http://%s.s3-website-%s.amazonaws.com/%s' % (bucket, region, key)
+        if key.endswith('/' + SUMMARY_DATA):
+            response['data_url'] = url
+            continue
         tokens = key.split('/')[1].split('_')
         center = tokens[0]
         typ = tokens[1]
         if len(tokens) == 4:
             center = tokens[0] + '_' + tokens[1]
             typ = tokens[2]
-        url = 'http://%s.s3-website-%s.amazonaws.com/%s' % (bucket, region, key)
         response['images'].append({'center': center, 'type': typ, 'url': url})
 
     # return the response body as a string
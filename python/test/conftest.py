@@ -0,0 +1,62 @@
+"""
+Shared fixtures of the tests: factories of statistics and observation frames
+"""
+import numpy as np
+import pandas as pd
+import pytest
+from datetime import datetime
+
+
+def _make_frames(ncycles, seed=0):
+    """
+    Create group bulk statistics for a number of cycles, with a few platforms missing in each
+    :param ncycles: {int} Number of cycles
+    :param seed: {int} Random seed
+    :return: {list} One frame per cycle, indexed by DATETIME and PLATFORM
+    """
+    rng = np.random.default_rng(seed)
+    frames = []
+    for date in pd.date_range('2015-01-01', periods=ncycles, freq='6H'):
+        platforms = rng.choice(['Radiosonde', 'Aircraft', 'AMSUA', 'IASI'], 3, replace=False)
+        index = pd.MultiIndex.from_arrays([[date] * 3, platforms], names=['DATETIME', 'PLATFORM'])
+        frames.append(pd.DataFrame({'TotImp': rng.normal(size=3) * 1.e3,
+                                    'ObCnt': rng.integers(1, 100000, 3),
+                                    'ObCntBen': rng.integers(0, 50000, 3),
+                                    'ObCntNeu': rng.integers(0, 10, 3)}, index=index))
+    return frames
+
+
+def _make_frame(platforms, seed):
+    """
+    Create a small raw observation DataFrame
+    :param platforms: {list} Platform of each observation
+    :param seed: {int} Random seed
+    :return: {pandas.DataFrame} Observations with the default schema
+    """
+    import fsoi.stats.lib_obimpact as loi
+
+    rng = np.random.default_rng(seed)
+    n = len(platforms)
+    return loi.columns_to_dataframe(datetime(2015, 1, 1), {
+        'PLATFORM': np.array(platforms, dtype=object), 'OBTYPE': np.array(['u'] * n, dtype=object),
+        'CHANNEL': np.arange(n) * 1000 - 999, 'LONGITUDE': rng.uniform(0., 360., n),
+        'LATITUDE': rng.uniform(-90., 90., n), 'PRESSURE': rng.uniform(10., 1100., n),
+        'IMPACT': rng.normal(0., 1.e-5, n), 'OMF': rng.normal(0., 1., n), 'OBERR': np.ones(n)})
+
+
+@pytest.fixture
+def make_frames():
+    """
+    Factory of group bulk statistics, @see _make_frames
+    :return: {function} make_frames(ncycles, seed=0)
+    """
+    return _make_frames
+
+
+@pytest.fixture
+def make_frame():
+    """
+    Factory of raw observations, @see _make_frame
+    :return: {function} make_frame(platforms, seed)
+    """
+    return _make_frame
@@ -0,0 +1,79 @@
+"""
+Tests for the mergeable partial aggregates of bulk statistics
+"""
+import numpy as np
+import pandas as pd
+
+
+def test_partial_aggregates(tmp_path, make_frames):
+    """
+    Roll cycle partials up into days and months, store them, and compare a date range to tavg
+    :return: None
+    """
+    import fsoi.stats.lib_aggregate as lagg
+    import fsoi.stats.lib_obimpact as loi
+    import fsoi.stats.lib_utils as lutils
+
+    # January and the first ten days of February 2015
+    frames = make_frames(41 * 4)
+    cycles = [lagg.partial(frame, 'GMAO', 'dry') for frame in frames]
+    days = lagg.rollup(lagg.combine(*cycles), lagg.DAY)
+    months = lagg.rollup(days, lagg.MONTH)
+
+    # combine is associative and commutative
+    halves = lagg.combine(lagg.combine(*cycles[1::2]), lagg.combine(*cycles[::2]))
+    pd.testing.assert_frame_equal(lagg.rollup(halves, lagg.MONTH), months)
+
+    # store the January month and the February days
+    backend = lutils.get_backend('hdf5', str(tmp_path))
+    backend.write(months.xs('201501', level='PERIOD', drop_level=False), 'partial', 'GMAO', 'dry',
+                  '201501')
+    for period, df in days.groupby(level='PERIOD'):
+        if period.startswith('201502'):
+            backend.write(df, 'partial', 'GMAO', 'dry', period)
+
+    assert lagg.cover('20150115', '20150302') == \
+        ['201501%02d' % day for day in range(15, 32)] + ['201502', '20150301', '20150302']
+
+    partials = lagg.load(backend, 'GMAO', 'dry', '20150101', '20150228')
+    assert set(partials.index.get_level_values('PERIOD')) == \
+        {'201501'} | {'201502%02d' % day for day in range(1, 11)}
+
+    mean, std = lagg.summarize(partials, cycles=[0, 12])
+    df = pd.concat(frames)
+    df = df[df.index.get_level_values('DATETIME').hour.isin([0, 12])]
+    expected, expected_std = loi.tavg(df, 'PLATFORM')
+    assert np.allclose(mean.loc[('GMAO', 'dry')]['TotImp'], expected['TotImp'])
+    assert np.allclose(std.loc[('GMAO', 'dry')]['TotImp'], expected_std['TotImp'])
+    assert (mean.loc[('GMAO', 'dry')]['ObCnt'] == expected['ObCnt']).all()
+
+
+def test_roll_partials(tmp_path, make_frames):
+    """
+    Roll the day and month partial products after each cycle, and backfill them from cycles
+    :return: None
+    """
+    import fsoi.stats.lib_aggregate as lagg
+    import fsoi.stats.lib_utils as lutils
+    from fsoi.stats.build_cube import backfill
+
+    cycles = [lagg.partial(frame, 'GMAO', 'dry') for frame in make_frames(8)]
+    backend = lutils.get_backend('hdf5', str(tmp_path / 'rolled'), profile='web')
+    for cycle in cycles:
+        date = cycle.index.get_level_values('PERIOD')[0]
+        backend.write(cycle, 'partial', 'GMAO', 'dry', date)
+        lagg.roll(backend, 'GMAO', 'dry', date)
+
+    expected = lagg.rollup(lagg.combine(*cycles), lagg.MONTH)
+    pd.testing.assert_frame_equal(backend.read('partial', 'GMAO', 'dry', '201501'), expected)
+    pd.testing.assert_frame_equal(backend.read('partial', 'GMAO', 'dry', '20150102'),
+                                  lagg.rollup(lagg.combine(*cycles[4:]), lagg.DAY))
+    partials = lagg.load(backend, 'GMAO', 'dry', '20150101', '20150131')
+    assert set(partials.index.get_level_values('PERIOD')) == {'201501'}
+    assert lagg.roll(backend, 'GMAO', 'dry', '2015020100') == []
+
+    # months that are not entirely in the range are not backfilled
+    backend = lutils.get_backend('hdf5', str(tmp_path / 'backfilled'), profile='web')
+    assert len(backfill(backend, lagg.combine(*cycles), '20150101', '20150102')) == 2
+    assert len(backfill(backend, lagg.combine(*cycles))) == 3
+    pd.testing.assert_frame_equal(backend.read('partial', 'GMAO', 'dry', '201501'), expected)
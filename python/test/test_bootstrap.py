@@ -0,0 +1,59 @@
+"""
+Tests for the bootstrap confidence intervals of the summary metrics
+"""
+import numpy as np
+import pandas as pd
+
+
+def test_bootstrap(make_frames):
+    """
+    Check the point estimate, the reproducibility with a seed and the independence of the number
+    of processes
+    :return: None
+    """
+    import fsoi.stats.lib_obimpact as loi
+    import fsoi.stats.lib_aggregate as lagg
+    import fsoi.stats.lib_bootstrap as lbs
+
+    df = pd.concat(make_frames(80))
+    partials = lagg.partial(df, 'GMAO', 'dry')
+
+    # metrics of the sums over all cycles are the summary metrics of the time average (whose mean
+    # observation counts are truncated to integers)
+    platforms, sums = lbs.cycle_sums(partials)
+    metrics = lbs.metrics(sums.sum(axis=0))
+    expected = loi.summarymetrics(loi.tavg(df, level='PLATFORM')[0]).reindex(platforms)
+    for metric in ['TotImp', 'ImpPerOb', 'FracImp']:
+        np.testing.assert_allclose(metrics[metric], expected[metric].values, rtol=1.e-4)
+
+    lower, upper = lbs.bootstrap(partials, replicates=300, block=4, seed=1, processes=1, chunk=50)
+    assert list(lower.columns) == lbs.METRICS and list(lower.index) == list(platforms)
+    assert (lower.values <= upper.values).all()
+    assert ((lower['TotImp'] <= expected['TotImp']) & (expected['TotImp'] <= upper['TotImp'])).all()
+
+    pooled = lbs.bootstrap(partials, replicates=300, block=4, seed=1, processes=2, chunk=50)
+    pd.testing.assert_frame_equal(lower, pooled[0])
+    pd.testing.assert_frame_equal(upper, pooled[1])
+
+
+def test_load_intervals(tmp_path, make_frames):
+    """
+    Bootstrap the intervals from the statistics of the bars, and skip the centers with a streamed
+    time-average even if old statistics of each cycle are left
+    :return: None
+    """
+    import os
+    import fsoi.stats.lib_utils as lutils
+    import fsoi.stats.lib_obimpact as loi
+    from fsoi.plots.compare_fsoi import load_intervals
+
+    df = pd.concat(make_frames(20))
+    for center in ['GMAO', 'NRL']:
+        os.makedirs(str(tmp_path / 'work' / center / 'dry'))
+        lutils.pickle(str(tmp_path / 'work' / center / 'dry' / 'group_stats.pkl'), df)
+    lutils.pickle(str(tmp_path / 'work' / 'NRL' / 'dry' / 'group_tavg.pkl'),
+                  loi.TavgAccumulator('PLATFORM').add(df))
+
+    CI = load_intervals(str(tmp_path), ['GMAO', 'NRL'], 'dry', [0, 6, 12, 18], 50)
+    assert CI[1] is None
+    assert (CI[0][0].values <= CI[0][1].values).all()
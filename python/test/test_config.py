@@ -0,0 +1,23 @@
+"""
+Tests for the configuration registry
+"""
+import pickle
+import pkgutil
+import yaml
+
+
+def test_config(tmp_path):
+    """
+    Check that the resources are parsed once, and that the prebuilt form matches the YAML
+    :return: None
+    """
+    import fsoi.config as fconfig
+
+    expected = yaml.full_load(pkgutil.get_data('fsoi', fconfig.RESOURCES['nrl_ingest']))
+    assert fconfig.get('nrl_ingest') == expected
+    assert fconfig.get('nrl_ingest') is fconfig.get('nrl_ingest')
+
+    with open(fconfig.build(str(tmp_path / 'config.pickle')), 'rb') as f:
+        prebuilt = pickle.load(f)
+    assert set(prebuilt) == set(fconfig.RESOURCES)
+    assert prebuilt['nrl_ingest'][1] == expected
@@ -0,0 +1,33 @@
+"""
+Tests for the cross-center correlations of binned impacts
+"""
+import numpy as np
+import pandas as pd
+
+
+def test_std_corr():
+    """
+    Compare to pandas per-cell statistics, with missing cycles and cells
+    :return: None
+    """
+    import fsoi.stats.lib_correlation as lcorr
+
+    rng = np.random.default_rng(0)
+    index = pd.MultiIndex.from_product(
+        [pd.date_range('2015-01-01', periods=12, freq='6H'), [5., 15., 25.], [-10., 0.]],
+        names=['DATETIME', 'LONGITUDE', 'LATITUDE'])
+    common = rng.normal(size=len(index))
+    frames = {}
+    for center in ['GMAO', 'NRL', 'MET']:
+        df = pd.DataFrame({center: common + rng.normal(size=len(index))}, index=index)
+        frames[center] = df[rng.uniform(size=len(df)) > 0.2]
+
+    std, corr = lcorr.std_corr(frames, ['GMAO', 'NRL', 'MET'])
+
+    joined = pd.concat(frames.values(), axis=1).groupby(level=['LATITUDE', 'LONGITUDE'])
+    expected = joined.std().loc[std.index]
+    np.testing.assert_allclose(std.values, expected.values)
+    for center in ['NRL', 'MET']:
+        expected = joined.apply(lambda g: g['GMAO'].corr(g[center])).loc[corr.index]
+        np.testing.assert_allclose(corr[center].values, expected.values)
+    assert np.allclose(corr['GMAO'], 1.)
@@ -0,0 +1,78 @@
+"""
+Tests for the cube of FSOI statistics
+"""
+import numpy as np
+import pandas as pd
+
+
+def test_cube_query(tmp_path, make_frames):
+    """
+    Add cycles to a cube out of order, save and load it, and compare a request to tavg
+    :return: None
+    """
+    import fsoi.stats.lib_aggregate as lagg
+    import fsoi.stats.lib_obimpact as loi
+    from fsoi.stats.lib_cube import Cube, update
+
+    frames = [lagg.unify(frame) for frame in make_frames(20 * 4)]
+    partials = [lagg.partial(frame, center, 'dry') for frame in frames for center in ['GMAO', 'NRL']]
+
+    # the second half of the cycles first, then the first half to an existing cube
+    path = str(tmp_path / 'cube')
+    Cube().add(lagg.combine(*partials[len(partials) // 2:])).save(path)
+    update(path, lagg.combine(*partials[:len(partials) // 2]))
+    cube = Cube.load(path)
+    assert cube.days() == 20
+
+    request = {'start_date': '20141225', 'end_date': '20150110', 'centers': ['GMAO', 'EMC'],
+               'norm': 'both', 'cycles': ['0', '18']}
+    results = cube.query(request)
+    assert list(results) == ['GMAO']
+
+    df = pd.concat(frames)
+    dates = df.index.get_level_values('DATETIME')
+    df = df[(dates < '2015-01-11') & dates.hour.isin([0, 18])]
+    mean, std = loi.tavg(df, 'PLATFORM')
+    pd.testing.assert_frame_equal(results['GMAO'][0].sort_index(), mean.sort_index(),
+                                  check_dtype=False)
+    assert np.allclose(results['GMAO'][1].sort_index()['TotImp'], std.sort_index()['TotImp'])
+
+    assert len(cube.sums('20150201', '20150228')) == 0
+
+
+def test_cube_update(tmp_path, make_frames):
+    """
+    Replace a re-ingested cycle, swap versions of a saved cube, and load a cube saved as a plain
+    directory
+    :return: None
+    """
+    import os
+    import fsoi.stats.lib_aggregate as lagg
+    from fsoi.stats.lib_cube import Cube, update
+
+    frames = [lagg.unify(frame) for frame in make_frames(3)]
+    partials = [lagg.partial(frame, 'GMAO', 'dry') for frame in frames]
+
+    path = str(tmp_path / 'cube')
+    update(path, partials[0])
+    update(path, partials[1])
+    expected = Cube.load(path).sums('20141201', '20150228').copy()
+    update(path, partials[0])
+    cube = Cube.load(path)
+    pd.testing.assert_frame_equal(cube.sums('20141201', '20150228'), expected)
+    assert cube.ingested == {'GMAO/dry/2015010100', 'GMAO/dry/2015010106'}
+    assert cube.sums('20141201', '20150228')['Count'].max() == 2.
+
+    # the current and previous versions are kept
+    assert os.path.islink(path)
+    assert len([entry for entry in os.listdir(str(tmp_path)) if entry.startswith('cube.v-')]) == 2
+
+    # a cube saved as a directory is replaced by a version
+    legacy = str(tmp_path / 'legacy')
+    os.makedirs(legacy)
+    cube = Cube.load(path, mmap=False)
+    np.save(os.path.join(legacy, 'prefix.npy'), cube.prefix)
+    os.symlink(os.path.join(os.path.realpath(path), 'axes.json'), os.path.join(legacy, 'axes.json'))
+    update(legacy, partials[2])
+    assert os.path.islink(legacy)
+    assert Cube.load(legacy).sums('20141201', '20150228')['Count'].max() == 3.
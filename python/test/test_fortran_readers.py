@@ -0,0 +1,130 @@
+"""
+Tests for the numpy readers of the EMC and JMA Fortran sequential files
+"""
+import numpy as np
+
+
+def write_records(file, fields, values):
+    """
+    Write big-endian sequential records the way gfortran does (blank-padded strings)
+    :param file: {file} Open binary file
+    :param fields: {list} Record fields, @see fsoi.ingest.fortran_io.record_dtype
+    :param values: {dict} Values for each field (one item per record)
+    :return: None
+    """
+    from fsoi.ingest.fortran_io import record_dtype
+
+    dtype = record_dtype(fields, 'big')
+    n = len(next(iter(values.values())))
+    records = np.zeros(n, dtype=dtype)
+    records['head'] = dtype.itemsize - 8
+    records['tail'] = dtype.itemsize - 8
+    for name, value in values.items():
+        if dtype[name].kind == 'S':
+            value = [v.ljust(dtype[name].itemsize) for v in value]
+        records[name] = value
+    file.write(records.tobytes())
+
+
+def test_read_emc(tmp_path):
+    """
+    Write a small EMC file and check the values decoded by read_emc
+    :return: None
+    """
+    from fsoi.ingest.emc import read_emc
+
+    fname = str(tmp_path / 'emc.bin')
+    nens, npred = 2, 1
+    with open(fname, 'wb') as file:
+        write_records(file, read_emc.HEADER,
+                      {'idate': [2019010100], 'obsnum': [3], 'convnum': [1], 'oznum': [1],
+                       'satnum': [1], 'npred': [npred], 'nanals': [nens]})
+        write_records(file, read_emc.DATA + [('tmpanal', 'f4', (nens,))],
+                      {'stattype': [120, 706], 'obtype': [b'  t', b'oz'], 'lat': [10., 20.],
+                       'lon': [-10., 200.], 'pres': [500., 10.], 'osense_dry': [-1., 2.],
+                       'osense_moist': [-3., 4.], 'osense_kin': [-5., 6.]})
+        write_records(file, read_emc.DATA + [('tmpanal', 'f4', (nens,)),
+                                             ('tmppred', 'f4', (npred + 1,))],
+                      {'stattype': [0], 'obtype': [b'amsua_n15'], 'indxsat': [7], 'lat': [30.]})
+
+    header = read_emc.get_header(fname)
+    assert header == (2019010100, 1, 1, 1, npred, nens)
+
+    obtype, platform, channel, lat, lon, lev, omb, oberr, impact = \
+        read_emc.get_data(fname, 3, npred, nens)
+    assert list(obtype) == ['t', 'oz', 'Tb']
+    assert list(platform) == ['120', '706', 'amsua_n15']
+    assert list(channel) == [-999, -999, 7]
+    assert np.allclose(lat, [10., 20., 30.])
+    assert np.allclose(lon[:2], [-10., 200.])
+    assert np.allclose(impact[:2], [[-1., -3., -5.], [2., 4., 6.]])
+
+
+def test_read_jma(tmp_path):
+    """
+    Write a small ADJOINT JMA file and check the values decoded by read_jma
+    :return: None
+    """
+    from fsoi.ingest.jma import read_jma
+
+    fname = str(tmp_path / 'jma.bin')
+    with open(fname, 'wb') as file:
+        write_records(file, read_jma.HEADER,
+                      {'formulation': [b'ADJOINT'], 'idate': [[2019, 1, 1, 0, 0]],
+                       'nobstot': [4]})
+        write_records(file, read_jma.DATA,
+                      {'elem': [b'N/A', b'U', b'BendAng', b'T'],
+                       'channel': [5, 0, 0, 0],
+                       'otype': [b'AMV-GEOSTAT', b'RADIOSONDE', b'GNSSRO', b'AIRCRAFT'],
+                       'satname': [b'Himawari-8', b'N/A', b'Metop-A', b'N/A'],
+                       'rlev': [100., 50000., 12000., np.finfo(np.float32).max],
+                       'fso_dry': [1., 2., 3., 4.]})
+
+    formulation, idate, nobstot, nmetric = read_jma.get_header(fname)
+    assert (formulation, nobstot, nmetric) == ('ADJOINT', 4, 1)
+    assert list(idate) == [2019, 1, 1, 0, 0]
+
+    obtype, platform, channel, lat, lon, lev, omb, oberr, impact = \
+        read_jma.get_data(fname, nobstot, nmetric)
+    assert list(obtype) == ['Tb', 'U', 'BendAng', 'T']
+    assert list(platform) == ['AMV-GEOSTAT_Himawari', 'RADIOSONDE', 'GNSSRO', 'AIRCRAFT']
+    assert list(channel) == [5, -999, -999, -999]
+    assert np.allclose(lev, [-999., 500., 12., -999.])
+    assert impact.shape == (4, 1)
+    assert np.allclose(impact[:, 0], [1., 2., 3., 4.])
+
+
+def test_read_formatted():
+    """
+    Decode the NRL sample lines and some Fortran edge cases with read_formatted, and compare the
+    values with FortranRecordReader
+    :return: None
+    """
+    import os
+    import yaml
+    from fortranformat import FortranRecordReader
+    from fsoi.ingest.fortran_io import read_formatted
+
+    resources = os.path.join(os.path.dirname(__file__), '..', 'test_resources')
+    data = yaml.full_load(open(os.path.join(resources, 'nrl_sample_input_data.yaml')))
+    nrl_format = 'i7,f9.3,1x,f8.2,1x,f8.2,1x,f8.2,f9.3,1x,f9.2,1x,f9.2,1x,f9.2,1x,f11.5,1x,i2,' \
+                 '1x,i3,4x,i2,4x,i1,3x,i5,2x,a16,a12,4x,i1,2x,i1,3x,i1,1x,e13.6,1x,e13.6,1x,' \
+                 'e13.6,1x,e13.6'
+
+    # blank fields, implied decimals, D and missing exponent letters, and a short record
+    edge_format = 'i4,1x,f6.2,1x,e12.4,1x,a5'
+    edge_lines = ['   1  12.50   0.1234E+02 abc  ', '  -2    125   0.1234D-02 x',
+                  '           -0.1234-100 ', '    ', '   3 -00.01  -1.2345E+25 a   b']
+
+    for fmt, lines in [(nrl_format, data['lines']), (edge_format, edge_lines)]:
+        # pylint: disable=E1102
+        reader = FortranRecordReader(fmt)
+        expected = list(zip(*[reader.read(line) for line in lines]))
+        columns = read_formatted([line.encode() for line in lines], fmt)
+
+        assert len(columns) == len(expected)
+        for column, values in zip(columns, expected):
+            if column.dtype.kind == 'S':
+                assert [c.decode() for c in column] == [v or '' for v in values]
+            else:
+                assert np.array_equal(column, [v or 0 for v in values])
@@ -0,0 +1,66 @@
+"""
+Tests for the compact HDF storage schema
+"""
+import numpy as np
+
+
+def test_compact_round_trip(tmp_path, make_frame):
+    """
+    Append compact chunks with new platforms and read them back with the default schema
+    :return: None
+    """
+    import pandas as pd
+    import fsoi.stats.lib_utils as lutils
+
+    fname = str(tmp_path / 'compact.h5')
+    chunks = [make_frame(['Radiosonde', 'Aircraft', 'Radiosonde'], 0),
+              make_frame(['AMSUA_N15', 'Aircraft'], 1)]
+    for chunk in chunks:
+        lutils.writeHDF(fname, 'df', chunk, compact=True)
+    expected = pd.concat(chunks)
+
+    df = lutils.readHDF(fname, 'df')
+    assert df.index.equals(expected.index)
+    assert (df.dtypes == expected.dtypes).all()
+    assert np.array_equal(df['IMPACT'].values, expected['IMPACT'].values)
+    assert np.allclose(df['LATITUDE'].values, expected['LATITUDE'].values, rtol=1.e-6)
+
+    df = lutils.readHDF(fname, 'df', where=['PLATFORM="Aircraft"'])
+    assert len(df) == 2
+    assert set(df.index.get_level_values('PLATFORM')) == {'Aircraft'}
+    assert len(lutils.readHDF(fname, 'df', where='PLATFORM="GPSRO"')) == 0
+
+    # membership conditions, e.g. the 'in' filters of the storage backends
+    df = lutils.readHDF(fname, 'df', where=lutils._filter_to_where('PLATFORM', 'in',
+                                                                   ['Radiosonde', 'GPSRO']))
+    assert len(df) == 2
+    assert set(df.index.get_level_values('PLATFORM')) == {'Radiosonde'}
+    df = lutils.readHDF(fname, 'df', where=['PLATFORM in ["Aircraft", "AMSUA_N15"]'])
+    assert len(df) == 3
+    assert len(lutils.readHDF(fname, 'df', where='PLATFORM=["GPSRO"]')) == 0
+
+    assert lutils.readHDF(fname, 'df', upcast=False)['OMF'].dtype == np.float32
+
+
+def test_storage_profiles(tmp_path, make_frame):
+    """
+    Write with each storage profile and read back the same data
+    :return: None
+    """
+    import pytest
+    import pandas as pd
+    import fsoi.stats.lib_utils as lutils
+
+    df = make_frame(['Radiosonde', 'Aircraft', 'AMSUA_N15'], 0)
+    for profile in lutils.STORAGE_PROFILES:
+        fname = str(tmp_path / ('%s.h5' % profile))
+        lutils.writeHDF(fname, 'df', df, profile=profile)
+        pd.testing.assert_frame_equal(lutils.readHDF(fname, 'df'), df)
+
+    # the web profile replaces the data instead of appending, and stays queryable
+    lutils.writeHDF(fname, 'df', df, profile='web')
+    assert len(lutils.readHDF(fname, 'df')) == len(df)
+    assert len(lutils.readHDF(fname, 'df', where='PLATFORM="Aircraft"', columns=['IMPACT'])) == 1
+
+    with pytest.raises(ValueError):
+        lutils.writeHDF(fname, 'df', df, profile='fastest')
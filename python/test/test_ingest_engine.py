@@ -0,0 +1,97 @@
+"""
+Tests for the common ingest engine
+"""
+import numpy as np
+import pandas as pd
+from fsoi.ingest.engine import Decoder, register, ingest
+
+
+@register('TEST')
+class ChunkDecoder(Decoder):
+    """
+    Decode text files with one platform name per line, in chunks of two observations
+    """
+    pattern = 'test_%(date)s_*.txt'
+
+    def decode(self, source, date, norm):
+        with open(source) as f:
+            platforms = f.read().split()
+        for i in range(0, len(platforms), 2):
+            chunk = platforms[i:i + 2]
+            n = len(chunk)
+            yield {'PLATFORM': np.array(chunk, dtype=object), 'OBTYPE': np.full(n, 'u', dtype=object),
+                   'CHANNEL': np.full(n, -999), 'LONGITUDE': np.full(n, 10.),
+                   'LATITUDE': np.full(n, 20.), 'PRESSURE': np.full(n, 500.),
+                   'IMPACT': np.array([-1., 2., -3.][:n]), 'OMF': np.ones(n), 'OBERR': np.ones(n)}
+
+
+def test_ingest(tmp_path):
+    """
+    Ingest two sources and check the products
+    :return: None
+    """
+    (tmp_path / 'test_2015010100_a.txt').write_text('Radiosonde\nAircraft\nRadiosonde\n')
+    (tmp_path / 'test_2015010100_b.txt').write_text('Aircraft\n')
+    outdir = tmp_path / 'out'
+
+    files = ingest('TEST', '2015010100', indir=str(tmp_path), outdir=str(outdir), processes=1,
+                   cube=str(tmp_path / 'cube'), partials=str(tmp_path / 'partials'))
+    assert [f.split('/')[-1] for f in files] == [
+        'TEST.dry.2015010100.h5', 'bulk.TEST.dry.2015010100.h5',
+        'accumbulk.TEST.dry.2015010100.h5', 'groupbulk.TEST.dry.2015010100.h5',
+        'partial.TEST.dry.2015010100.h5']
+
+    df = pd.read_hdf(files[0], 'df')
+    assert len(df) == 4
+    assert list(df.index.get_level_values('PLATFORM')) == ['Radiosonde', 'Aircraft', 'Radiosonde',
+                                                          'Aircraft']
+
+    bulk = pd.read_hdf(files[1], 'df')
+    assert bulk['ObCnt'].sum() == 4
+    assert bulk['ObCntBen'].sum() == 3
+    assert np.isclose(bulk['TotImp'].sum(), -1.)
+
+    from fsoi.stats.lib_cube import Cube
+    sums = Cube.load(str(tmp_path / 'cube')).sums('20150101', '20150101')
+    assert sums['ObCnt'].sum() == 4
+    assert np.isclose(sums['TotImp'].sum(), -1.)
+
+    # the cycle partial is rolled up into its day and month
+    for period in ['2015010100', '20150101', '201501']:
+        assert (tmp_path / 'partials' / 'TEST' / ('partial.TEST.dry.%s.h5' % period)).is_file()
+
+
+def test_read_products(tmp_path):
+    """
+    Read the products of an ingest through the storage backend, with filters and columns
+    :return: None
+    """
+    import fsoi.stats.lib_utils as lutils
+
+    (tmp_path / 'test_2015010100_a.txt').write_text('Radiosonde\nAircraft\nRadiosonde\n')
+    for _ in range(2):
+        # products are replaced, not appended to, when a cycle is ingested again
+        ingest('TEST', '2015010100', indir=str(tmp_path), outdir=str(tmp_path / 'out' / 'TEST'),
+               processes=1)
+
+    backend = lutils.get_backend('hdf5', str(tmp_path / 'out'))
+    bulk = backend.read('bulk', 'TEST', 'dry', '2015010100')
+    assert bulk['ObCnt'].sum() == 3
+
+    df = backend.read('groupbulk', 'TEST', 'dry', '2015010100', columns=['TotImp'],
+                      filters=[('PLATFORM', '=', 'Radiosonde')])
+    assert list(df.columns) == ['TotImp']
+    assert set(df.index.get_level_values('PLATFORM')) == {'Radiosonde'}
+    assert np.isclose(df['TotImp'].sum(), -2.)
+
+    df = backend.read('bulk', 'TEST', 'dry', '2015010100',
+                      filters=[('PLATFORM', 'in', ['Aircraft'])])
+    assert df['ObCnt'].sum() == 1
+
+
+def test_ingest_no_sources(tmp_path):
+    """
+    Check that a cycle without raw data is reported as a failure
+    :return: None
+    """
+    assert ingest('TEST', '2015010106', indir=str(tmp_path), outdir=str(tmp_path)) is None
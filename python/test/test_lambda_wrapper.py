@@ -0,0 +1,19 @@
+"""
+Test the imports of the lambda_wrapper entry point
+"""
+import os
+import sys
+import subprocess
+
+
+def test_lazy_imports():
+    """
+    Check that the status and cached-response paths do not load the scientific libraries
+    :return: None
+    """
+    code = 'import sys, fsoi.web.lambda_wrapper; ' \
+           'print(",".join(m for m in ["pandas", "matplotlib"] if m in sys.modules))'
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(sys.path)
+    output = subprocess.check_output([sys.executable, '-c', code], env=env, universal_newlines=True)
+    assert output.strip() == ''
@@ -0,0 +1,29 @@
+"""
+Tests for the unique-key lookup used to map observation keys to platforms
+"""
+import numpy as np
+
+
+def test_map_unique():
+    """
+    Check that map_unique gives the same result as calling the function on every row
+    :return: None
+    """
+    from fsoi.ingest.lookup import map_unique
+
+    calls = []
+
+    def function(instyp, schar):
+        calls.append((instyp, schar))
+        return '%s_%d' % (schar, instyp), instyp * 10
+
+    instyp = np.array([1, 2, 1, 1, 3, 2])
+    schar = np.array(['a', 'b', 'a', 'c', 'a', 'b'])
+    platform, channel = map_unique(function, instyp, schar, nresults=2)
+
+    expected = [function(i, s) for i, s in zip(instyp.tolist(), schar.tolist())]
+    assert list(platform) == [p for p, _ in expected]
+    assert list(channel) == [c for _, c in expected]
+    assert len(calls) == 4 + len(expected)
+
+    assert map_unique(str, np.array([], dtype=int)).size == 0
@@ -0,0 +1,100 @@
+"""
+Tests for the gridding of binned values on maps
+"""
+import numpy as np
+
+
+def test_grid_values():
+    """
+    Check the cell edges, the mean of repeated bins, the masking of empty cells and explicit boxes
+    :return: None
+    """
+    import fsoi.stats.lib_mapping as lmapping
+
+    lons = np.array([0., 5., 5., 15., 355.])
+    lats = np.array([-90., -85., -85., 0., 85.])
+    values = np.array([1., 2., 4., -1., 3.])
+
+    lon_edges, lat_edges, grid = lmapping.gridValues(lons, lats, values)
+    assert grid.shape == (36, 72)
+    np.testing.assert_array_equal(lon_edges, np.arange(0., 365., 5.))
+    np.testing.assert_array_equal(lat_edges, np.arange(-90., 95., 5.))
+    assert grid[0, 0] == 1. and grid[1, 1] == 3. and grid[18, 3] == -1. and grid[35, 71] == 3.
+    assert grid.count() == 4
+
+    # boxes larger than the bins, with the top edge clipped at the pole
+    lon_edges, lat_edges, grid = lmapping.gridValues(lons, lats, values, dlat=7., dlon=10.)
+    assert grid.shape == (26, 36)
+    assert lat_edges[-1] == 90. and lon_edges[-1] == 360.
+    np.testing.assert_allclose(grid[0, 0], 7. / 3.)
+    assert grid[12, 1] == -1. and grid[25, 35] == 3. and grid.count() == 3
+
+
+class StubMap(object):
+    """
+    Picklable stand-in for a Basemap: projects lon/lat by scaling them
+    """
+
+    def __init__(self, lock=None):
+        self.lock = lock
+
+    def __call__(self, lons, lats):
+        return lons * 2., lats * 3.
+
+    def pcolormesh(self, x, y, grid, **kwargs):
+        return x, y, grid, kwargs
+
+
+def test_get_map(tmp_path, monkeypatch):
+    """
+    Check the memory and opt-in disk caches of the maps with a stub map, and the drawing of a grid
+    :return: None
+    """
+    import os
+    import sys
+    import types
+    import threading
+    import fsoi.stats.lib_mapping as lmapping
+
+    monkeypatch.setitem(sys.modules, 'mpl_toolkits.basemap',
+                        types.SimpleNamespace(__version__='stub'))
+    monkeypatch.delenv('FSOI_MAP_CACHE', raising=False)
+    monkeypatch.setattr(lmapping, '_maps', lmapping._OrderedDict())
+    created = []
+
+    def create(proj, **kwargs):
+        created.append(proj)
+        return StubMap(**kwargs)
+
+    monkeypatch.setattr(lmapping, 'createMap', create)
+    proj = lmapping.Projection('mill', resolution='c', llcrnrlat=-80., urcrnrlat=80.)
+
+    # memory only by default
+    bmap = lmapping.getMap(proj)
+    assert lmapping.getMap(proj) is bmap and len(created) == 1
+    assert not os.path.exists(str(tmp_path / 'maps'))
+
+    # the disk cache is shared by processes (an empty memory cache)
+    cache_dir = str(tmp_path / 'maps')
+    monkeypatch.setenv('FSOI_MAP_CACHE', cache_dir)
+    lmapping._maps.clear()
+    lmapping.getMap(proj)
+    assert os.stat(cache_dir).st_mode & 0o777 == 0o700
+    lmapping._maps.clear()
+    assert isinstance(lmapping.getMap(proj), StubMap) and len(created) == 2
+
+    # unpicklable maps are not cached and leave no temporary file
+    lmapping._maps.clear()
+    lmapping.getMap(proj, lock=threading.Lock())
+    assert len(os.listdir(cache_dir)) == 1
+
+    # a directory writable by others is not used
+    os.chmod(cache_dir, 0o777)
+    lmapping._maps.clear()
+    lmapping.getMap(proj)
+    assert len(created) == 4
+
+    x, y, grid, kwargs = lmapping.drawGrid(bmap, proj, [0., 5.], [-90., -85.], [1., 2.], vmin=0.)
+    np.testing.assert_array_equal(x[0], [0., 10., 20.])
+    np.testing.assert_array_equal(y[:, 0], [-270., -255., -240.])
+    assert grid[1, 1] == 2. and grid.count() == 2 and kwargs == {'vmin': 0.}
@@ -0,0 +1,68 @@
+"""
+Tests for parsing Meteo France tarballs member by member
+"""
+import io
+import tarfile
+from datetime import datetime
+
+
+HEADER = ("date@hdr time@hdr seqno@hdr obstype@hdr codetype@hdr statid@hdr lat@hdr lon@hdr "
+          "varno@body vertco_reference_1@body fg_depar@body an_depar@body fc_sens_obs@body "
+          "fg_error@errstat obs_error@errstat\n")
+ROWS = ("20150101 0 1 5 35 '07110' 0.5 -0.5 2 85000 0.3 0.1 -12.0 1.0 1.2\n"
+        "20150101 0 2 5 141 'AF123' -0.2 1.0 3 25000 -1.1 0.4 3.5 2.0 2.1\n")
+
+
+def make_tarball(fname):
+    """
+    Write a small ODB tarball with a conventional, an empty and an unprocessed member
+    :param fname: {str} Full path to the tarball
+    :return: None
+    """
+    members = [('fic_odb.temp.bg.lst', HEADER + ROWS), ('fic_odb.aircraft.bg.lst', ''),
+               ('fic_odb.unknown.bg.lst', HEADER + ROWS), ('README', 'not an ODB file')]
+    with tarfile.open(fname, 'w:gz') as tf:
+        for name, text in members:
+            data = text.encode()
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tf.addfile(info, io.BytesIO(data))
+
+
+def test_map_members(tmp_path):
+    """
+    Check that streamed members are parsed like the extracted files
+    :return: None
+    """
+    from fsoi.ingest.meteofr.stream_MeteoFr import map_members
+    from fsoi.ingest.meteofr.process_MeteoFr import parse_member, parse_file
+
+    fname = str(tmp_path / 'fic_odb.all_obs.bg.tar.gz')
+    make_tarball(fname)
+    adate = datetime(2015, 1, 1)
+
+    for processes in [1, 2]:
+        results = list(map_members(parse_member, fname, 'fic_odb.*.bg.lst', args=(adate,),
+                                   processes=processes))
+        assert [name for name, _ in results] == ['fic_odb.temp.bg.lst', 'fic_odb.unknown.bg.lst']
+        assert results[1][1] is None
+
+        path = tmp_path / 'fic_odb.temp.bg.lst'
+        path.write_text(HEADER + ROWS)
+        expected = parse_file(adate, str(path))
+        assert results[0][1].equals(expected)
+        assert list(expected.index.get_level_values('PLATFORM')) == ['Radiosonde', 'AIREP']
+
+
+def test_map_ids():
+    """
+    Check the id to name lookup, including ids that are not in the table
+    :return: None
+    """
+    import pandas as pd
+    from fsoi.ingest.meteofr.process_MeteoFr import map_ids
+
+    names = map_ids(pd.Series([35, 141, 35, 999, 36]), [35, 36, 141], ['Radiosonde', 'Radiosonde',
+                                                                        'AIREP'])
+    assert list(names) == ['Radiosonde', 'AIREP', 'Radiosonde', '999', 'Radiosonde']
+    assert sorted(names.categories) == ['999', 'AIREP', 'Radiosonde']
@@ -0,0 +1,77 @@
+"""
+Tests for the parallel rendering of the summary and comparison figures
+"""
+import numpy as np
+import pandas as pd
+
+
+def test_render_pool(tmp_path):
+    """
+    Render summary figures of two centers and a comparison figure, in this process and on workers
+    :return: None
+    """
+    import fsoi.stats.lib_obimpact as loi
+    import fsoi.plots.render_pool as rpool
+
+    rng = np.random.default_rng(0)
+    frames = {}
+    for center in ['GMAO', 'NRL']:
+        obcnt = rng.integers(100, 2000000, 6)
+        frames[center] = loi.summarymetrics(pd.DataFrame(
+            {'TotImp': rng.normal(size=6), 'ObCnt': obcnt, 'ObCntBen': obcnt // 2,
+             'ObCntNeu': obcnt // 10},
+            index=pd.Index(['PLATFORM_%d' % i for i in range(6)], name='PLATFORM')))
+    compare = pd.concat({center: df['ImpPerOb'] for center, df in frames.items()}, axis=1)
+    plot_options = loi.getPlotOpt('ImpPerOb', savefigure=True, center=None, cycle=[0])
+
+    for processes in [1, 2]:
+        with rpool.RenderPool(processes) as pool:
+            for center, df in frames.items():
+                for qty in ['TotImp', 'FracImp']:
+                    pool.submit_summary(str(tmp_path / ('%s_%s' % (center, qty))), df, qty,
+                                        cycle=[0], center=center, platform='', domain='Global')
+            pool.submit_compare(str(tmp_path / 'ImpPerOb'), compare,
+                                loi.getcomparesummarypalette(list(frames)), 'ImpPerOb',
+                                plot_options)
+            # a quantity that is not in the frame fails alone
+            pool.submit_summary(str(tmp_path / 'GMAO_Missing'), frames['GMAO'], 'Missing',
+                                cycle=[0], center='GMAO')
+            images = pool.collect()
+            assert list(pool.failures) == [str(tmp_path / 'GMAO_Missing')]
+
+        assert sorted(images) == sorted(str(tmp_path / name) for name in [
+            'GMAO_TotImp', 'GMAO_FracImp', 'NRL_TotImp', 'NRL_FracImp', 'ImpPerOb'])
+        assert all(image.startswith(b'\x89PNG\r\n\x1a\n') for image in images.values())
+
+    files = rpool.write(images)
+    assert (tmp_path / 'ImpPerOb.png').read_bytes() == images[str(tmp_path / 'ImpPerOb')]
+    assert len(files) == 5
+
+
+def test_render_pool_fallback(tmp_path, monkeypatch):
+    """
+    Render in this process by default, and when the worker processes cannot start
+    :return: None
+    """
+    import fsoi.stats.lib_obimpact as loi
+    import fsoi.plots.render_pool as rpool
+
+    def no_processes(*args, **kwargs):
+        raise OSError('No /dev/shm')
+
+    monkeypatch.delenv(rpool.PROCESSES_VARIABLE, raising=False)
+    assert rpool.RenderPool().processes == 1
+    monkeypatch.setenv(rpool.PROCESSES_VARIABLE, '0')
+    assert rpool.RenderPool().processes is None
+
+    monkeypatch.setattr(rpool, 'ProcessPoolExecutor', no_processes)
+    obcnt = np.array([100, 2000, 30000])
+    df = loi.summarymetrics(pd.DataFrame(
+        {'TotImp': [-1., 2., -3.], 'ObCnt': obcnt, 'ObCntBen': obcnt // 2,
+         'ObCntNeu': obcnt // 10},
+        index=pd.Index(['PLATFORM_%d' % i for i in range(3)], name='PLATFORM')))
+    with rpool.RenderPool(2) as pool:
+        pool.submit_summary(str(tmp_path / 'TotImp'), df, 'TotImp', cycle=[0], center='GMAO')
+        assert pool.processes == 1
+        images = pool.collect()
+    assert list(images) == [str(tmp_path / 'TotImp')] and not pool.failures
@@ -0,0 +1,47 @@
+"""
+Tests for the index-based selection of binned statistics
+"""
+import numpy as np
+import pandas as pd
+
+
+def make_binned(seed=0):
+    """
+    Create a shuffled frame of binned statistics
+    :param seed: {int} Random seed
+    :return: {pandas.DataFrame} TotImp indexed by DATETIME, PLATFORM, OBTYPE, CHANNEL, LATITUDE,
+             LONGITUDE and PRESSURE
+    """
+    rng = np.random.default_rng(seed)
+    index = pd.MultiIndex.from_product(
+        [pd.date_range('2015-01-01', periods=8, freq='6H'), ['AMSUA', 'Radiosonde'], ['u', 't'],
+         [-999, 5], np.arange(-85., 90., 10.), np.arange(5., 360., 30.), [250., 500., 850.]],
+        names=['DATETIME', 'PLATFORM', 'OBTYPE', 'CHANNEL', 'LATITUDE', 'LONGITUDE', 'PRESSURE'])
+    df = pd.DataFrame({'TotImp': rng.normal(size=len(index))}, index=index)
+    return df.iloc[rng.permutation(len(df))]
+
+
+def test_select():
+    """
+    Compare the selection to boolean masks of the level values
+    :return: None
+    """
+    import fsoi.stats.lib_obimpact as loi
+
+    df = make_binned()
+    values = {name: df.index.get_level_values(name) for name in df.index.names}
+
+    selected = loi.select(df, cycles=[0, 18], platforms=['AMSUA'], channels=[5],
+                          latitudes=[30., -30.], pressures=[500., 1000.])
+    mask = values['DATETIME'].hour.isin([0, 18]) & (values['PLATFORM'] == 'AMSUA') & \
+        (values['CHANNEL'] == 5) & (values['LATITUDE'] >= -30.) & (values['LATITUDE'] <= 30.) & \
+        (values['PRESSURE'] >= 500.)
+    pd.testing.assert_frame_equal(selected, df[mask].sort_index())
+
+    selector = loi.IndexSelector(df)
+    dates = [pd.Timestamp('2015-01-01 06:00'), pd.Timestamp('2015-01-02 12:00')]
+    pd.testing.assert_frame_equal(selector.select(dates=dates, longitudes=[0., 100.]),
+                                  df[values['DATETIME'].isin(dates) &
+                                     (values['LONGITUDE'] <= 100.)].sort_index())
+    assert len(selector.select(cycles=[3])) == 0
+    assert len(selector.select()) == len(df)
@@ -0,0 +1,75 @@
+"""
+Tests for the spatial index of the raw observation files and regional queries
+"""
+import numpy as np
+import pandas as pd
+
+
+def brute_force(df, lat_min, lat_max, lon_min, lon_max):
+    """
+    Select the observations of a box by scanning all of them
+    """
+    lats, lons = df['LATITUDE'].values, df['LONGITUDE'].values
+    inside = (lats >= lat_min) & (lats <= lat_max)
+    if lon_min <= lon_max:
+        return df[inside & (lons >= lon_min) & (lons <= lon_max)]
+    return df[inside & ((lons >= lon_min) | (lons <= lon_max))]
+
+
+def test_cells():
+    """
+    Check the cell ids, the cells of regions and the merging of cell ranges
+    :return: None
+    """
+    import fsoi.stats.lib_spatial as lspatial
+
+    cells = lspatial.cell_ids([0., 359.5, -0.5, 10.2], [-90., 90., 0., 20.7])
+    assert cells.tolist() == [0, 179 * 360 + 359, 90 * 360 + 359, 110 * 360 + 10]
+
+    # a latitude band is one range of cells, a box one range per row
+    assert lspatial.cell_ranges(lspatial.region_cells('Tropics')) == [(70 * 360, 111 * 360 - 1)]
+    cells = lspatial.region_cells([10., 12., 350., 5.])
+    assert len(cells) == 3 * 16
+    assert lspatial.cell_ranges(cells, max_ranges=100) == \
+        [(100 * 360, 100 * 360 + 5), (100 * 360 + 350, 101 * 360 + 5),
+         (101 * 360 + 350, 102 * 360 + 5), (102 * 360 + 350, 102 * 360 + 359)]
+    ranges = lspatial.cell_ranges(cells, max_ranges=2)
+    assert len(ranges) == 2 and ranges[0][0] == cells[0] and ranges[-1][1] == cells[-1]
+    assert all(np.any((cells >= first) & (cells <= last)) for first, last in ranges)
+
+
+def test_read_region(tmp_path, make_frame):
+    """
+    Read regions of indexed and unindexed raw files and compare them with a full scan
+    :return: None
+    """
+    import fsoi.stats.lib_utils as lutils
+    import fsoi.stats.lib_spatial as lspatial
+
+    df = pd.concat([make_frame(['Radiosonde', 'Aircraft'] * 500, seed) for seed in range(3)])
+    indexed, plain = str(tmp_path / 'indexed.h5'), str(tmp_path / 'plain.h5')
+    lutils.writeHDF(indexed, 'df', lspatial.add_cells(df.copy()), data_columns=['CELL'],
+                    min_itemsize={'PLATFORM': 64, 'OBTYPE': 16})
+    lutils.writeHDF(plain, 'df', df, min_itemsize={'PLATFORM': 64, 'OBTYPE': 16})
+
+    for region, box in [('Tropics', [-20., 20., 0., 360.]),
+                        ([30.5, 47.2, 350., 20.], [30.5, 47.2, 350., 20.]),
+                        ([-60., -30., -100., -60.], [-60., -30., 260., 300.])]:
+        expected = brute_force(df, *box)
+        for fname in [indexed, plain]:
+            # indexed files are sorted by cell
+            selected = lspatial.read_region(fname, region, columns=['IMPACT'])
+            assert list(selected.columns) == ['IMPACT'] and len(selected) == len(expected)
+            np.testing.assert_array_equal(np.sort(selected['IMPACT'].values),
+                                          np.sort(expected['IMPACT'].values))
+
+    backend = lutils.get_backend('parquet', str(tmp_path / 'parquet'), row_group_size=100)
+    backend.write(lutils.readHDF(indexed, 'df'), 'raw', 'GMAO', 'dry', '2015010100')
+    selected = lspatial.read_product_region(backend, 'Tropics', 'GMAO', 'dry', '2015010100',
+                                            columns=['IMPACT'])
+    expected = brute_force(df, -20., 20., 0., 360.)
+    np.testing.assert_allclose(np.sort(selected['IMPACT'].values),
+                               np.sort(expected['IMPACT'].values))
+
+    bulk = lspatial.region_bulk([indexed, plain], 'Tropics')
+    assert bulk['ObCnt'].sum() == 2 * len(expected)
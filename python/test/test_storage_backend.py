@@ -0,0 +1,70 @@
+"""
+Tests for the storage backends and the conversion of the HDF5 tree
+"""
+import pytest
+import pandas as pd
+
+
+def test_convert_to_parquet(tmp_path, make_frame):
+    """
+    Convert a small HDF5 tree to Parquet and read it back with projection and filters
+    :return: None
+    """
+    pytest.importorskip('pyarrow')
+    import fsoi.stats.lib_utils as lutils
+    from fsoi.stats.convert_storage import convert, parse_name
+
+    assert parse_name('bulk.GMAO.dry.2015010100.h5') == ('bulk', 'GMAO', 'dry', '2015010100')
+    assert parse_name('JMA_adj.moist.2015010106.h5') == ('raw', 'JMA_adj', 'moist', '2015010106')
+    assert parse_name('README') is None
+
+    hdf5 = lutils.get_backend('hdf5', str(tmp_path / 'hdf5'), profile='ingest')
+    frames = {}
+    for i, date in enumerate(['2015010100', '2015010106']):
+        frames[date] = make_frame(['Radiosonde', 'Aircraft', 'AMSUA_N15', 'Aircraft'], i)
+        hdf5.write(frames[date], 'raw', 'GMAO', 'dry', date)
+    hdf5.write(make_frame(['Aircraft'], 2), 'raw', 'NRL', 'dry', '2015010100')
+
+    parquet = lutils.get_backend('parquet', str(tmp_path / 'parquet'), row_group_size=2)
+    assert convert(str(tmp_path / 'hdf5'), parquet, centers=['GMAO']) == 2
+
+    df = parquet.read('raw', 'GMAO', 'dry', '2015010106')
+    pd.testing.assert_frame_equal(df, frames['2015010106'].sort_index())
+
+    df = parquet.read('raw', 'GMAO', 'dry', columns=['IMPACT'],
+                      filters=[('PLATFORM', '=', 'Aircraft')])
+    assert list(df.columns) == ['IMPACT']
+    assert len(df) == 4
+    assert set(df.index.get_level_values('PLATFORM')) == {'Aircraft'}
+
+    expected = hdf5.read('raw', 'GMAO', 'dry', '2015010100', columns=['IMPACT'],
+                         filters=[('PLATFORM', '=', 'Aircraft')])
+    df = parquet.read('raw', 'GMAO', 'dry', '2015010100', columns=['IMPACT'],
+                      filters=[('PLATFORM', '=', 'Aircraft')])
+    pd.testing.assert_frame_equal(df, expected)
+
+    with pytest.raises(ValueError):
+        hdf5.read('raw', 'GMAO', 'dry')
+
+
+def test_read_pinned_partition(tmp_path, make_frame):
+    """
+    Read a pinned partition without opening the other partitions of the product
+    :return: None
+    """
+    pytest.importorskip('pyarrow')
+    import fsoi.stats.lib_utils as lutils
+
+    parquet = lutils.get_backend('parquet', str(tmp_path))
+    df = make_frame(['Radiosonde', 'Aircraft'], 0)
+    parquet.write(df, 'raw', 'GMAO', 'dry', '2015010100')
+
+    # an unreadable partition of another cycle is never listed
+    broken = tmp_path / 'raw' / 'center=GMAO' / 'norm=dry' / 'date=2015010106'
+    broken.mkdir(parents=True)
+    (broken / 'part-0.parquet').write_text('not parquet')
+
+    pd.testing.assert_frame_equal(parquet.read('raw', 'GMAO', 'dry', '2015010100'),
+                                  df.sort_index())
+    with pytest.raises(Exception):
+        parquet.read('raw', 'GMAO', 'dry')
@@ -0,0 +1,29 @@
+"""
+Tests for the summary data of the JSON responses
+"""
+import json
+import numpy as np
+
+
+def test_summary_data(make_frames):
+    """
+    Compute the summary data of a center from its time-average, and check the JSON columns
+    :return: None
+    """
+    import fsoi.stats.lib_obimpact as loi
+    from fsoi.web.batch_wrapper import center_summary, summary_data
+    from fsoi.plots.summary_renderer import QUANTITIES
+
+    accumulator = loi.TavgAccumulator('PLATFORM')
+    for frame in make_frames(12):
+        accumulator.add(frame)
+
+    request = {'platforms': 'Radiosonde,AMSUA,IASI'}
+    df, df_std = center_summary(request, 'GMAO', [], accumulator)
+    data = json.loads(json.dumps(summary_data(df, df_std), allow_nan=False))
+
+    assert sorted(data['platforms']) == ['AMSUA', 'IASI', 'Radiosonde']
+    assert list(data['metrics']) == QUANTITIES
+    platform = data['platforms'].index('IASI')
+    np.testing.assert_allclose(data['metrics']['ImpPerOb'][platform], df.loc['IASI', 'ImpPerOb'])
+    np.testing.assert_allclose(data['std']['TotImp'][platform], df_std.loc['IASI', 'TotImp'])
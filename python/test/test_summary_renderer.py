@@ -0,0 +1,40 @@
+"""
+Tests for the batched summary figures
+"""
+import numpy as np
+import pandas as pd
+
+
+def test_render_summary(tmp_path):
+    """
+    Render the figures of all quantities, then reuse the renderer for a center with fewer platforms
+    :return: None
+    """
+    import fsoi.stats.lib_obimpact as loi
+    from fsoi.plots.summary_renderer import SummaryRenderer, QUANTITIES
+
+    rng = np.random.default_rng(0)
+    obcnt = rng.integers(100, 2000000, 12)
+    df = pd.DataFrame({'TotImp': rng.normal(size=12), 'ObCnt': obcnt, 'ObCntBen': obcnt // 2,
+                       'ObCntNeu': obcnt // 10},
+                      index=pd.Index(['Platform_%02d' % i for i in range(12)], name='PLATFORM'))
+    df = loi.summarymetrics(df)
+    std = df[['TotImp']].abs() * 0.1
+
+    renderer = SummaryRenderer()
+    fignames = {qty: str(tmp_path / ('GMAO_%s_00Z' % qty)) for qty in QUANTITIES}
+    files = renderer.render(df, fignames, std=std, cycle=[0], center='GMAO', platform='',
+                            domain='Global')
+    assert files == ['%s.png' % fignames[qty] for qty in QUANTITIES]
+    for fname in files:
+        with open(fname, 'rb') as f:
+            assert f.read(8) == b'\x89PNG\r\n\x1a\n'
+
+    # a platform without observations has no finite ImpPerOb
+    df = df.iloc[:8].copy()
+    df.loc[df.index[0], 'ImpPerOb'] = np.nan
+    files = renderer.render(df, {'ImpPerOb': str(tmp_path / 'NRL_ImpPerOb_00Z')}, cycle=[0],
+                            center='NRL', platform='', domain='Global')
+    assert len(files) == 1
+    assert sum(bar.get_visible() for bar in renderer.bars) == 7
+    assert len(renderer.ax.get_yticklabels()) == 7
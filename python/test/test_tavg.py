@@ -0,0 +1,33 @@
+"""
+Tests for the streaming time-average of bulk statistics
+"""
+import pickle
+import numpy as np
+import pandas as pd
+
+
+def test_tavg_accumulator(make_frames):
+    """
+    Fold cycles one at a time, in two accumulators merged later, and compare to the batch result
+    :return: None
+    """
+    import fsoi.stats.lib_obimpact as loi
+
+    frames = make_frames(40)
+    df = pd.concat(frames)
+    groups = df.groupby(level='PLATFORM')
+
+    first, second = loi.TavgAccumulator('PLATFORM'), loi.TavgAccumulator('PLATFORM')
+    for i, frame in enumerate(frames):
+        (first if i % 2 else second).add(frame)
+    accumulator = pickle.loads(pickle.dumps(first.merge(second)))
+
+    mean, std = accumulator.result()
+    assert np.allclose(mean['TotImp'], groups.mean()['TotImp'])
+    assert np.allclose(std['TotImp'], groups.std()['TotImp'])
+    assert (mean['ObCnt'] == groups.mean()['ObCnt'].astype(int)).all()
+    assert accumulator.hours() == [0, 6, 12, 18]
+
+    selected = df[df.index.get_level_values('DATETIME').hour.isin([0, 12])]
+    mean, std = accumulator.result(cycles=[0, 12])
+    assert np.allclose(std['TotImp'], selected.groupby(level='PLATFORM').std()['TotImp'])
@@ -0,0 +1,55 @@
+"""
+Tests for the Taylor diagram statistics
+"""
+import os
+import numpy as np
+import pandas as pd
+
+
+def test_taylor_stats(tmp_path):
+    """
+    Load the series of two platforms by channel and compare to pandas std and corr
+    :return: None
+    """
+    import fsoi.stats.lib_utils as lutils
+    import fsoi.stats.lib_taylor as ltaylor
+
+    rng = np.random.default_rng(0)
+    centers = ['GMAO', 'NRL', 'MET']
+    for center in centers:
+        os.makedirs(str(tmp_path / 'work' / center / 'dry'))
+        for platform in ['AMSUA', 'IASI']:
+            index = pd.MultiIndex.from_product(
+                [pd.date_range('2015-01-01', periods=20, freq='6H'), [platform], ['Tb'], [5, 6]],
+                names=['DATETIME', 'PLATFORM', 'OBTYPE', 'CHANNEL'])
+            df = pd.DataFrame({'TotImp': rng.normal(size=len(index))}, index=index)
+            # some cycles are missing
+            df = df[rng.uniform(size=len(df)) > 0.15]
+            lutils.writeHDF(str(tmp_path / 'work' / center / 'dry' / ('%s.h5' % platform.lower())),
+                            'df', df)
+
+    series = ltaylor.load_series(str(tmp_path), centers, 'dry', ['AMSUA', 'IASI'],
+                                 cycles=[0, 6, 12, 18], by_channel=True)
+    stats = ltaylor.std_corr(series)
+    assert sorted(stats) == [('AMSUA', 5), ('AMSUA', 6), ('IASI', 5), ('IASI', 6)]
+
+    expected = series[('IASI', 6)]
+    std, corr = stats[('IASI', 6)]
+    np.testing.assert_allclose(std[centers].values, expected[centers].std().values)
+    np.testing.assert_allclose(corr.loc[centers, centers].values,
+                               expected[centers].corr().values)
+
+    series = ltaylor.load_series(str(tmp_path), centers, 'dry', ['AMSUA'], channels=[5])
+    std, corr = ltaylor.std_corr(series)['AMSUA']
+    np.testing.assert_allclose(corr.values, series['AMSUA'].corr().values)
+
+
+def test_finite_centers():
+    """
+    Skip the centers that are missing or have no finite standard deviation
+    :return: None
+    """
+    from fsoi.plots.correlations_bulk_Taylor import finite_centers
+
+    stdv = pd.Series({'GMAO': 1., 'NRL': np.nan}, name='AMSUA')
+    assert finite_centers(['GMAO', 'NRL', 'MET'], stdv) == ['GMAO']